@@ -18,38 +18,916 @@ import time
 from datetime import datetime
 import threading
 import os
+import queue
+import sqlite3
+import asyncio
 import anthropic
-from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import hmac
+import hashlib
+import copy
+import bisect
+import socket
+import uuid
+from collections import defaultdict, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, Future, TimeoutError as FuturesTimeoutError
 from functools import lru_cache
+from contextlib import contextmanager
+from abc import ABC, abstractmethod
 import re
 
+try:
+    import fcntl  # 별표 로그 파일 잠금 (POSIX, 없으면 프로세스 안에서만 잠금)
+except ImportError:
+    fcntl = None
+
+try:
+    import websocket  # websocket-client (Socket Mode 수신 시에만 필요)
+except ImportError:
+    websocket = None
+
+try:
+    import aiohttp  # 비동기 엔진(SLACK_ASYNC_ENGINE / ASYNC_SSE_PORT) 사용 시에만 필요
+    from aiohttp import web as aiohttp_web
+except ImportError:
+    aiohttp = None
+    aiohttp_web = None
+
 app = Flask(__name__)
-app.secret_key = os.urandom(24)  # 세션 암호화 키
+# 세션 암호화 키 (여러 워커로 실행할 때는 모든 프로세스가 같은 값을 쓰도록 FLASK_SECRET_KEY 지정)
+FLASK_SECRET_KEY = os.environ.get('FLASK_SECRET_KEY')
+app.secret_key = FLASK_SECRET_KEY or os.urandom(24)
 
-# 전역 변수
-monitoring_active = {}  # 사용자별 모니터링 상태
-last_check_times = {}  # 사용자별 마지막 체크 시간
-notification_queues = {}  # 사용자별 알림 큐
+# 워크스페이스(token/bot_id)별 공유 폴러
+_workspace_pollers = {}  # {(token, bot_id): WorkspacePoller}
+_workspace_pollers_lock = threading.Lock()
 
 # 사용자 데이터 디렉토리
 USER_DATA_DIR = 'user_data'
 
-# 전역 캐시 (메모리 기반, TTL 포함)
-_global_user_cache = {}  # {user_id: {"data": user_info, "timestamp": time}}
-_global_bot_cache = {}   # {bot_id: {"data": bot_info, "timestamp": time}}
-_global_channel_cache = {}  # {token: {"data": channels, "timestamp": time}}
-_global_users_list_cache = {}  # {token: {"data": members, "timestamp": time}}
+
+# ============================================================
+# 캐시 컴포넌트
+# ============================================================
+
+class TTLCache:
+    """스레드 안전한 LRU + TTL 캐시
+
+    - maxsize를 넘으면 가장 오래 사용하지 않은 항목부터 제거 (LRU)
+    - 항목별 TTL, 조회 시 만료 여부를 확인 (lazy expiry)
+    - stale 표시 항목: 값은 그대로 사용하되 호출 측이 재검증하도록 알림 (warm start용)
+    - hit/miss/eviction/expiration 카운터 제공
+    """
+
+    def __init__(self, name, maxsize, ttl):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # {key: (value, expires_at, stale)}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_entry(self, key):
+        """(value, stale) 조회 (없거나 만료되었으면 None)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, stale = entry
+            if time.time() >= expires_at:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value, stale
+
+    def get(self, key, default=None):
+        """값 조회 (없거나 만료되었으면 default, stale 항목도 값으로 반환)"""
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def set(self, key, value, ttl=None, stale=False):
+        """값 저장 (ttl 미지정 시 기본 TTL)"""
+        with self._lock:
+            self._data[key] = (value, time.time() + (self.ttl if ttl is None else ttl), stale)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear_stale(self, key):
+        """stale 표시 해제 (재검증을 한 번만 시작하도록). 해제했으면 True"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or not entry[2]:
+                return False
+            self._data[key] = (entry[0], entry[1], False)
+            return True
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[0]
+
+    def __contains__(self, key):
+        """만료되지 않은 항목이 있는지 (카운터에 반영하지 않음)"""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and time.time() < entry[1]
+
+    def __len__(self):
+        return len(self._data)
+
+    def purge_expired(self):
+        """만료된 항목 일괄 제거, 제거한 개수 반환"""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, entry in self._data.items() if now >= entry[1]]
+            for key in expired:
+                del self._data[key]
+            self.expirations += len(expired)
+        return len(expired)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class SingleFlight:
+    """같은 키에 대한 동시 요청을 하나로 합치기
+
+    진행 중인 요청이 있으면 새 요청을 보내지 않고 그 결과를 기다려 공유한다.
+    """
+
+    def __init__(self):
+        self._calls = {}  # {key: Future}
+        self._lock = threading.Lock()
+        self.shared = 0  # 다른 요청의 결과를 공유한 횟수
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                leader = False
+            else:
+                future = Future()
+                self._calls[key] = future
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+# ============================================================
+# 메트릭 (Prometheus 텍스트 형식, /metrics)
+# ============================================================
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '0') == '1'  # /metrics 엔드포인트 제공 여부 (기본 꺼짐)
+# /metrics 접근 토큰 (Authorization: Bearer <토큰>). 없으면 로컬(127.0.0.1/::1) 요청만 허용
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # Slack/Claude 호출 (초)
+METRICS_CYCLE_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # 스캔 사이클 (초)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """라벨별 누적 카운터"""
+
+    type = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = defaultdict(float)  # {라벨 값 tuple: 누적 값}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] += amount
+
+    def samples(self):
+        """[(이름, 라벨 dict, 값)]"""
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in items]
+
+
+class Histogram:
+    """라벨별 누적 히스토그램 (bucket/sum/count)"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=METRICS_LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # {라벨 값 tuple: [bucket별 개수, 합계, 개수]}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        samples = []
+        for key, counts, total, count in items:
+            labels = dict(zip(self.labelnames, key))
+            for bound, bucket_count in zip(self.buckets, counts):
+                samples.append((self.name + '_bucket', dict(labels, le=_format_value(float(bound))), bucket_count))
+            samples.append((self.name + '_bucket', dict(labels, le='+Inf'), count))
+            samples.append((self.name + '_sum', labels, total))
+            samples.append((self.name + '_count', labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    """메트릭 등록과 Prometheus 텍스트 출력
+
+    카운터/히스토그램은 이벤트 시점에 기록하고, 캐시 크기나 큐 길이 같은 현재 값은
+    collector 함수가 조회 시점에 [(이름, 타입, 설명, [(라벨 dict, 값)])]으로 반환한다.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=METRICS_LATENCY_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        families = [(metric.name, metric.type, metric.help, metric.samples()) for metric in self._metrics]
+        for collect in self._collectors:
+            try:
+                for name, metric_type, help_text, values in collect():
+                    families.append((name, metric_type, help_text, [(name, labels, value) for labels, value in values]))
+            except Exception as e:
+                print(f"⚠️ 메트릭 수집 오류 ({collect.__name__}): {e}", flush=True)
+
+        for name, metric_type, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def metrics_workspace_label(cache_key):
+    """메트릭 workspace 라벨 (토큰 해시 앞부분)"""
+    return cache_key[:12]
+
+
+metrics = MetricsRegistry()
+
+slack_api_requests = metrics.counter(
+    'slack_api_requests_total', 'Slack Web API 요청 수', ('method', 'workspace', 'status'))
+slack_api_latency = metrics.histogram(
+    'slack_api_request_duration_seconds', 'Slack Web API 응답 시간 (rate limit 대기 제외)', ('method',))
+slack_rate_limit_wait = metrics.histogram(
+    'slack_rate_limit_wait_seconds', 'rate limit 스케줄러 토큰 대기 시간', ('method',))
+slack_scan_cycle_duration = metrics.histogram(
+    'slack_scan_cycle_duration_seconds', 'check_new_mentions 스캔 사이클 시간',
+    ('workspace', 'engine'), METRICS_CYCLE_BUCKETS)
+slack_scan_notifications = metrics.counter(
+    'slack_scan_notifications_total', '스캔에서 감지한 알림 수', ('workspace',))
+# 시계열 수 = 워크스페이스 수 × 봇이 참여한 채널/DM 수 (채널이 많은 워크스페이스에서는 수천 개가 될 수 있음)
+slack_channel_messages_scanned = metrics.counter(
+    'slack_channel_messages_scanned_total', '채널/DM별 스캔한 메시지 수', ('workspace', 'channel'))
+claude_requests = metrics.counter(
+    'claude_requests_total', 'Claude 분류 API 요청 수', ('status',))
+claude_latency = metrics.histogram(
+    'claude_request_duration_seconds', 'Claude 분류 API 응답 시간')
+claude_classifications = metrics.counter(
+    'claude_classifications_total', 'Claude 분류 결과 (source: cache/api/timeout/budget/error)', ('source',))
+claude_tokens = metrics.counter(
+    'claude_tokens_total', 'Claude 사용 토큰 수', ('type',))
+claude_cost = metrics.counter(
+    'claude_cost_usd_total', 'Claude 예상 비용 (USD, CLAUDE_PRICE_PER_MTOK 기준)')
+
+
+@metrics.collector
+def collect_cache_metrics():
+    """전역 캐시 hit/miss/크기"""
+    stats = [cache.stats() for cache in get_global_caches()]
+    ratios = []
+    for stat in stats:
+        lookups = stat['hits'] + stat['misses']
+        ratios.append(({'cache': stat['name']}, stat['hits'] / lookups if lookups else 0))
+    return [
+        ('cache_hits_total', 'counter', '캐시 hit 수', [({'cache': st['name']}, st['hits']) for st in stats]),
+        ('cache_misses_total', 'counter', '캐시 miss 수', [({'cache': st['name']}, st['misses']) for st in stats]),
+        ('cache_evictions_total', 'counter', 'LRU로 제거된 항목 수', [({'cache': st['name']}, st['evictions']) for st in stats]),
+        ('cache_hit_ratio', 'gauge', '캐시 hit 비율 (프로세스 시작 이후)', ratios),
+        ('cache_entries', 'gauge', '캐시 항목 수', [({'cache': st['name']}, st['size']) for st in stats]),
+    ]
+
+
+@metrics.collector
+def collect_executor_metrics():
+    """스레드 풀 대기 작업 수"""
+    pools = {'executor': executor, 'prefetch': _prefetch_executor, 'lookup': _lookup_executor}
+    return [
+        ('executor_queue_depth', 'gauge', '스레드 풀에서 실행을 기다리는 작업 수',
+         [({'pool': name}, pool._work_queue.qsize()) for name, pool in pools.items()]),
+        ('executor_threads', 'gauge', '스레드 풀이 만든 스레드 수',
+         [({'pool': name}, len(pool._threads)) for name, pool in pools.items()]),
+    ]
+
+
+@metrics.collector
+def collect_stream_metrics():
+    """SSE 연결과 공유 폴러/채널 스트림 수"""
+    connections = notification_broker.connection_counts()
+    with _channel_streams_lock:
+        channel_viewers = sum(stream.viewer_count() for stream in _channel_streams.values())
+        channel_streams = len(_channel_streams)
+    with _workspace_pollers_lock:
+        pollers = len(_workspace_pollers)
+        leaders = sum(1 for poller in _workspace_pollers.values() if poller.is_leader)
+    return [
+        ('sse_connections', 'gauge', '열려 있는 SSE 연결 수',
+         [({'stream': 'monitoring', 'server': 'flask'}, connections['thread']),
+          ({'stream': 'monitoring', 'server': 'async'}, connections['async']),
+          ({'stream': 'channel', 'server': 'flask'}, channel_viewers)]),
+        ('workspace_pollers', 'gauge', '동작 중인 공유 폴러 수', [({}, pollers)]),
+        ('workspace_pollers_leading', 'gauge', '리더 lease를 가지고 스캔 중인 공유 폴러 수', [({}, leaders)]),
+        ('channel_streams', 'gauge', '동작 중인 채널 스트림 수', [({}, channel_streams)]),
+    ]
+
+
+# 전역 캐시 (메모리 기반, LRU + TTL)
 CACHE_TTL = 300  # 5분 TTL
 USERS_LIST_CACHE_TTL = 600  # 10분 TTL (users.list는 덜 자주 변경됨)
+_global_user_cache = TTLCache('users', maxsize=20000, ttl=CACHE_TTL)          # {user_id: user_info}
+_global_bot_cache = TTLCache('bots', maxsize=2000, ttl=CACHE_TTL)             # {bot_id: bot_info}
+_global_channel_cache = TTLCache('channels', maxsize=500, ttl=CACHE_TTL)      # {token: channels}
+_global_users_list_cache = TTLCache('users_list', maxsize=100, ttl=USERS_LIST_CACHE_TTL)  # {token: members}
+IM_LIST_CACHE_TTL = 600  # 10분 TTL (DM 목록은 거의 바뀌지 않고, 새 DM은 푸시 이벤트로도 갱신)
+_global_im_cache = TTLCache('ims', maxsize=500, ttl=IM_LIST_CACHE_TTL)        # {token: [dm_id]}
+DM_ACTIVITY_REFRESH = 10  # conversations.list(types=im)로 DM별 최근 활동을 다시 확인하는 주기 (초)
+_global_dm_activity_cache = TTLCache('dm_activity', maxsize=500, ttl=DM_ACTIVITY_REFRESH)  # {token: {dm_id: ts}}
+# users.info / bots.info 동시 캐시 미스 합치기
+_lookup_flight = SingleFlight()
+
+
+def dm_list_activity(dm_channel):
+    """conversations.list의 DM 항목에서 최근 활동 시각 (latest 메시지 ts, 없으면 updated, 모르면 None)"""
+    latest = dm_channel.get("latest")
+    if isinstance(latest, dict):
+        latest = latest.get("ts")
+    if latest:
+        return float(latest)
+    updated = dm_channel.get("updated")
+    if updated:
+        updated = float(updated)
+        return updated / 1000 if updated > 1e11 else updated  # updated는 밀리초 단위로 오기도 함
+    return None
+
+
+# ============================================================
+# User Group 멤버십 인덱스
+# ============================================================
+
+USERGROUP_INDEX_TTL = 600  # 이 시간이 지나면 백그라운드에서 재구성 (초)
+USERGROUP_INDEX_MIN_REFRESH = 60  # 모르는 그룹 멘션 등으로 인한 재구성 최소 간격 (초)
+
+
+class UsergroupIndex:
+    """워크스페이스 User Group 멤버십 인덱스
+
+    usergroups.list(include_users) 한 번으로 그룹 → 멤버 집합, 사용자 → 소속 그룹 집합을 만든다.
+    모든 세션이 공유하며, 그룹 멘션 판정은 네트워크 호출 없이 집합 연산으로 끝난다.
+    """
+
+    def __init__(self):
+        self._groups = {}  # {subteam_id: (handle, frozenset(user_ids))}
+        self._user_groups = {}  # {user_id: frozenset(subteam_ids)}
+        self.built_at = 0  # 마지막 재구성 시각 (0이면 아직 없음)
+        self._stale = False  # warm start로 적재되어 재검증이 필요한 상태
+        self._refresh_claimed_at = 0  # 마지막 재구성 시작 시각
+        self._lock = threading.Lock()
+
+    def update(self, usergroups, built_at=None):
+        """usergroups.list 응답으로 전체 재구성"""
+        groups = {}
+        user_groups = defaultdict(set)
+        for ug in usergroups:
+            subteam_id = ug.get("id")
+            if not subteam_id:
+                continue
+            members = frozenset(ug.get("users") or ())
+            groups[subteam_id] = (ug.get("handle") or "그룹", members)
+            for user_id in members:
+                user_groups[user_id].add(subteam_id)
+        with self._lock:
+            self._groups = groups
+            self._user_groups = {user_id: frozenset(ids) for user_id, ids in user_groups.items()}
+            self.built_at = built_at or time.time()
+            self._stale = False
+
+    def load(self, snapshot):
+        """영구 캐시 스냅샷 적재 (stale 상태, 첫 조회 시 백그라운드 재구성)"""
+        self.update([{"id": subteam_id, "handle": handle, "users": users}
+                     for subteam_id, (handle, users) in snapshot.get("groups", {}).items()],
+                    built_at=snapshot.get("built_at"))
+        self._stale = True
+
+    def snapshot(self):
+        """영구 캐시에 기록할 형태 (JSON 직렬화 가능)"""
+        with self._lock:
+            return {"built_at": self.built_at,
+                    "groups": {subteam_id: [handle, sorted(members)]
+                               for subteam_id, (handle, members) in self._groups.items()}}
+
+    def knows(self, subteam_id):
+        return subteam_id in self._groups
+
+    def handle(self, subteam_id, default="그룹"):
+        group = self._groups.get(subteam_id)
+        return group[0] if group else default
+
+    def members(self, subteam_id):
+        group = self._groups.get(subteam_id)
+        return group[1] if group else frozenset()
+
+    def groups_of(self, user_ids):
+        """사용자들이 속한 그룹 ID 집합 (합집합)"""
+        user_groups = self._user_groups
+        result = set()
+        for user_id in user_ids:
+            result |= user_groups.get(user_id, frozenset())
+        return result
+
+    def claim_refresh(self, force=False, now=None):
+        """재구성이 필요하면 시작 권한을 얻는다 (같은 인덱스의 중복 재구성 방지)
+
+        force는 모르는 그룹이 멘션된 경우처럼 TTL 전이라도 갱신하고 싶을 때 쓴다.
+        어느 경우든 USERGROUP_INDEX_MIN_REFRESH 안에는 다시 시작하지 않는다.
+        """
+        now = now or time.time()
+        with self._lock:
+            if not (force or self._stale or now - self.built_at >= USERGROUP_INDEX_TTL):
+                return False
+            if now - self._refresh_claimed_at < USERGROUP_INDEX_MIN_REFRESH:
+                return False
+            self._refresh_claimed_at = now
+            self._stale = False
+            return True
+
+    def __len__(self):
+        return len(self._groups)
+
+
+_usergroup_indexes = {}  # {token: UsergroupIndex}
+_usergroup_indexes_lock = threading.Lock()
+
+
+def get_usergroup_index(cache_key):
+    """워크스페이스별 User Group 인덱스 (없으면 빈 인덱스 생성)"""
+    with _usergroup_indexes_lock:
+        index = _usergroup_indexes.get(cache_key)
+        if index is None:
+            index = UsergroupIndex()
+            _usergroup_indexes[cache_key] = index
+        return index
+
+
+def token_cache_key(token):
+    """토큰 기반 캐시 키 (토큰 자체를 메모리/디스크 캐시 키로 쓰지 않도록 해시)"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()[:32]
+
+
+# ============================================================
+# 메타데이터 영구 캐시 (warm start)
+# ============================================================
+
+METADATA_CACHE_ENABLED = os.environ.get('METADATA_CACHE_ENABLED', '1') != '0'
+METADATA_CACHE_PATH = os.environ.get('METADATA_CACHE_PATH', os.path.join(USER_DATA_DIR, 'metadata_cache.sqlite3'))
+WARM_START_MAX_AGE = 7 * 24 * 3600  # 이보다 오래된 항목은 적재하지 않음 (초)
+
+
+class MetadataStore:
+    """SQLite 기반 메타데이터 캐시 (users, bots, channels, ims, usergroup_index)
+
+    조회에 성공한 항목을 write-behind로 저장하고, 재시작 시 메모리 캐시에
+    stale 상태로 미리 적재하여 첫 조회부터 Slack 왕복 없이 응답한다.
+    """
+
+    FLUSH_INTERVAL = 1.0  # 쓰기 배치를 모으는 최대 시간 (초)
+    BATCH_SIZE = 500
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS metadata (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (kind, key)
+                )
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._run, daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def put(self, kind, key, value):
+        """항목 저장 예약 (백그라운드에서 배치로 기록)"""
+        self._queue.put((kind, key, json.dumps(value, ensure_ascii=False), time.time()))
+
+    def load(self, kind, max_age=None):
+        """kind의 저장된 항목 [(key, value)]"""
+        conn = self._connect()
+        try:
+            if max_age is None:
+                rows = conn.execute("SELECT key, data FROM metadata WHERE kind = ?", (kind,)).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT key, data FROM metadata WHERE kind = ? AND updated_at >= ?",
+                    (kind, time.time() - max_age)
+                ).fetchall()
+        finally:
+            conn.close()
+
+        items = []
+        for key, data in rows:
+            try:
+                items.append((key, json.loads(data)))
+            except ValueError:
+                continue
+        return items
+
+    def flush(self):
+        """예약된 쓰기가 모두 기록될 때까지 대기"""
+        self._queue.join()
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.time() + self.FLUSH_INTERVAL
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.time())))
+                except queue.Empty:
+                    break
+
+            # 같은 항목은 마지막 값만 기록
+            rows = {(kind, key): (kind, key, data, updated_at) for kind, key, data, updated_at in batch}
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO metadata (kind, key, data, updated_at) VALUES (?, ?, ?, ?)",
+                    list(rows.values())
+                )
+                conn.commit()
+            except Exception as e:
+                print(f"⚠️ 메타데이터 캐시 저장 실패: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+def warm_start_caches(store):
+    """디스크 메타데이터를 메모리 캐시에 stale 상태로 적재 (조회 시 백그라운드 재검증)"""
+    loaded = {}
+    for kind, cache in (('user', _global_user_cache),
+                        ('bot', _global_bot_cache),
+                        ('channels', _global_channel_cache),
+                        ('ims', _global_im_cache)):
+        items = store.load(kind, WARM_START_MAX_AGE)
+        for key, value in items:
+            cache.set(key, value, stale=True)
+        loaded[kind] = len(items)
+    items = store.load('usergroup_index', WARM_START_MAX_AGE)
+    for key, snapshot in items:
+        get_usergroup_index(key).load(snapshot)
+    loaded['usergroup_index'] = len(items)
+    print(f"♻️ 메타데이터 캐시 warm start: {loaded}")
+
+
+metadata_store = None  # get_metadata_store()가 처음 호출될 때 연다 (import만으로 파일을 만들지 않음)
+_metadata_store_opened = False
+_metadata_store_lock = threading.Lock()
+
+
+def get_metadata_store():
+    """메타데이터 영구 캐시 (처음 호출 시 파일을 열고 warm start, 사용할 수 없으면 None)"""
+    global metadata_store, _metadata_store_opened
+    if _metadata_store_opened:
+        return metadata_store
+    with _metadata_store_lock:
+        if not _metadata_store_opened:
+            if METADATA_CACHE_ENABLED:
+                try:
+                    store = MetadataStore(METADATA_CACHE_PATH)
+                    warm_start_caches(store)
+                    metadata_store = store
+                except Exception as e:
+                    print(f"⚠️ 메타데이터 캐시 사용 불가 ({METADATA_CACHE_PATH}): {e}")
+            _metadata_store_opened = True
+    return metadata_store
+
+
+def persist_metadata(kind, key, value):
+    """조회에 성공한 메타데이터를 영구 캐시에 기록 (write-behind)"""
+    store = get_metadata_store()
+    if store is not None:
+        store.put(kind, key, value)
+
+
+# ============================================================
+# 메시지 아카이브 (채널 메시지 로컬 저장소)
+# ============================================================
+
+MESSAGE_ARCHIVE_ENABLED = os.environ.get('MESSAGE_ARCHIVE_ENABLED', '1') != '0'
+MESSAGE_ARCHIVE_PATH = os.environ.get('MESSAGE_ARCHIVE_PATH', os.path.join(USER_DATA_DIR, 'message_archive.sqlite3'))
+ARCHIVE_FRESH_SECONDS = 5  # 마지막 동기화 후 이 시간 안에는 Slack에 delta도 요청하지 않음 (초)
+ARCHIVE_RESYNC_INTERVAL = 600  # 최신 페이지 전체를 다시 받아 수정/삭제/스레드 정보를 반영하는 주기 (초)
+ARCHIVE_MAX_PER_CHANNEL = 2000  # 채널당 보관하는 최대 메시지 수
+
+
+class MessageArchive:
+    """SQLite 기반 채널 메시지 저장소 ((workspace, channel, ts) 키)
+
+    채널마다 빈틈없이 저장된 구간(coverage)을 관리한다. 저장된 구간이 있으면
+    가장 최신 ts 이후의 delta만 Slack에서 받아 이어 붙이고, 모니터링 스캔이 받은
+    메시지도 구간이 이어지는 경우에만 추가한다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._lock = threading.Lock()  # 구간 확인 + 쓰기를 원자적으로 처리
+
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                workspace TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                ts TEXT NOT NULL,
+                ts_num REAL NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (workspace, channel, ts)
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_ts ON messages (workspace, channel, ts_num);
+            CREATE TABLE IF NOT EXISTS coverage (
+                workspace TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                newest TEXT NOT NULL,
+                complete INTEGER NOT NULL,
+                synced_at REAL NOT NULL,
+                full_synced_at REAL NOT NULL,
+                PRIMARY KEY (workspace, channel)
+            );
+        """)
+        conn.commit()
+
+    def _conn(self):
+        """스레드별 연결"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def coverage(self, workspace, channel):
+        """채널의 저장 구간 정보 (없으면 None)"""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT newest, complete, synced_at, full_synced_at FROM coverage WHERE workspace = ? AND channel = ?",
+            (workspace, channel)
+        ).fetchone()
+        if row is None:
+            return None
+        count = conn.execute(
+            "SELECT COUNT(*) FROM messages WHERE workspace = ? AND channel = ?", (workspace, channel)
+        ).fetchone()[0]
+        return {"newest": row[0], "complete": bool(row[1]), "synced_at": row[2],
+                "full_synced_at": row[3], "count": count}
+
+    def replace(self, workspace, channel, messages, has_more, synced_at):
+        """최신 페이지 전체로 채널 저장분을 교체 (has_more=False면 채널 시작까지 저장된 상태)"""
+        newest = max((msg["ts"] for msg in messages), key=float) if messages else "0"
+        with self._lock:
+            conn = self._conn()
+            with conn:
+                conn.execute("DELETE FROM messages WHERE workspace = ? AND channel = ?", (workspace, channel))
+                self._insert(conn, workspace, channel, messages)
+                conn.execute(
+                    "INSERT OR REPLACE INTO coverage (workspace, channel, newest, complete, synced_at, full_synced_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (workspace, channel, newest, 0 if has_more else 1, synced_at, synced_at)
+                )
+
+    def append(self, workspace, channel, oldest, messages, synced_at):
+        """oldest 이후 전체 메시지(delta/스캔 결과)를 이어 붙임
+
+        저장 구간의 최신 ts가 oldest보다 이전이면 중간이 비므로 저장하지 않는다.
+        저장했으면 True.
+        """
+        with self._lock:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT newest, synced_at FROM coverage WHERE workspace = ? AND channel = ?", (workspace, channel)
+            ).fetchone()
+            if row is None or float(row[0]) < float(oldest):
+                return False
+
+            newest = max([row[0]] + [msg["ts"] for msg in messages], key=float)
+            with conn:
+                self._insert(conn, workspace, channel, messages)
+                conn.execute(
+                    "UPDATE coverage SET newest = ?, synced_at = ? WHERE workspace = ? AND channel = ?",
+                    (newest, max(row[1], synced_at), workspace, channel)
+                )
+                self._trim(conn, workspace, channel)
+            return True
+
+    def update_message(self, workspace, channel, message):
+        """저장된 메시지 내용 갱신 (수정 이벤트, 저장되지 않은 메시지는 무시)"""
+        with self._lock:
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "UPDATE messages SET data = ? WHERE workspace = ? AND channel = ? AND ts = ?",
+                    (json.dumps(message, ensure_ascii=False), workspace, channel, message["ts"])
+                )
+
+    def delete_message(self, workspace, channel, ts):
+        """저장된 메시지 삭제 (삭제 이벤트)"""
+        with self._lock:
+            conn = self._conn()
+            with conn:
+                conn.execute("DELETE FROM messages WHERE workspace = ? AND channel = ? AND ts = ?",
+                             (workspace, channel, ts))
+
+    def latest(self, workspace, channel, limit):
+        """최신 메시지 limit개 (Slack과 같은 최신순)"""
+        rows = self._conn().execute(
+            "SELECT data FROM messages WHERE workspace = ? AND channel = ? ORDER BY ts_num DESC LIMIT ?",
+            (workspace, channel, limit)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _insert(self, conn, workspace, channel, messages):
+        conn.executemany(
+            "INSERT OR REPLACE INTO messages (workspace, channel, ts, ts_num, data) VALUES (?, ?, ?, ?, ?)",
+            [(workspace, channel, msg["ts"], float(msg["ts"]), json.dumps(msg, ensure_ascii=False))
+             for msg in messages if msg.get("ts")]
+        )
+
+    def _trim(self, conn, workspace, channel):
+        """채널당 최대 보관 수를 넘는 오래된 메시지 삭제 (채널 시작까지 저장된 상태는 해제)"""
+        cutoff = conn.execute(
+            "SELECT ts_num FROM messages WHERE workspace = ? AND channel = ? ORDER BY ts_num DESC LIMIT 1 OFFSET ?",
+            (workspace, channel, ARCHIVE_MAX_PER_CHANNEL)
+        ).fetchone()
+        if cutoff is None:
+            return
+        conn.execute("DELETE FROM messages WHERE workspace = ? AND channel = ? AND ts_num <= ?",
+                     (workspace, channel, cutoff[0]))
+        conn.execute("UPDATE coverage SET complete = 0 WHERE workspace = ? AND channel = ?", (workspace, channel))
+
+
+message_archive = None  # get_message_archive()가 처음 호출될 때 연다 (import만으로 파일을 만들지 않음)
+_message_archive_opened = False
+_message_archive_lock = threading.Lock()
+
+
+def get_message_archive():
+    """채널 메시지 아카이브 (처음 호출 시 파일을 열고, 사용할 수 없으면 None)"""
+    global message_archive, _message_archive_opened
+    if _message_archive_opened:
+        return message_archive
+    with _message_archive_lock:
+        if not _message_archive_opened:
+            if MESSAGE_ARCHIVE_ENABLED:
+                try:
+                    message_archive = MessageArchive(MESSAGE_ARCHIVE_PATH)
+                except Exception as e:
+                    print(f"⚠️ 메시지 아카이브 사용 불가 ({MESSAGE_ARCHIVE_PATH}): {e}")
+            _message_archive_opened = True
+    return message_archive
+
+
+# 워크스페이스별 사용자 디렉토리 (username → user_id 인덱스)
+_user_directories = {}  # {token: UserDirectory}
+_user_directories_lock = threading.Lock()
 
 # 스레드 풀 (병렬 처리용)
 executor = ThreadPoolExecutor(max_workers=10)
+# 페이지네이션 다음 페이지 선요청용 스레드 풀 (executor 작업 안에서도 막히지 않도록 분리)
+_prefetch_executor = ThreadPoolExecutor(max_workers=10)
+# 사용자/봇 정보 일괄 조회용 스레드 풀 (채널 스캔 작업 안에서 호출되어도 executor가 고갈되지 않도록 분리)
+_lookup_executor = ThreadPoolExecutor(max_workers=10)
 
 # Claude API 설정 (환경 변수에서 읽기, 없으면 None)
 CLAUDE_API_KEY = os.environ.get('ANTHROPIC_API_KEY')
 CLAUDE_ENABLED = CLAUDE_API_KEY is not None
 
+# 메시지 수신 방식 (환경 변수로 선택)
+# - poll: conversations.history 폴링 (기본값)
+# - events: Events API HTTP 엔드포인트(/api/slack/events)로 푸시 수신
+# - socket: Socket Mode 웹소켓으로 푸시 수신 (SLACK_APP_TOKEN 필요)
+SLACK_INGESTION_MODE = os.environ.get('SLACK_INGESTION_MODE', 'poll').lower()
+SLACK_SIGNING_SECRET = os.environ.get('SLACK_SIGNING_SECRET')  # Events API 요청 서명 검증용
+SLACK_APP_TOKEN = os.environ.get('SLACK_APP_TOKEN')  # Socket Mode용 app-level 토큰 (xapp-...)
+PUSH_FALLBACK_POLLING = 30  # 푸시 수신 중 폴백 폴링 주기 (초)
+PUSH_EVENT_LIVENESS = 300  # 마지막 푸시 이벤트 후 이 시간 동안만 푸시가 동작 중인 것으로 간주 (초)
+# 원본 메시지가 아닌 메시지 이벤트 (수정/삭제/스레드 갱신 알림)
+IGNORED_MESSAGE_SUBTYPES = {'message_changed', 'message_deleted', 'message_replied'}
+
 # 우선순위 키워드 정의
 PRIORITY_KEYWORDS = {
     'critical': ['버그', '에러', 'error', '장애', '다운', 'down', '긴급', 'urgent', 'ASAP', '급해', '지금', '당장', '안됨', '안돼', '작동안함'],
@@ -68,34 +946,16 @@ PRIORITY_KEYWORDS = {
     'normal': ['공유', '참고', 'FYI', '알려', '업데이트', 'update', '공지'],
 }
 
+def get_global_caches():
+    """전역 캐시 목록 (정리/통계용)"""
+    return [_global_user_cache, _global_bot_cache, _global_channel_cache, _global_im_cache, _global_users_list_cache,
+            _global_dm_activity_cache]
+
 # 캐시 정리 함수
 def cleanup_expired_caches():
-    """만료된 캐시 항목 정리"""
-    current_time = time.time()
-
-    # User 캐시 정리
-    expired_users = [uid for uid, cached in _global_user_cache.items()
-                     if current_time - cached["timestamp"] > CACHE_TTL]
-    for uid in expired_users:
-        del _global_user_cache[uid]
-
-    # Bot 캐시 정리
-    expired_bots = [bid for bid, cached in _global_bot_cache.items()
-                    if current_time - cached["timestamp"] > CACHE_TTL]
-    for bid in expired_bots:
-        del _global_bot_cache[bid]
-
-    # Channel 캐시 정리
-    expired_channels = [token for token, cached in _global_channel_cache.items()
-                        if current_time - cached["timestamp"] > CACHE_TTL]
-    for token in expired_channels:
-        del _global_channel_cache[token]
-
-    # Users list 캐시 정리
-    expired_users_list = [token for token, cached in _global_users_list_cache.items()
-                          if current_time - cached["timestamp"] > USERS_LIST_CACHE_TTL]
-    for token in expired_users_list:
-        del _global_users_list_cache[token]
+    """만료된 캐시 항목 정리 (조회 시에도 만료를 확인하므로 메모리 회수용)"""
+    for cache in get_global_caches():
+        cache.purge_expired()
 
 # 캐시 정리를 주기적으로 실행
 def cache_cleanup_thread():
@@ -124,81 +984,186 @@ def get_user_file_path(bot_id, filename):
     """사용자별 파일 경로 반환"""
     return os.path.join(get_user_data_dir(bot_id), filename)
 
-def load_user_watched_users(bot_id):
-    """사용자별 watched_users 로드"""
-    filepath = get_user_file_path(bot_id, 'watched_users.json')
-    if os.path.exists(filepath):
+# ============================================================
+# 사용자별 설정 저장소 (메모리 사본 + 원자적 저장 + 변경 알림)
+# ============================================================
+
+CONFIG_WATCH_INTERVAL = 2  # 외부에서 수정한 설정 파일을 감지하는 mtime 확인 주기 (초)
+
+
+class ConfigStore:
+    """봇별 설정 파일의 메모리 사본 (별표 메시지는 StarredLog가 관리)
+
+    - 읽기는 메모리 사본(복사본)을 반환하고 디스크를 읽지 않는다.
+    - 쓰기는 임시 파일 + os.replace로 원자적으로 저장한 뒤 메모리 사본을 바로 갱신한다.
+    - 감시 스레드가 CONFIG_WATCH_INTERVAL마다 파일 mtime만 확인하여 외부 수정분을 다시 읽는다.
+    - 여러 워커가 상태를 공유하면(state_backend.shared) 읽을 때마다 파일 시그니처를 확인하여,
+      다른 워커가 저장한 값을 감시 주기를 기다리지 않고 반영한다. 동시에 저장하면 마지막 저장이 남는다.
+    - 값이 바뀌면 구독 중인 리스너(폴러 등)에 (bot_id, name, value)를 전달한다.
+    """
+
+    FILES = {
+        'watched_users': 'watched_users.json',
+        'priority_keywords': 'priority_keywords.json',
+        'settings': 'settings.json',
+    }
+
+    def __init__(self):
+        self._entries = {}  # {(bot_id, name): (value, 파일 시그니처)}
+        self._listeners = []  # [(bot_id 또는 None(전체), callback)]
+        self._lock = threading.RLock()
+
+    def _path(self, bot_id, name):
+        return get_user_file_path(bot_id, self.FILES[name])
+
+    @staticmethod
+    def _signature(filepath):
+        """파일 변경 판정용 (inode, mtime, 크기). 파일이 없으면 None
+
+        저장은 항상 새 파일로 교체하므로 inode로 같은 시각/크기의 저장도 구분한다.
+        """
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _read(self, bot_id, name):
+        filepath = self._path(bot_id, name)
+        signature = self._signature(filepath)
+        if signature is None:
+            return None, None
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                return json.load(f), signature
         except Exception as e:
-            print(f"⚠️ watched_users 로드 실패 ({bot_id}): {e}")
-            return []
-    return []
+            print(f"⚠️ {name} 로드 실패 ({bot_id}): {e}", flush=True)
+            return None, signature
+
+    def get(self, bot_id, name):
+        """설정 값 (파일이 없거나 읽을 수 없으면 None). 호출자가 수정해도 되는 복사본을 반환"""
+        key = (bot_id, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._read(bot_id, name)
+                self._entries[key] = entry
+                return copy.deepcopy(entry[0])
+        if state_backend.shared:
+            self._refresh(bot_id, name)
+        with self._lock:
+            return copy.deepcopy(self._entries[key][0])
+
+    def set(self, bot_id, name, value):
+        """임시 파일에 쓴 뒤 교체하여 저장 (성공 여부 반환)"""
+        filepath = self._path(bot_id, name)
+        tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+        value = copy.deepcopy(value)
+        with self._lock:
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(value, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, filepath)
+            except Exception as e:
+                print(f"⚠️ {name} 저장 실패 ({bot_id}): {e}", flush=True)
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                return False
+            previous = self._entries.get((bot_id, name), (None, None))[0]
+            self._entries[(bot_id, name)] = (value, self._signature(filepath))
+        if value != previous:
+            self._notify(bot_id, name, value)
+        return True
+
+    def check_files(self):
+        """메모리에 올라온 설정 파일의 mtime을 확인하여 외부 수정분을 다시 읽음"""
+        with self._lock:
+            keys = list(self._entries)
+        for bot_id, name in keys:
+            self._refresh(bot_id, name)
+
+    def _refresh(self, bot_id, name):
+        """파일 시그니처가 바뀌었으면 다시 읽고, 값이 달라졌으면 리스너에 알림"""
+        signature = self._signature(self._path(bot_id, name))
+        with self._lock:
+            previous, previous_signature = self._entries.get((bot_id, name), (None, None))
+            if signature == previous_signature:
+                return
+            value, signature = self._read(bot_id, name)
+            self._entries[(bot_id, name)] = (value, signature)
+        if value != previous:
+            print(f"🔄 설정 파일 변경 감지 ({bot_id}): {name}", flush=True)
+            self._notify(bot_id, name, value)
+
+    def subscribe(self, callback, bot_id=None):
+        """변경 리스너 등록 (bot_id가 None이면 모든 봇의 변경을 받음)"""
+        with self._lock:
+            self._listeners.append((bot_id, callback))
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._listeners = [(bid, cb) for bid, cb in self._listeners if cb != callback]
+
+    def _notify(self, bot_id, name, value):
+        with self._lock:
+            listeners = [cb for bid, cb in self._listeners if bid is None or bid == bot_id]
+        for callback in listeners:
+            try:
+                callback(bot_id, name, copy.deepcopy(value))
+            except Exception as e:
+                print(f"⚠️ 설정 변경 알림 실패 ({bot_id}, {name}): {e}", flush=True)
+
+
+config_store = ConfigStore()
+
+
+def config_watch_thread():
+    """백그라운드에서 설정 파일 외부 수정 감지"""
+    while True:
+        time.sleep(CONFIG_WATCH_INTERVAL)
+        try:
+            config_store.check_files()
+        except Exception as e:
+            print(f"⚠️ 설정 파일 확인 실패: {e}", flush=True)
+
+config_thread = threading.Thread(target=config_watch_thread, daemon=True)
+config_thread.start()
+
+
+def load_user_watched_users(bot_id):
+    """사용자별 watched_users 로드"""
+    return config_store.get(bot_id, 'watched_users') or []
 
 def save_user_watched_users(bot_id, users):
     """사용자별 watched_users 저장"""
-    filepath = get_user_file_path(bot_id, 'watched_users.json')
-    try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(users, f, ensure_ascii=False, indent=2)
-        return True
-    except Exception as e:
-        print(f"⚠️ watched_users 저장 실패 ({bot_id}): {e}")
-        return False
+    return config_store.set(bot_id, 'watched_users', users)
 
 def load_user_priority_keywords(bot_id):
     """사용자별 우선순위 키워드 로드"""
-    filepath = get_user_file_path(bot_id, 'priority_keywords.json')
-    if os.path.exists(filepath):
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"⚠️ priority_keywords 로드 실패 ({bot_id}): {e}")
-            return None
-    return None
+    return config_store.get(bot_id, 'priority_keywords')
 
 def save_user_priority_keywords(bot_id, keywords):
     """사용자별 우선순위 키워드 저장"""
-    filepath = get_user_file_path(bot_id, 'priority_keywords.json')
-    try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(keywords, f, ensure_ascii=False, indent=2)
-        return True
-    except Exception as e:
-        print(f"⚠️ priority_keywords 저장 실패 ({bot_id}): {e}")
-        return False
+    return config_store.set(bot_id, 'priority_keywords', keywords)
 
 def load_user_settings(bot_id):
     """사용자별 설정 로드"""
-    filepath = get_user_file_path(bot_id, 'settings.json')
     default_settings = {
         'notification_sound': True,
-        'claude_enabled': CLAUDE_ENABLED
+        'claude_enabled': CLAUDE_ENABLED,
+        'pinned_channels': []  # 우선 스캔할 채널 ID
     }
-    if os.path.exists(filepath):
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                loaded = json.load(f)
-                # 기본 설정과 병합
-                default_settings.update(loaded)
-                return default_settings
-        except Exception as e:
-            print(f"⚠️ settings 로드 실패 ({bot_id}): {e}")
-            return default_settings
+    loaded = config_store.get(bot_id, 'settings')
+    if isinstance(loaded, dict):
+        # 기본 설정과 병합
+        default_settings.update(loaded)
     return default_settings
 
 def save_user_settings(bot_id, settings):
     """사용자별 설정 저장"""
-    filepath = get_user_file_path(bot_id, 'settings.json')
-    try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(settings, f, ensure_ascii=False, indent=2)
-        return True
-    except Exception as e:
-        print(f"⚠️ settings 저장 실패 ({bot_id}): {e}")
-        return False
+    return config_store.set(bot_id, 'settings', settings)
 
 def get_user_priority_keywords(bot_id):
     """사용자별 우선순위 키워드 가져오기 (기본값 포함)"""
@@ -208,145 +1173,1545 @@ def get_user_priority_keywords(bot_id):
     # 기본 키워드 반환
     return PRIORITY_KEYWORDS.copy()
 
-def load_user_starred_messages(bot_id):
-    """사용자별 별표 메시지 로드"""
-    filepath = get_user_file_path(bot_id, 'starred_messages.json')
-    if os.path.exists(filepath):
+# ============================================================
+# 별표 메시지 저장소 (append-only 로그)
+# ============================================================
+
+STARRED_PAGE_SIZE = 50  # /api/starred 기본 페이지 크기
+STARRED_PAGE_MAX = 200  # /api/starred 최대 페이지 크기
+STARRED_COMPACT_MIN = 100  # 제거/중복 기록이 이 수를 넘고 살아 있는 항목 수보다 많아지면 압축
+
+_starred_logs = {}  # {bot_id: StarredLog}
+_starred_logs_lock = threading.Lock()
+
+
+class StarredLog:
+    """봇별 별표 메시지 append-only 로그
+
+    별표 추가/제거를 starred_messages.log에 한 줄(JSON)씩 덧붙이고, 메모리에는
+    message_id → (순번, 메시지) 인덱스와 순번 목록을 유지한다.
+    - 추가/제거: 인덱스 조회 + 한 줄 append (O(1))
+    - 목록: 최신순 커서(순번) 페이지네이션 (페이지 크기만큼만 읽음)
+    - 제거된 기록이 쌓이면 살아 있는 항목만 임시 파일에 다시 쓴 뒤 교체 (압축)
+    - 여러 프로세스가 같은 파일을 쓸 수 있도록 모든 작업은 starred_messages.log.lock 파일 잠금
+      안에서 하고, 먼저 다른 프로세스가 덧붙인 기록을 읽어 반영한다 (압축도 이를 반영한 뒤 교체).
+      순번은 기록에 함께 저장하므로 압축 후 다시 읽어도 커서가 바뀌지 않는다.
+    """
+
+    def __init__(self, bot_id):
+        self.bot_id = bot_id
+        self.filepath = get_user_file_path(bot_id, 'starred_messages.log')
+        self._lock_path = self.filepath + '.lock'
+        self._lock = threading.Lock()
+        self._reset()
+        with self._locked():
+            legacy_path = self._load_legacy_json()
+            self._sync()
+            if legacy_path is not None:
+                self._finish_migration(legacy_path)
+            self._maybe_compact()
+
+    def _reset(self):
+        self._entries = {}  # {message_id: (seq, message)}
+        self._order = []  # 추가 순서의 [(seq, message_id)] (제거된 항목은 압축 전까지 남음)
+        self._next_seq = 1
+        self._dead = 0  # 로그에서 더 이상 유효하지 않은 기록 수
+        self._file_id = None  # 읽고 있는 로그 파일 (st_dev, st_ino), 다른 프로세스가 압축하면 바뀜
+        self._offset = 0  # 로그에서 읽은 바이트 수
+
+    @contextmanager
+    def _locked(self):
+        """스레드 잠금 + 프로세스 간 파일 잠금 (fcntl이 없으면 프로세스 안에서만 잠금)"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _sync(self):
+        """마지막으로 읽은 위치 이후의 기록 반영 (다른 프로세스가 압축하여 파일이 바뀌었으면 처음부터)"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            stat = os.stat(self.filepath)
+        except FileNotFoundError:
+            return
+        file_id = (stat.st_dev, stat.st_ino)
+        if self._file_id is not None and (file_id != self._file_id or stat.st_size < self._offset):
+            self._reset()
+        self._file_id = file_id
+        if stat.st_size == self._offset:
+            return
+        try:
+            with open(self.filepath, 'rb') as f:
+                f.seek(self._offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # 잠금 안에서 끝나지 않은 줄은 저장 도중 종료된 흔적 → 다음 기록과 붙지 않도록 잘라냄
+                        self._dead += 1
+                        os.truncate(self.filepath, self._offset)
+                        break
+                    self._offset += len(line)
+                    self._apply_line(line)
         except Exception as e:
-            print(f"⚠️ starred_messages 로드 실패 ({bot_id}): {e}", flush=True)
-            return []
-    return []
+            print(f"⚠️ starred_messages 로드 실패 ({self.bot_id}): {e}", flush=True)
 
-def save_user_starred_messages(bot_id, starred_messages):
-    """사용자별 별표 메시지 저장"""
-    filepath = get_user_file_path(bot_id, 'starred_messages.json')
-    try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(starred_messages, f, ensure_ascii=False, indent=2)
-        return True
-    except Exception as e:
-        print(f"⚠️ starred_messages 저장 실패 ({bot_id}): {e}", flush=True)
-        return False
+    def _apply_line(self, line):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            self._dead += 1
+            return
+        if record.get('op') == 'add':
+            self._apply_add(record['message'], record.get('seq'))
+        elif record.get('op') == 'remove':
+            self._apply_remove(record['message_id'])
+            self._dead += 1
+
+    def _load_legacy_json(self):
+        """이전 형식(starred_messages.json 전체 목록)이 남아 있으면 메모리에 적재하고 경로 반환"""
+        old_path = get_user_file_path(self.bot_id, 'starred_messages.json')
+        if not os.path.exists(old_path):
+            return None
+        try:
+            with open(old_path, 'r', encoding='utf-8') as f:
+                messages = json.load(f)
+        except Exception as e:
+            print(f"⚠️ starred_messages 변환 실패 ({self.bot_id}): {e}", flush=True)
+            return None
+        for message in sorted(messages, key=lambda msg: msg.get('starred_at', 0)):
+            if message.get('message_id'):
+                self._apply_add(message)
+        return old_path
 
-# 우선순위 분류 함수
-def classify_message_by_keywords(text, keywords=None):
-    """키워드 기반 빠른 우선순위 분류"""
-    if keywords is None:
-        keywords = PRIORITY_KEYWORDS
+    def _finish_migration(self, old_path):
+        """변환한 항목을 로그로 기록한 뒤에만 원본을 .migrated로 변경
 
-    text_lower = text.lower()
+        로그 기록에 실패하면 원본을 그대로 두어, 다음 실행 때 원본 + 그 사이의 로그 기록으로 다시 변환한다.
+        """
+        if not self._compact():
+            return
+        os.replace(old_path, old_path + '.migrated')
+        print(f"♻️ 별표 메시지 {len(self._entries)}개를 로그 형식으로 변환 ({self.bot_id})", flush=True)
+
+    def _apply_add(self, message, seq=None):
+        message_id = message['message_id']
+        if message_id in self._entries:
+            self._dead += 1
+            return False
+        if seq is None or seq < self._next_seq:
+            seq = self._next_seq
+        self._next_seq = seq + 1
+        self._entries[message_id] = (seq, message)
+        self._order.append((seq, message_id))
+        return True
 
-    # Critical 키워드 확인
-    for keyword in keywords.get('critical', []):
-        if keyword.lower() in text_lower:
-            return 'critical', f'키워드 매칭: {keyword}'
+    def _apply_remove(self, message_id):
+        if self._entries.pop(message_id, None) is None:
+            return False
+        # 추가 기록도 더 이상 유효하지 않음
+        self._dead += 1
+        return True
 
-    # High 키워드 확인
-    for keyword in keywords.get('high', []):
-        if keyword in text_lower:
-            return 'high', f'키워드 매칭: {keyword}'
+    def _append(self, record):
+        with open(self.filepath, 'ab') as f:
+            f.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+            stat = os.fstat(f.fileno())
+        self._file_id = (stat.st_dev, stat.st_ino)
+        self._offset = stat.st_size
+
+    def add(self, message):
+        """별표 추가 (이미 있으면 False). 저장 실패 시 OSError"""
+        with self._locked():
+            self._sync()
+            if message['message_id'] in self._entries:
+                return False
+            self._append({'op': 'add', 'seq': self._next_seq, 'message': message})
+            return self._apply_add(message)
+
+    def remove(self, message_id):
+        """별표 제거 (없으면 False). 저장 실패 시 OSError"""
+        with self._locked():
+            self._sync()
+            if message_id not in self._entries:
+                return False
+            self._append({'op': 'remove', 'message_id': message_id})
+            self._apply_remove(message_id)
+            self._dead += 1
+            self._maybe_compact()
+            return True
+
+    def page(self, limit=STARRED_PAGE_SIZE, cursor=None):
+        """최신순 한 페이지 → (메시지 목록, 다음 커서 또는 None)
+
+        cursor는 이전 페이지 마지막 항목의 순번으로, 그보다 먼저 추가된 항목부터 반환한다.
+        """
+        with self._locked():
+            self._sync()
+            end = bisect.bisect_left(self._order, (cursor, '')) if cursor else len(self._order)
+            messages = []
+            next_cursor = None
+            for index in range(end - 1, -1, -1):
+                seq, message_id = self._order[index]
+                entry = self._entries.get(message_id)
+                if entry is None or entry[0] != seq:
+                    continue
+                if len(messages) == limit:
+                    # 이 페이지 뒤에 항목이 더 있음
+                    next_cursor = last_seq
+                    break
+                messages.append(entry[1])
+                last_seq = seq
+            return messages, next_cursor
+
+    def __len__(self):
+        with self._locked():
+            self._sync()
+            return len(self._entries)
+
+    def _maybe_compact(self):
+        if self._dead > STARRED_COMPACT_MIN and self._dead > len(self._entries):
+            self._compact()
+
+    def _compact(self):
+        """살아 있는 항목만 추가 순서대로 다시 기록 (임시 파일 후 교체, 성공 여부 반환)
+
+        파일 잠금 안에서 _sync()로 다른 프로세스의 기록을 반영한 뒤에 호출한다.
+        """
+        order = [(seq, message_id) for seq, message_id in self._order
+                 if self._entries.get(message_id, (None,))[0] == seq]
+        tmp_path = f"{self.filepath}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                for seq, message_id in order:
+                    record = {'op': 'add', 'seq': seq, 'message': self._entries[message_id][1]}
+                    f.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+            os.replace(tmp_path, self.filepath)
+            stat = os.stat(self.filepath)
+        except Exception as e:
+            print(f"⚠️ starred_messages 압축 실패 ({self.bot_id}): {e}", flush=True)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+        self._order = order
+        self._dead = 0
+        self._file_id = (stat.st_dev, stat.st_ino)
+        self._offset = stat.st_size
+        return True
 
-    # Normal 키워드 확인
-    for keyword in keywords.get('normal', []):
-        if keyword in text_lower:
-            return 'normal', f'키워드 매칭: {keyword}'
 
-    # 기본값
-    return 'normal', '기본 분류'
+def get_starred_log(bot_id):
+    """봇별 별표 메시지 로그 (처음 조회 시 파일에서 적재)"""
+    with _starred_logs_lock:
+        log = _starred_logs.get(bot_id)
+        if log is None:
+            log = StarredLog(bot_id)
+            _starred_logs[bot_id] = log
+        return log
 
-def classify_message_with_claude(text, sender, channel):
-    """Claude API를 사용한 정확한 우선순위 분류 (키워드 매칭 실패 시에만 사용)"""
-    if not CLAUDE_ENABLED:
-        return None, 'Claude API 비활성화'
 
-    try:
-        client = anthropic.Anthropic(api_key=CLAUDE_API_KEY)
+# ============================================================
+# 채널별 워터마크 (재시작 시 이어서 스캔)
+# ============================================================
 
-        prompt = f"""다음 Slack 메시지의 우선순위를 분류해주세요.
+WATERMARK_SCAN_LAG = 2  # 새 메시지가 없어도 스캔 시각보다 이만큼 앞까지 전진 (늦게 보이는 메시지/시계 오차 대비, 초)
+WATERMARK_MAX_CATCHUP = 3600  # 재시작 후 이보다 오래된 메시지는 다시 스캔하지 않음 (초)
 
-메시지: "{text}"
-발신자: {sender}
-채널: {channel}
 
-분류 기준:
-- critical: 즉시 대응 필요 (버그, 장애, 고객 불만, 긴급 요청)
-- high: 빠른 답변 필요 (피드백 요청, 승인 요청, 중요 질문)
-- normal: 일반 메시지 (정보 공유, 업데이트)
-- low: 낮은 우선순위 (잡담, 단순 정보)
+class ChannelWatermarks:
+    """채널/DM별 high-water mark (어디까지 스캔했는지) 관리
 
-다음 JSON 형식으로만 응답하세요 (다른 텍스트 없이):
-{{"priority": "critical|high|normal|low", "reason": "분류 이유 (한 줄)"}}"""
+    각 채널 스캔이 자신의 워터마크만 전진시킨다. 새 메시지가 없는 조용한 채널도
+    스캔 시각까지 전진하므로, 마지막 메시지가 오래전인 채널을 재시작 후 처음부터
+    다시 훑지 않는다. 모니터링 대상이 모두 스캔된 시점을 체크포인트로 디스크에
+    저장하여 재시작 시 그 지점부터 이어서 스캔한다.
+    """
 
-        message = client.messages.create(
-            model="claude-3-5-haiku-20241022",
-            max_tokens=200,
-            messages=[{"role": "user", "content": prompt}]
-        )
+    FLUSH_INTERVAL = 2  # 체크포인트 저장 최소 간격 (초)
 
-        # JSON 파싱
-        response_text = message.content[0].text.strip()
-        result = json.loads(response_text)
-        return result['priority'], result['reason']
+    def __init__(self, bot_id, default_since=None):
+        self.filepath = get_user_file_path(bot_id, 'watermarks.json')
+        # 워터마크가 없는 (새로 참여한) 채널의 시작 시점
+        self.default_since = default_since if default_since is not None else time.time() - 10
+        self._marks, self._checkpoint = self._load()  # {channel_id: ts 문자열}, 마지막 체크포인트
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_flush = 0
 
-    except Exception as e:
-        print(f"⚠️ Claude API 오류: {e}")
-        return None, f'API 오류: {str(e)}'
+    def _load(self):
+        if os.path.exists(self.filepath):
+            try:
+                with open(self.filepath, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if 'channels' not in data:
+                    # 이전 형식 ({channel_id: ts}, 체크포인트 없음)
+                    return data, None
+                return data.get('channels') or {}, data.get('checkpoint')
+            except Exception as e:
+                print(f"⚠️ watermarks 로드 실패 ({self.filepath}): {e}")
+        return {}, None
+
+    def get(self, channel_id):
+        """채널의 워터마크 (Slack ts 문자열, WATERMARK_MAX_CATCHUP보다 오래전이면 그 시점)"""
+        floor = time.time() - WATERMARK_MAX_CATCHUP
+        with self._lock:
+            mark = self._marks.get(channel_id)
+            unmarked_since = self._unmarked_since()
+        if mark is not None and float(mark) >= floor:
+            return mark
+        since = unmarked_since if mark is None else float(mark)
+        return f"{max(since, floor):.6f}"
+
+    def _unmarked_since(self):
+        """워터마크가 없는 채널의 시작 시점 (체크포인트 이전은 다시 보지 않음, _lock 안에서 호출)"""
+        if self._checkpoint is not None and self._checkpoint > self.default_since:
+            return self._checkpoint
+        return self.default_since
+
+    def advance(self, channel_id, ts):
+        """채널 워터마크를 ts까지 전진 (뒤로 가지 않음)"""
+        with self._lock:
+            current = self._marks.get(channel_id)
+            if current is None or float(ts) > float(current):
+                self._marks[channel_id] = ts
+                self._dirty = True
+
+    def mark_scanned(self, channel_id, messages, scanned_at):
+        """스캔을 마친 채널의 워터마크 전진 (새 메시지가 없어도 스캔 시각 직전까지)
+
+        scanned_at은 조회 요청 전에 잰 시각이다. 받은 메시지 중 가장 최신 ts와
+        scanned_at - WATERMARK_SCAN_LAG 중 늦은 쪽까지 전진한다.
+        """
+        mark = f"{scanned_at - WATERMARK_SCAN_LAG:.6f}"
+        if messages:
+            latest = max((msg["ts"] for msg in messages), key=float)
+            if float(latest) > float(mark):
+                mark = latest
+        self.advance(channel_id, mark)
+
+    def checkpoint(self, channel_ids):
+        """현재 모니터링 대상 채널/DM이 모두 스캔된 시점을 체크포인트로 기록 (뒤로 가지 않음)
+
+        나간 채널의 오래된 워터마크는 체크포인트를 붙잡지 않도록 현재 대상만 본다.
+        """
+        if not channel_ids:
+            return
+        with self._lock:
+            unmarked_since = self._unmarked_since()
+            point = min(float(self._marks.get(channel_id, unmarked_since)) for channel_id in channel_ids)
+            if self._checkpoint is None or point > self._checkpoint:
+                self._checkpoint = point
+                self._dirty = True
+
+    def resume_point(self):
+        """마지막 체크포인트 (없으면 None, WATERMARK_MAX_CATCHUP보다 오래전이면 그 시점)"""
+        with self._lock:
+            checkpoint = self._checkpoint
+        if checkpoint is None:
+            return None
+        return max(checkpoint, time.time() - WATERMARK_MAX_CATCHUP)
+
+    def flush(self, force=False):
+        """변경된 워터마크를 디스크에 저장 (임시 파일 후 교체)"""
+        with self._lock:
+            if not self._dirty or (not force and time.time() - self._last_flush < self.FLUSH_INTERVAL):
+                return
+            data = {'checkpoint': self._checkpoint, 'channels': dict(self._marks)}
+            self._dirty = False
+            self._last_flush = time.time()
+
+        tmp_path = self.filepath + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.filepath)
+        except Exception as e:
+            print(f"⚠️ watermarks 저장 실패 ({self.filepath}): {e}")
+            with self._lock:
+                self._dirty = True
 
-def classify_message_priority(text, sender='', channel='', keywords=None):
-    """하이브리드 우선순위 분류 (키워드 + Claude API)"""
-    # 1단계: 빠른 키워드 필터링
-    priority, reason = classify_message_by_keywords(text, keywords)
 
-    # Critical 또는 High가 아니면 Claude API로 재검증 (선택적)
-    if CLAUDE_ENABLED and priority == 'normal' and len(text) > 20:
-        # 일부 메시지만 Claude로 검증 (비용 절감)
-        claude_priority, claude_reason = classify_message_with_claude(text, sender, channel)
-        if claude_priority:
-            return claude_priority, f'Claude: {claude_reason}'
+def load_watermark_resume_point(bot_id):
+    """사용자별 저장된 체크포인트 (마지막으로 모든 채널을 스캔한 시점, 없으면 None)"""
+    return ChannelWatermarks(bot_id).resume_point()
 
-    return priority, reason
 
+# ============================================================
+# 채널별 적응형 스캔 스케줄러
+# ============================================================
 
-class SlackNotifier:
-    def __init__(self, token, bot_id=None):
-        self.token = token
-        self.headers = {"Authorization": f"Bearer {token}"}
-        self.bot_user_id = bot_id
-        self.watched_users = []
-        self.watched_user_ids = []  # username을 user_id로 변환한 캐시
-        self.team_url = None  # 워크스페이스 URL
-        # 우선순위 키워드 (사용자별)
-        self.priority_keywords = None
-        # 정규표현식 컴파일 (성능 향상)
-        self.mention_pattern = re.compile(r'<@([A-Z0-9]+)>')
-        # HTTP 세션 재사용 (연결 풀링으로 성능 향상)
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
-        # 타임아웃 설정 (connect timeout: 5초, read timeout: 10초)
-        self.timeout = (5, 10)
-        # User Group 캐시 (ID -> handle 매핑)
-        self._usergroups_cache = {}  # {subteam_id: handle}
-        self._usergroups_cache_time = 0  # 캐시 생성 시간
-        self._usergroups_cache_ttl = 600  # 10분 TTL
-        # User Group 멤버 캐시 (ID -> members 매핑)
-        self._usergroup_members_cache = {}  # {subteam_id: [user_ids]}
-        self._usergroup_members_cache_time = {}  # {subteam_id: timestamp}
-        self._usergroup_members_cache_ttl = 300  # 5분 TTL
+CHANNEL_SCAN_MIN_INTERVAL = 0.5  # 가장 활발한 채널의 스캔 간격 (초)
+CHANNEL_SCAN_MAX_STALENESS = 30  # 조용한 채널도 최소 이 주기로는 스캔 (초)
+PRIORITY_SCAN_MAX_STALENESS = 2  # DM/고정 채널의 최대 스캔 간격 (초)
+DM_ACTIVE_WINDOW = 600  # 마지막 메시지가 이 시간 안인 DM만 우선 스캔 (초)
+DM_IDLE_MAX_STALENESS = 10  # 최근 활동이 없고 DM 목록에 활동 정보도 없는 DM의 최대 스캔 간격 (초)
+CHANNEL_SCAN_BUDGET = 50  # 한 사이클에 스캔하는 채널 수 한도 (DM/고정 채널, 최대 간격을 넘긴 채널은 제외)
+CHANNEL_RATE_ALPHA = 0.3  # 메시지 속도 EWMA 가중치 (클수록 최근 스캔 결과를 크게 반영)
+CHANNEL_TARGET_MESSAGES_PER_SCAN = 1  # 스캔 한 번에 새 메시지가 이 정도 쌓이는 간격으로 스캔
+SCAN_CAPACITY_WARN_INTERVAL = 300  # 스캔 한도 부족 경고 최소 간격 (초)
+
+
+class ChannelScanScheduler:
+    """채널별 메시지 속도(EWMA)에 따라 채널마다 스캔 간격을 따로 정하는 스케줄러
+
+    - 간격 = 목표 메시지 수 / 메시지 속도 (CHANNEL_SCAN_MIN_INTERVAL ~ 최대 간격 사이)
+    - DM과 사용자가 고정한 채널은 최대 간격이 PRIORITY_SCAN_MAX_STALENESS이고 항상 먼저 스캔
+      (단, DM_ACTIVE_WINDOW 안에 메시지를 본 적 없는 DM은 DM 목록(conversations.list)이나 푸시 이벤트에
+      새 활동이 보일 때까지 스캔하지 않고, 목록에 활동 정보가 없으면 DM_IDLE_MAX_STALENESS 간격으로만 확인)
+    - 최대 간격을 넘긴 채널은 CHANNEL_SCAN_BUDGET과 관계없이 스캔
+    - 나머지 스캔 시점이 된 채널은 밀린 정도 순으로 CHANNEL_SCAN_BUDGET개까지 스캔
+    - capacity(rate limiter에 남은 토큰 수)가 주어지면 한 사이클에 그 이상 제출하지 않음
+      (나머지는 밀린 순서를 유지한 채 다음 사이클로 넘어가고, limiter 안에서 줄 서지 않음)
+    - 목표 간격을 지키는 데 필요한 호출 속도가 한도를 넘으면 예상 최대 지연과 함께 경고
+    """
+
+    def __init__(self, pinned_channels=(), budget=CHANNEL_SCAN_BUDGET):
+        self.budget = budget
+        self.pinned = set(pinned_channels)
+        self._state = {}  # {channel_id: {"rate", "last_scan", "last_activity", "priority", "dm", "listed"}}
+        self._lock = threading.Lock()
+        self._capacity_warned_at = 0  # 마지막 한도 부족 경고 시각
+        self.over_capacity = False  # 최근 사이클에서 목표 간격을 지킬 수 없었는지
+
+    def set_pinned(self, channel_ids):
+        with self._lock:
+            self.pinned = set(channel_ids)
+
+    @staticmethod
+    def _new_state():
+        return {"rate": 0.0, "last_scan": None, "last_activity": None, "priority": False, "dm": False, "listed": False}
+
+    @staticmethod
+    def _idle_dm(state, now):
+        """최근 DM_ACTIVE_WINDOW 안에 메시지를 보지 못한 DM"""
+        return state["dm"] and (state["last_activity"] is None or now - state["last_activity"] > DM_ACTIVE_WINDOW)
+
+    def _dormant_dm(self, state, now):
+        """DM 목록의 활동 정보로 새 메시지가 없다고 알 수 있는 조용한 DM (스캔하지 않음)"""
+        return state["listed"] and state["last_scan"] is not None and self._idle_dm(state, now)
+
+    def _interval(self, state, now):
+        if not state["priority"]:
+            max_interval = CHANNEL_SCAN_MAX_STALENESS
+        elif self._idle_dm(state, now):
+            max_interval = DM_IDLE_MAX_STALENESS
+        else:
+            max_interval = PRIORITY_SCAN_MAX_STALENESS
+        if state["rate"] <= 0:
+            return max_interval
+        return min(max(CHANNEL_TARGET_MESSAGES_PER_SCAN / state["rate"], CHANNEL_SCAN_MIN_INTERVAL), max_interval)
+
+    def interval(self, channel_id):
+        """채널의 현재 스캔 간격 (초, 처음 보는 채널은 0)"""
+        with self._lock:
+            state = self._state.get(channel_id)
+            return 0 if state is None else self._interval(state, time.time())
+
+    def select(self, channel_ids, priority_ids=(), now=None, capacity=None, call_rate=None):
+        """이번 사이클에 스캔할 채널 목록 (스캔 순서대로)
+
+        capacity는 지금 쓸 수 있는 conversations.history 토큰 수, call_rate는 초당 충전량.
+        """
+        now = time.time() if now is None else now
+        priority_ids = set(priority_ids)
+        forced, due = [], []  # [(정렬 키, channel_id)]
+        demand = 0.0  # 모든 채널을 목표 간격 안에 스캔하는 데 필요한 초당 호출 수
+
+        with self._lock:
+            # 봇이 나간 채널 정리
+            active = set(channel_ids)
+            for channel_id in [cid for cid in self._state if cid not in active]:
+                del self._state[channel_id]
+
+            for channel_id in channel_ids:
+                state = self._state.get(channel_id)
+                if state is None:
+                    state = self._state[channel_id] = self._new_state()
+                state["dm"] = channel_id in priority_ids
+                state["priority"] = state["dm"] or channel_id in self.pinned
+                # 최근 활동이 없는 DM은 우선 대상이지만 오래된 채널과 같은 순위로 스캔
+                urgent = state["priority"] and not self._idle_dm(state, now)
+                if self._dormant_dm(state, now):
+                    continue
+                demand += 1.0 / self._interval(state, now)
 
-    def test_connection(self):
-        """Slack 연결 테스트 및 봇 정보 가져오기"""
-        try:
-            response = self.session.get("https://slack.com/api/auth.test", timeout=self.timeout)
-            data = response.json()
+                if state["last_scan"] is None:
+                    # 처음 보는 채널은 바로 스캔
+                    forced.append(((0 if urgent else 1, 0), channel_id))
+                    continue
 
-            print(f"\n=== auth.test 응답 ===")
-            print(f"Response: {data}")
-            print(f"=" * 50)
+                elapsed = now - state["last_scan"]
+                interval = self._interval(state, now)
+                if elapsed < interval:
+                    continue
+                overdue = elapsed / interval  # 밀린 정도 (1 이상)
+                if urgent:
+                    forced.append(((0, -overdue), channel_id))
+                elif state["priority"]:
+                    forced.append(((1, -overdue), channel_id))
+                elif elapsed >= CHANNEL_SCAN_MAX_STALENESS:
+                    forced.append(((1, -overdue), channel_id))
+                else:
+                    due.append(((2, -overdue), channel_id))
+
+        forced.sort()
+        due.sort()
+        selected = forced + due[:max(0, self.budget - len(forced))]
+        if capacity is not None:
+            # limiter에 남은 토큰만큼만 제출 (최소 1개는 제출하여 토큰이 차는 대로 진행)
+            selected = selected[:max(1, capacity)]
+        if call_rate is not None:
+            self._check_capacity(len(channel_ids), demand, call_rate, now)
+        return [channel_id for _, channel_id in selected]
+
+    def _check_capacity(self, channel_count, demand, call_rate, now):
+        """필요한 호출 속도가 rate limit을 넘으면 (SCAN_CAPACITY_WARN_INTERVAL마다) 경고"""
+        self.over_capacity = call_rate > 0 and demand > call_rate
+        if not self.over_capacity or now - self._capacity_warned_at < SCAN_CAPACITY_WARN_INTERVAL:
+            return
+        self._capacity_warned_at = now
+        print(f"⚠️ 스캔 한도 부족: 채널/DM {channel_count}개를 목표 간격(최대 {CHANNEL_SCAN_MAX_STALENESS}초) 안에 "
+              f"확인하려면 초당 {demand:.1f}회가 필요하지만 conversations.history 한도는 초당 {call_rate:.2f}회입니다. "
+              f"조용한 채널의 지연이 최대 약 {channel_count / call_rate:.0f}초까지 늘어날 수 있습니다 "
+              f"(SLACK_RATE_LIMIT_MULTIPLIER 또는 푸시 수신 사용 권장)", flush=True)
+
+    def record(self, channel_id, message_count, scanned_at, oldest=None, latest_ts=None):
+        """스캔 결과 반영: 지난 스캔(처음이면 oldest) 이후 새 메시지 수로 속도 갱신
+
+        latest_ts는 이번 스캔에서 본 가장 최신 메시지 ts (DM 활동 판정용)
+        """
+        with self._lock:
+            state = self._state.get(channel_id)
+            if state is None:
+                state = self._state[channel_id] = self._new_state()
+            if latest_ts is not None:
+                state["last_activity"] = max(state["last_activity"] or 0, float(latest_ts))
+            since = state["last_scan"]
+            if since is None and oldest is not None:
+                since = float(oldest)
+            if since is not None and scanned_at > since:
+                rate = message_count / max(scanned_at - since, CHANNEL_SCAN_MIN_INTERVAL)
+                if state["last_scan"] is None:
+                    state["rate"] = rate
+                else:
+                    state["rate"] = CHANNEL_RATE_ALPHA * rate + (1 - CHANNEL_RATE_ALPHA) * state["rate"]
+            state["last_scan"] = scanned_at
+
+    def note_listed_activity(self, activity):
+        """DM 목록(conversations.list)의 DM별 최근 활동 시각 {dm_id: ts 또는 None} 반영
+
+        활동 시각이 있는 DM은 새 활동이 보일 때까지 스캔하지 않고, 없는(None) DM은 간격 스캔을 유지한다.
+        """
+        with self._lock:
+            for channel_id, ts in activity.items():
+                state = self._state.get(channel_id)
+                if state is None:
+                    continue
+                state["listed"] = ts is not None
+                if ts is not None:
+                    state["last_activity"] = max(state["last_activity"] or 0, ts)
+
+    def note_activity(self, channel_id, ts):
+        """푸시 이벤트로 알게 된 새 메시지 반영 (DM이면 활동 중으로 보고 우선 스캔 대상으로 복귀)"""
+        with self._lock:
+            state = self._state.get(channel_id)
+            if state is None:
+                return
+            state["last_activity"] = max(state["last_activity"] or 0, float(ts))
+
+    def next_due_in(self, now=None):
+        """가장 먼저 스캔 시점이 되는 채널까지 남은 시간 (초)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            if not self._state:
+                return 0
+            waits = []
+            for state in self._state.values():
+                if state["last_scan"] is None:
+                    return 0
+                if self._dormant_dm(state, now):
+                    continue
+                waits.append(state["last_scan"] + self._interval(state, now) - now)
+        return max(0, min(waits)) if waits else DM_ACTIVITY_REFRESH
+
+    def stats(self):
+        """스캔 간격 분포 (로그/메트릭용)"""
+        now = time.time()
+        with self._lock:
+            intervals = [self._interval(state, now) for state in self._state.values()]
+            idle_dms = sum(1 for state in self._state.values() if self._idle_dm(state, now))
+            dormant_dms = sum(1 for state in self._state.values() if self._dormant_dm(state, now))
+        return {
+            "channels": len(intervals),
+            "idle_dms": idle_dms,
+            "dormant_dms": dormant_dms,
+            "hot": sum(1 for interval in intervals if interval <= CHANNEL_SCAN_MIN_INTERVAL * 2),
+            "dormant": sum(1 for interval in intervals if interval >= CHANNEL_SCAN_MAX_STALENESS),
+            "over_capacity": self.over_capacity,
+        }
 
-            if data.get("ok"):
+# ============================================================
+# 우선순위 키워드 매칭 (Aho–Corasick)
+# ============================================================
+
+PRIORITY_TIERS = ('critical', 'high', 'normal')  # 높은 우선순위부터
+
+# 봇별 컴파일된 키워드 매처 캐시 (키워드 변경 시에만 재생성)
+_keyword_matchers = {}  # {bot_id: KeywordMatcher}
+_keyword_matcher_generations = defaultdict(int)  # {bot_id: 무효화 횟수} (무효화 전에 읽은 키워드로 만든 매처 저장 방지)
+_keyword_matchers_lock = threading.Lock()
+
+
+class KeywordMatcher:
+    """우선순위 키워드 Aho–Corasick 자동자
+
+    텍스트를 한 번만 순회하여 모든 tier의 키워드 매칭을 찾는다 (대소문자 무시).
+    """
+
+    def __init__(self, keywords):
+        self._goto = [{}]     # 상태별 전이 {문자: 다음 상태}
+        self._fail = [0]      # 실패 링크
+        self._output = [[]]   # 상태에서 끝나는 키워드 [(keyword, tier, index)]
+
+        tiers = [t for t in PRIORITY_TIERS if t in keywords] + [t for t in keywords if t not in PRIORITY_TIERS]
+        for tier in tiers:
+            for index, keyword in enumerate(keywords.get(tier, [])):
+                if keyword:
+                    self._add(keyword, tier, index)
+        self._build_fail_links()
+
+    def _add(self, keyword, tier, index):
+        state = 0
+        for ch in keyword.lower():
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][ch] = next_state
+            state = next_state
+        self._output[state].append((keyword, tier, index))
+
+    def _build_fail_links(self):
+        bfs = list(self._goto[0].values())
+        for state in bfs:
+            for ch, next_state in self._goto[state].items():
+                bfs.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text):
+        """텍스트에 포함된 모든 키워드 [(keyword, tier, index)] (중복 제외, 등장 순)"""
+        matches = []
+        seen = set()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for ch in text.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for match in output[state]:
+                if match not in seen:
+                    seen.add(match)
+                    matches.append(match)
+        return matches
+
+    @staticmethod
+    def classify_matches(matches):
+        """매칭 결과로 우선순위 결정 (가장 높은 tier, 그 tier의 목록 순서상 첫 키워드)"""
+        for tier in PRIORITY_TIERS:
+            tier_matches = [m for m in matches if m[1] == tier]
+            if tier_matches:
+                keyword = min(tier_matches, key=lambda m: m[2])[0]
+                return tier, f'키워드 매칭: {keyword}'
+        # 기본값
+        return 'normal', '기본 분류'
+
+
+@lru_cache(maxsize=64)
+def _compile_keywords(signature):
+    return KeywordMatcher({tier: list(words) for tier, words in signature})
+
+
+def compile_priority_keywords(keywords=None):
+    """키워드 dict를 KeywordMatcher로 변환 (같은 내용이면 캐시된 매처 재사용)"""
+    if isinstance(keywords, KeywordMatcher):
+        return keywords
+    if keywords is None:
+        keywords = PRIORITY_KEYWORDS
+    signature = tuple(sorted((tier, tuple(words)) for tier, words in keywords.items()))
+    return _compile_keywords(signature)
+
+
+def get_bot_keyword_matcher(bot_id):
+    """봇별 키워드 매처 (캐시, /api/priority/keywords 변경 시 재생성)
+
+    매처는 잠금 밖에서 만들고, 그 사이 무효화(세대 증가)가 있었으면 캐시에 저장하지 않는다.
+    """
+    with _keyword_matchers_lock:
+        matcher = _keyword_matchers.get(bot_id)
+        generation = _keyword_matcher_generations[bot_id]
+    if matcher is None:
+        matcher = KeywordMatcher(get_user_priority_keywords(bot_id))
+        with _keyword_matchers_lock:
+            if _keyword_matcher_generations[bot_id] == generation:
+                _keyword_matchers[bot_id] = matcher
+    return matcher
+
+
+def invalidate_keyword_matcher(bot_id):
+    """봇별 키워드 매처 캐시 무효화"""
+    with _keyword_matchers_lock:
+        _keyword_matcher_generations[bot_id] += 1
+        _keyword_matchers.pop(bot_id, None)
+
+
+def _on_keywords_changed(bot_id, name, value):
+    """키워드 파일이 바뀌면 (API 저장/외부 수정 모두) 매처 캐시 무효화"""
+    if name == 'priority_keywords':
+        invalidate_keyword_matcher(bot_id)
+
+config_store.subscribe(_on_keywords_changed)
+
+
+def match_priority_keywords(text, keywords=None):
+    """텍스트에 포함된 모든 우선순위 키워드와 tier [{"keyword", "tier"}]"""
+    matcher = compile_priority_keywords(keywords)
+    return [{"keyword": keyword, "tier": tier} for keyword, tier, _ in matcher.find_all(text)]
+
+
+# 우선순위 분류 함수
+def classify_message_by_keywords(text, keywords=None, keyword_matches=None):
+    """키워드 기반 빠른 우선순위 분류
+
+    keywords는 키워드 dict 또는 KeywordMatcher. keyword_matches를 주면 텍스트를 다시 스캔하지 않는다.
+    """
+    if keyword_matches is None:
+        keyword_matches = compile_priority_keywords(keywords).find_all(text)
+    return KeywordMatcher.classify_matches(keyword_matches)
+
+# ============================================================
+# Claude 우선순위 분류 서비스
+# ============================================================
+
+CLAUDE_MODEL = "claude-3-5-haiku-20241022"
+CLAUDE_DEADLINE = 2.0          # 분류 대기 한도 (초과 시 키워드 결과 사용)
+CLAUDE_BATCH_SIZE = 8          # 한 번의 요청에 묶을 최대 메시지 수
+CLAUDE_BATCH_WINDOW = 0.05     # 배치를 모으는 대기 시간 (초)
+CLAUDE_MAX_CONCURRENCY = 2     # 동시에 진행할 API 요청 수
+CLAUDE_CALLS_PER_MINUTE = 30   # 분당 API 요청 예산
+CLAUDE_CACHE_SIZE = 1000       # 분류 결과 LRU 캐시 크기
+CLAUDE_PRICE_PER_MTOK = {'input': 0.80, 'output': 4.00}  # 백만 토큰당 USD (비용 메트릭 계산용)
+
+
+class ClaudeClassifier:
+    """Claude API 우선순위 분류 서비스
+
+    - 클라이언트 재사용
+    - 정규화된 텍스트 해시 기준 LRU 캐시
+    - 동시에 들어온 메시지를 하나의 프롬프트로 묶는 마이크로 배치
+    - 동시 요청 수 / 분당 요청 예산 제한
+    - deadline 초과 시 (None, 사유)를 반환하여 호출 측이 키워드 결과를 사용
+
+    client를 주입하면 실제 API 없이 동작한다 (messages.create만 필요).
+    """
+
+    PRIORITIES = ('critical', 'high', 'normal', 'low')
+
+    def __init__(self, api_key=None, client=None, model=CLAUDE_MODEL, deadline=CLAUDE_DEADLINE,
+                 batch_size=CLAUDE_BATCH_SIZE, batch_window=CLAUDE_BATCH_WINDOW,
+                 max_concurrency=CLAUDE_MAX_CONCURRENCY, calls_per_minute=CLAUDE_CALLS_PER_MINUTE,
+                 cache_size=CLAUDE_CACHE_SIZE):
+        self.api_key = api_key
+        self._client = client
+        self.model = model
+        self.deadline = deadline
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.calls_per_minute = calls_per_minute
+        self.cache_size = cache_size
+
+        self._cache = OrderedDict()  # {text_hash: (priority, reason)}
+        self._pending = []           # [(text_hash, text, sender, channel)]
+        self._inflight = {}          # {text_hash: Future} 같은 텍스트 중복 요청 방지
+        self._call_times = []        # 최근 1분간 API 요청 시각
+        self._cond = threading.Condition()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._worker = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = anthropic.Anthropic(api_key=self.api_key)
+        return self._client
+
+    @staticmethod
+    def cache_key(text):
+        """정규화된 텍스트 해시 (대소문자, 공백 차이 무시)"""
+        normalized = ' '.join(text.lower().split())
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+    def classify(self, text, sender='', channel='', timeout=None):
+        """메시지 우선순위 분류 → (priority, reason), 실패/시간 초과 시 (None, 사유)"""
+        key = self.cache_key(text)
+
+        with self._cond:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                claude_classifications.inc(source='cache')
+                return cached
+
+            future = self._inflight.get(key)
+            if future is None:
+                future = Future()
+                self._inflight[key] = future
+                self._pending.append((key, text, sender, channel))
+                self._ensure_worker()
+                self._cond.notify_all()
+
+        try:
+            return future.result(timeout=self.deadline if timeout is None else timeout)
+        except FuturesTimeoutError:
+            claude_classifications.inc(source='timeout')
+            return None, 'Claude 응답 시간 초과'
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+
+    def _take_budget(self):
+        """분당 요청 예산 확인 및 차감"""
+        now = time.time()
+        self._call_times = [t for t in self._call_times if now - t < 60]
+        if len(self._call_times) >= self.calls_per_minute:
+            return False
+        self._call_times.append(now)
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+
+            # 배치 모으기: 잠깐 기다려서 동시에 들어온 메시지를 함께 보냄
+            time.sleep(self.batch_window)
+
+            # 동시 요청 수 제한 (슬롯이 빌 때까지 대기하는 동안 배치가 더 쌓임)
+            self._slots.acquire()
+            with self._cond:
+                batch = self._pending[:self.batch_size]
+                self._pending = self._pending[self.batch_size:]
+                has_budget = self._take_budget()
+
+            if not has_budget:
+                self._slots.release()
+                claude_classifications.inc(len(batch), source='budget')
+                self._resolve(batch, None, 'Claude 호출 예산 초과')
+                continue
+
+            threading.Thread(target=self._send_batch, args=(batch,), daemon=True).start()
+
+    def _resolve(self, batch, results, error=None):
+        """배치 결과를 캐시에 저장하고 대기 중인 호출에 전달"""
+        with self._cond:
+            for index, (key, _, _, _) in enumerate(batch):
+                future = self._inflight.pop(key, None)
+                if results is not None and index in results:
+                    result = results[index]
+                    self._cache[key] = result
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+                else:
+                    result = (None, error or 'Claude 응답 누락')
+                if future is not None and not future.done():
+                    future.set_result(result)
+
+    def _build_prompt(self, batch):
+        lines = []
+        for index, (_, text, sender, channel) in enumerate(batch):
+            lines.append(f'{index}. 메시지: {json.dumps(text, ensure_ascii=False)} / 발신자: {sender} / 채널: {channel}')
+        messages_text = '\n'.join(lines)
+
+        return f"""다음 Slack 메시지들의 우선순위를 각각 분류해주세요.
+
+{messages_text}
+
+분류 기준:
+- critical: 즉시 대응 필요 (버그, 장애, 고객 불만, 긴급 요청)
+- high: 빠른 답변 필요 (피드백 요청, 승인 요청, 중요 질문)
+- normal: 일반 메시지 (정보 공유, 업데이트)
+- low: 낮은 우선순위 (잡담, 단순 정보)
+
+다음 JSON 배열 형식으로만 응답하세요 (다른 텍스트 없이, 메시지 번호를 id로):
+[{{"id": 0, "priority": "critical|high|normal|low", "reason": "분류 이유 (한 줄)"}}]"""
+
+    def _record_usage(self, message):
+        """응답의 토큰 사용량을 메트릭에 반영"""
+        usage = getattr(message, 'usage', None)
+        if usage is None:
+            return
+        cost = 0.0
+        for token_type in ('input', 'output'):
+            count = getattr(usage, f'{token_type}_tokens', 0) or 0
+            claude_tokens.inc(count, type=token_type)
+            cost += count * CLAUDE_PRICE_PER_MTOK[token_type] / 1_000_000
+        claude_cost.inc(cost)
+
+    def _send_batch(self, batch):
+        started = time.perf_counter()
+        message = None
+        try:
+            message = self.client.messages.create(
+                model=self.model,
+                max_tokens=80 + 60 * len(batch),
+                messages=[{"role": "user", "content": self._build_prompt(batch)}]
+            )
+            claude_latency.observe(time.perf_counter() - started)
+            claude_requests.inc(status='ok')
+            self._record_usage(message)
+
+            # JSON 파싱 (배열 앞뒤의 불필요한 텍스트 제거)
+            response_text = message.content[0].text.strip()
+            response_text = response_text[response_text.find('['):response_text.rfind(']') + 1]
+            results = {}
+            for item in json.loads(response_text):
+                index = int(item.get('id', -1))
+                priority = item.get('priority')
+                if 0 <= index < len(batch) and priority in self.PRIORITIES:
+                    results[index] = (priority, item.get('reason', ''))
+            claude_classifications.inc(len(results), source='api')
+            self._resolve(batch, results)
+
+        except Exception as e:
+            print(f"⚠️ Claude API 오류: {e}")
+            if message is None:
+                claude_requests.inc(status='error')  # 응답 파싱 실패는 요청 자체는 성공으로 집계
+            claude_classifications.inc(len(batch), source='error')
+            self._resolve(batch, None, f'API 오류: {str(e)}')
+        finally:
+            self._slots.release()
+
+
+claude_classifier = ClaudeClassifier(api_key=CLAUDE_API_KEY) if CLAUDE_ENABLED else None
+
+
+def classify_message_with_claude(text, sender, channel):
+    """Claude API를 사용한 정확한 우선순위 분류 (키워드 매칭 실패 시에만 사용)"""
+    if not CLAUDE_ENABLED or claude_classifier is None:
+        return None, 'Claude API 비활성화'
+
+    return claude_classifier.classify(text, sender, channel)
+
+def classify_message_priority(text, sender='', channel='', keywords=None, keyword_matches=None):
+    """하이브리드 우선순위 분류 (키워드 + Claude API)"""
+    # 1단계: 빠른 키워드 필터링
+    priority, reason = classify_message_by_keywords(text, keywords, keyword_matches)
+
+    # Critical 또는 High가 아니면 Claude API로 재검증 (선택적)
+    if CLAUDE_ENABLED and priority == 'normal' and len(text) > 20:
+        # 일부 메시지만 Claude로 검증 (비용 절감)
+        claude_priority, claude_reason = classify_message_with_claude(text, sender, channel)
+        if claude_priority:
+            return claude_priority, f'Claude: {claude_reason}'
+
+    return priority, reason
+
+
+# ============================================================
+# 사용자 디렉토리 (username → user_id 인덱스)
+# ============================================================
+
+class UserDirectory:
+    """워크스페이스 사용자 디렉토리
+
+    users.list 멤버 목록으로 name / display_name / real_name 필드별 해시 인덱스를 만들어
+    username → user_id 조회를 O(1)로 처리한다. 목록 갱신 시 변경된 멤버만 다시 색인한다.
+    """
+
+    # 조회 우선순위 (name은 워크스페이스 내 고유)
+    NAME_FIELDS = ('name', 'display_name', 'real_name')
+
+    def __init__(self):
+        self._members = {}  # {user_id: member}
+        self._index = {field: defaultdict(set) for field in self.NAME_FIELDS}  # {field: {이름: {user_id}}}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _names(member):
+        return {
+            'name': member.get("name"),
+            'display_name': member.get("profile", {}).get("display_name"),
+            'real_name': member.get("real_name"),
+        }
+
+    def _unindex(self, user_id):
+        member = self._members.pop(user_id, None)
+        if member is None:
+            return
+        for field, name in self._names(member).items():
+            if name:
+                ids = self._index[field].get(name)
+                if ids is not None:
+                    ids.discard(user_id)
+                    if not ids:
+                        del self._index[field][name]
+
+    def _index_member(self, member):
+        user_id = member.get("id")
+        self._members[user_id] = member
+        for field, name in self._names(member).items():
+            if name:
+                self._index[field][name].add(user_id)
+
+    def upsert(self, member):
+        """멤버 한 명 추가/갱신 (users.info 응답 등)"""
+        user_id = member.get("id")
+        if not user_id:
+            return
+        with self._lock:
+            current = self._members.get(user_id)
+            if current is not None and self._names(current) == self._names(member) and current.get("deleted") == member.get("deleted"):
+                self._members[user_id] = member
+                return
+            self._unindex(user_id)
+            self._index_member(member)
+
+    def update(self, members):
+        """users.list 전체 목록으로 갱신 (변경된 멤버만 다시 색인)"""
+        seen = set()
+        for member in members:
+            self.upsert(member)
+            seen.add(member.get("id"))
+        with self._lock:
+            for user_id in [uid for uid in self._members if uid not in seen]:
+                self._unindex(user_id)
+
+    def resolve(self, username):
+        """username → (user_id, 후보 목록)
+
+        하나로 결정되면 (user_id, []), 여러 사용자가 같은 이름이면 (None, [후보 user_id...]),
+        없으면 (None, []).
+        """
+        with self._lock:
+            for field in self.NAME_FIELDS:
+                ids = self._index[field].get(username)
+                if not ids:
+                    continue
+                if len(ids) == 1:
+                    return next(iter(ids)), []
+                # 비활성(삭제된) 사용자를 제외하고 하나로 결정되면 사용
+                active_ids = [uid for uid in ids if not self._members[uid].get("deleted")]
+                if len(active_ids) == 1:
+                    return active_ids[0], []
+                return None, sorted(active_ids or ids)
+        return None, []
+
+    def get(self, user_id):
+        with self._lock:
+            return self._members.get(user_id)
+
+    def __len__(self):
+        return len(self._members)
+
+
+def get_user_directory(cache_key):
+    """워크스페이스별 사용자 디렉토리 (없으면 빈 디렉토리 생성)"""
+    with _user_directories_lock:
+        directory = _user_directories.get(cache_key)
+        if directory is None:
+            directory = UserDirectory()
+            _user_directories[cache_key] = directory
+        return directory
+
+
+# ============================================================
+# 내 활동 피드 (증분 갱신)
+# ============================================================
+
+ACTIVITY_CHANNEL_WINDOW = 100  # 채널별로 확인하는 최근 메시지 수
+ACTIVITY_DM_CHANNELS = 10  # 확인하는 DM 수
+ACTIVITY_DM_WINDOW = 20  # DM별로 확인하는 최근 메시지 수
+ACTIVITY_MIN_REFRESH = 10  # 이 시간 안의 재조회는 피드를 그대로 반환 (초)
+ACTIVITY_FULL_REFRESH_INTERVAL = 300  # 반응 변화 등을 반영하는 전체 재구성 주기 (초)
+ACTIVITY_FEED_MAX = 500  # 피드에 유지하는 최대 활동 수
+
+_activity_feeds = {}  # {(token, bot_user_id): ActivityFeed}
+_activity_feeds_lock = threading.Lock()
+
+
+class ActivityFeed:
+    """사용자별 "내 활동" 피드
+
+    채널/DM별 워터마크 이후의 메시지만 받아 피드에 추가하고, 채널 조회는 병렬로 수행한다.
+    기존 메시지에 달린 반응 등은 ACTIVITY_FULL_REFRESH_INTERVAL마다 최근 메시지를 다시 받아 반영한다.
+    """
+
+    def __init__(self, bot_user_id):
+        self.bot_user_id = bot_user_id
+        self._lock = threading.Lock()
+        self._items = {}  # {(channel_id, ts): activity}
+        self._watermarks = {}  # {channel_id: 마지막으로 확인한 ts}
+        self._my_messages = defaultdict(set)  # {channel_id: 내가 작성한 메시지 ts} (스레드 원본 확인용)
+        self._refreshed_at = 0
+        self._full_refreshed_at = 0
+
+    def latest(self, limit):
+        """최신 활동 limit개 (복사본, 최신순)"""
+        with self._lock:
+            items = sorted(self._items.values(), key=lambda x: float(x.get('ts', 0)), reverse=True)[:limit]
+        return [dict(item) for item in items]
+
+    def refresh(self, notifier):
+        """워터마크 이후 메시지로 피드 갱신 (ACTIVITY_MIN_REFRESH 안에서는 생략)"""
+        now = time.time()
+        if now - self._refreshed_at < ACTIVITY_MIN_REFRESH:
+            return
+        full = now - self._full_refreshed_at >= ACTIVITY_FULL_REFRESH_INTERVAL
+
+        channels = [(ch["id"], ch["name"], "channel", ACTIVITY_CHANNEL_WINDOW)
+                    for ch in notifier.get_channels_with_bot()]
+        try:
+            dm_data = notifier._api_get_all("conversations.list", "channels", {
+                "types": "im"  # Direct Message
+            })
+            if dm_data.get("ok"):
+                channels.extend((dm["id"], "DM", "dm", ACTIVITY_DM_WINDOW)
+                                for dm in dm_data.get("channels", [])[:ACTIVITY_DM_CHANNELS])
+        except Exception as e:
+            print(f"DM 목록 조회 오류: {e}")
+
+        # 채널/DM 병렬 조회
+        futures = {executor.submit(self._fetch, notifier, channel_id, window, full): (channel_id, channel_name, channel_type)
+                   for channel_id, channel_name, channel_type, window in channels}
+        results = []
+        for future in as_completed(futures):
+            messages = future.result()
+            if messages is not None:
+                results.append((futures[future], messages))
+
+        with self._lock:
+            for (channel_id, channel_name, channel_type), messages in results:
+                self._merge(channel_id, channel_name, channel_type, messages, full)
+            self._trim()
+
+        self._refreshed_at = time.time()
+        if full:
+            self._full_refreshed_at = now
+        print(f"=== 내 활동 갱신 ({'전체' if full else '증분'}): {len(channels)}개 채널, 피드 {len(self._items)}개 ===")
+
+    def _fetch(self, notifier, channel_id, window, full):
+        """채널의 새 메시지 (전체 재구성 시 최근 window개, 실패 시 None)"""
+        params = {"channel": channel_id, "limit": window}
+        watermark = self._watermarks.get(channel_id)
+        if watermark and not full:
+            params["oldest"] = watermark
+        try:
+            data = notifier._api_get("conversations.history", params)
+            if data.get("ok"):
+                return data.get("messages", [])
+            print(f"채널 {channel_id} 조회 실패: {data.get('error')}")
+        except Exception as e:
+            print(f"채널 {channel_id} 조회 오류: {e}")
+        return None
+
+    def _merge(self, channel_id, channel_name, channel_type, messages, full):
+        """조회한 메시지를 분류하여 피드에 반영 (self._lock 보유 상태에서 호출)"""
+        if full:
+            for key in [key for key in self._items if key[0] == channel_id]:
+                del self._items[key]
+            self._my_messages[channel_id].clear()
+
+        my_messages = self._my_messages[channel_id]
+        for msg in messages:
+            if msg.get("user") == self.bot_user_id:
+                my_messages.add(msg.get("ts"))
+
+        for msg in messages:
+            if channel_type == "dm":
+                activity = self._classify_dm(msg)
+            else:
+                activity = self._classify(msg, my_messages)
+            if activity:
+                activity_type, icon = activity
+                item = dict(msg)
+                item["activity_type"] = activity_type
+                item["activity_icon"] = icon
+                item["channel_id"] = channel_id
+                item["channel_name"] = channel_name
+                item["channel_type"] = channel_type
+                self._items[(channel_id, msg.get("ts"))] = item
+
+        if messages:
+            newest = max((msg["ts"] for msg in messages), key=float)
+            if channel_id not in self._watermarks or float(newest) > float(self._watermarks[channel_id]):
+                self._watermarks[channel_id] = newest
+
+    def _classify(self, msg, my_messages):
+        """채널 메시지의 활동 종류 (activity_type, icon), 해당 없으면 None"""
+        text = msg.get("text", "")
+        msg_user = msg.get("user")
+
+        # 1) 나에 대한 직접 멘션
+        if f'<@{self.bot_user_id}>' in text:
+            return "멘션", "💬"
+
+        # 2) 내가 보낸 메시지에 대한 스레드 답글
+        if msg.get("thread_ts") and msg.get("thread_ts") != msg.get("ts"):
+            # 원본 메시지가 내가 작성한 것이고, 답글은 다른 사람이 작성한 경우만 포함
+            if msg.get("thread_ts") in my_messages and msg_user != self.bot_user_id:
+                return "스레드 답글", "💭"
+            return None
+
+        # 3) 내 메시지에 대한 반응 (내가 작성한 메시지만)
+        if msg.get("reactions") and msg_user == self.bot_user_id:
+            reactions_text = ", ".join([f":{r['name']}:" for r in msg.get("reactions", [])])
+            return f"반응: {reactions_text}", "❤️"
+
+        # 4) @channel, @here 전체 멘션 (내가 보낸 것이 아닌 경우만)
+        if ("@channel" in text or "@here" in text) and msg_user != self.bot_user_id:
+            return "전체 멘션", "📢"
+
+        return None
+
+    def _classify_dm(self, msg):
+        """내가 받은 DM (상대방이 보낸 메시지)"""
+        if msg.get("user") != self.bot_user_id:
+            return "DM", "✉️"
+        return None
+
+    def _trim(self):
+        if len(self._items) <= ACTIVITY_FEED_MAX:
+            return
+        keep = sorted(self._items, key=lambda key: float(key[1] or 0), reverse=True)[:ACTIVITY_FEED_MAX]
+        self._items = {key: self._items[key] for key in keep}
+
+
+def get_activity_feed(cache_key, bot_user_id):
+    """사용자별 활동 피드 (없으면 새로 생성)"""
+    with _activity_feeds_lock:
+        feed = _activity_feeds.get((cache_key, bot_user_id))
+        if feed is None:
+            feed = ActivityFeed(bot_user_id)
+            _activity_feeds[(cache_key, bot_user_id)] = feed
+        return feed
+
+
+# ============================================================
+# Slack API rate limit 스케줄러
+# ============================================================
+
+# Slack Web API 주소 (벤치마크/테스트 시 로컬 mock 서버로 변경 가능)
+SLACK_API_BASE = os.environ.get('SLACK_API_BASE', 'https://slack.com/api').rstrip('/')
+
+# 요청 우선순위 (숫자가 작을수록 먼저 처리)
+SLACK_PRIORITY_SCAN = 0  # 알림 스캔 (모니터링 폴러)
+SLACK_PRIORITY_UI = 1    # 화면 조회 (채널 메시지, 스레드, 내 활동 등)
+# 같은 버킷에서 여러 우선순위가 대기할 때 토큰을 나누는 비율 (스캔 3 : 화면 1, 어느 쪽도 굶지 않음)
+SLACK_PRIORITY_WEIGHTS = {SLACK_PRIORITY_SCAN: 3, SLACK_PRIORITY_UI: 1}
+
+# Slack Web API tier별 분당 허용 호출 수 (워크스페이스 + 앱 기준)
+SLACK_TIER_LIMITS = {1: 1, 2: 20, 3: 50, 4: 100}
+# 실제 한도는 tier 최소값보다 높을 수 있으므로 배율로 조정 가능
+SLACK_RATE_LIMIT_MULTIPLIER = float(os.environ.get('SLACK_RATE_LIMIT_MULTIPLIER', '1.0'))
+SLACK_METHOD_TIERS = {
+    'auth.test': 4,
+    'users.info': 4,
+    'users.list': 2,
+    'users.conversations': 3,
+    'conversations.list': 2,
+    'conversations.history': 3,
+    'conversations.replies': 3,
+    'bots.info': 3,
+    'usergroups.list': 2,
+    'usergroups.users.list': 2,
+}
+SLACK_DEFAULT_TIER = 3
+SLACK_MAX_RETRIES = 3  # 429 응답 시 재시도 횟수
+SLACK_ACQUIRE_TIMEOUT = {SLACK_PRIORITY_SCAN: 60, SLACK_PRIORITY_UI: 30}  # 토큰 대기 한도 (초)
+# cursor 페이지네이션 페이지 크기 (왕복 횟수를 줄이기 위해 메서드별 최대치 사용)
+SLACK_PAGE_SIZES = {
+    'users.list': 200,
+    'users.conversations': 1000,
+    'conversations.list': 1000,
+    'conversations.history': 200,
+}
+
+
+class _TokenBucket:
+    """메서드별 토큰 버킷"""
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0  # 초당 충전량
+        self.capacity = max(1.0, per_minute / 5.0)  # 순간 버스트 허용량
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0  # Retry-After로 차단된 시각
+        self.waiting = defaultdict(int)  # {priority: 대기자 수}
+        self.passes = defaultdict(float)  # {priority: 가상 시간} (토큰을 받을 때마다 1/가중치씩 증가)
+
+    def enter(self, priority):
+        """대기자 등록 (쉬고 있던 우선순위가 밀린 몫을 한꺼번에 가져가지 않도록 가상 시간을 맞춤)"""
+        if not self.waiting[priority]:
+            active = [self.passes[p] for p, count in self.waiting.items() if count]
+            if active:
+                self.passes[priority] = max(self.passes[priority], min(active))
+        self.waiting[priority] += 1
+
+    def leave(self, priority):
+        self.waiting[priority] -= 1
+
+    def is_turn(self, priority):
+        """대기 중인 우선순위 중 가상 시간이 가장 작은 쪽 차례인지 (같으면 숫자가 작은 우선순위)"""
+        turn = min((self.passes[p], p) for p, count in self.waiting.items() if count)
+        return turn[1] == priority
+
+    def take(self, priority):
+        self.tokens -= 1
+        self.passes[priority] += 1.0 / SLACK_PRIORITY_WEIGHTS.get(priority, 1)
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """다음 토큰을 얻을 수 있을 때까지 남은 시간"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class SlackRateLimiter:
+    """워크스페이스/메서드별 토큰 버킷 기반 Slack API 스케줄러
+
+    - tier 한도에 맞춰 호출 속도 제한
+    - 429 응답의 Retry-After 동안 해당 메서드 호출 중단
+    - 같은 버킷에서 여러 우선순위가 대기 중이면 SLACK_PRIORITY_WEIGHTS 비율로 토큰을 나눔
+      (stride scheduling: 알림 스캔이 더 많이 받지만, 스캔이 밀려 있어도 화면 조회가 계속 진행됨)
+    """
+
+    def __init__(self):
+        self._buckets = {}  # {(workspace, method): _TokenBucket}
+        self._cond = threading.Condition()
+
+    def _bucket(self, workspace, method):
+        key = (workspace, method)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tier = SLACK_METHOD_TIERS.get(method, SLACK_DEFAULT_TIER)
+            bucket = _TokenBucket(SLACK_TIER_LIMITS[tier] * SLACK_RATE_LIMIT_MULTIPLIER)
+            self._buckets[key] = bucket
+        return bucket
+
+    def acquire(self, workspace, method, priority=SLACK_PRIORITY_UI, timeout=None):
+        """호출 토큰 획득 (timeout 안에 못 얻으면 False)"""
+        deadline = time.monotonic() + (timeout if timeout is not None else SLACK_ACQUIRE_TIMEOUT.get(priority, 30))
+
+        with self._cond:
+            bucket = self._bucket(workspace, method)
+            bucket.enter(priority)
+            try:
+                while True:
+                    now = time.monotonic()
+                    bucket.refill(now)
+                    # 다른 우선순위의 차례면 양보 (가중치 비율로 번갈아 받음)
+                    if bucket.is_turn(priority) and now >= bucket.blocked_until and bucket.tokens >= 1:
+                        bucket.take(priority)
+                        return True
+                    if now >= deadline:
+                        return False
+                    self._cond.wait(min(bucket.wait_time(now) or 0.05, deadline - now, 1.0))
+            finally:
+                bucket.leave(priority)
+                self._cond.notify_all()
+
+    async def acquire_async(self, workspace, method, priority=SLACK_PRIORITY_UI, timeout=None):
+        """acquire의 asyncio 버전 (스레드를 막지 않고 asyncio.sleep으로 대기)"""
+        deadline = time.monotonic() + (timeout if timeout is not None else SLACK_ACQUIRE_TIMEOUT.get(priority, 30))
+
+        with self._cond:
+            self._bucket(workspace, method).enter(priority)
+        try:
+            while True:
+                with self._cond:
+                    bucket = self._bucket(workspace, method)
+                    now = time.monotonic()
+                    bucket.refill(now)
+                    if bucket.is_turn(priority) and now >= bucket.blocked_until and bucket.tokens >= 1:
+                        bucket.take(priority)
+                        return True
+                    if now >= deadline:
+                        return False
+                    delay = min(bucket.wait_time(now) or 0.05, deadline - now, 1.0)
+                await asyncio.sleep(delay)
+        finally:
+            with self._cond:
+                self._bucket(workspace, method).leave(priority)
+                self._cond.notify_all()
+
+    def capacity(self, workspace, method):
+        """지금 바로 쓸 수 있는 토큰 수와 초당 충전량 (스캔 스케줄러의 사이클 예산 계산용)"""
+        with self._cond:
+            bucket = self._bucket(workspace, method)
+            now = time.monotonic()
+            bucket.refill(now)
+            available = 0 if now < bucket.blocked_until else int(bucket.tokens)
+            return available, bucket.rate
+
+    def penalize(self, workspace, method, retry_after):
+        """429 응답 처리: Retry-After 동안 해당 메서드 호출 중단"""
+        with self._cond:
+            bucket = self._bucket(workspace, method)
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + retry_after)
+            bucket.tokens = 0
+            self._cond.notify_all()
+
+
+slack_rate_limiter = SlackRateLimiter()
+
+
+class SlackNotifier:
+    def __init__(self, token, bot_id=None):
+        self.token = token
+        self.cache_key = token_cache_key(token)  # 워크스페이스별 캐시 키
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.bot_user_id = bot_id
+        self.watched_users = []
+        self.watched_user_ids = []  # username을 user_id로 변환한 캐시
+        self.ambiguous_watched_users = {}  # {username: [후보 user_id]} 동명이인으로 결정하지 못한 사용자
+        self.team_url = None  # 워크스페이스 URL
+        # 우선순위 키워드 (사용자별)
+        self.priority_keywords = None
+        self.keyword_matcher = None  # 컴파일된 키워드 매처 (있으면 priority_keywords보다 우선)
+        # 정규표현식 컴파일 (성능 향상)
+        self.mention_pattern = re.compile(r'<@([A-Z0-9]+)>')
+        self.subteam_pattern = re.compile(r'<!subteam\^([A-Z0-9]+)(?:\|@([^>]+))?>')
+        # HTTP 세션 재사용 (연결 풀링으로 성능 향상)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        # 타임아웃 설정 (connect timeout: 5초, read timeout: 10초)
+        self.timeout = (5, 10)
+        # rate limit 스케줄러에서 사용할 요청 우선순위 (모니터링 폴러는 SLACK_PRIORITY_SCAN)
+        self.request_priority = SLACK_PRIORITY_UI
+        # 첫 Slack 사용 시 메타데이터 캐시를 열어 warm start (캐시 조회 전에 적재되도록)
+        get_metadata_store()
+
+    def _cached(self, cache, key, flight_key, fetch):
+        """캐시 조회 (없으면 None)
+
+        warm start로 적재된 stale 항목은 값을 그대로 반환하고, 백그라운드에서 한 번 재검증한다.
+        """
+        entry = cache.get_entry(key)
+        if entry is None:
+            return None
+        value, stale = entry
+        if stale and cache.clear_stale(key):
+            executor.submit(_lookup_flight.do, flight_key, fetch)
+        return value
+
+    def _api_get(self, method, params=None, priority=None):
+        """Slack Web API 호출 (rate limit 스케줄링 + 429/Retry-After 재시도)
+
+        응답 JSON을 반환한다. 재시도 한도를 넘기면 {"ok": False, "error": "ratelimited"}.
+        """
+        if priority is None:
+            priority = self.request_priority
+        workspace = self.cache_key
+        workspace_label = metrics_workspace_label(workspace)
+
+        for attempt in range(SLACK_MAX_RETRIES + 1):
+            wait_started = time.perf_counter()
+            acquired = slack_rate_limiter.acquire(workspace, method, priority)
+            slack_rate_limit_wait.observe(time.perf_counter() - wait_started, method=method)
+            if not acquired:
+                print(f"⚠️ Slack API 호출 대기 시간 초과 ({method})", flush=True)
+                slack_api_requests.inc(method=method, workspace=workspace_label, status='throttled')
+                return {"ok": False, "error": "ratelimited"}
+
+            started = time.perf_counter()
+            try:
+                response = self.session.get(
+                    f"{SLACK_API_BASE}/{method}",
+                    params=params,
+                    timeout=self.timeout
+                )
+            except Exception:
+                slack_api_requests.inc(method=method, workspace=workspace_label, status='exception')
+                raise
+            slack_api_latency.observe(time.perf_counter() - started, method=method)
+
+            if response.status_code == 429:
+                slack_api_requests.inc(method=method, workspace=workspace_label, status='ratelimited')
+                try:
+                    retry_after = float(response.headers.get("Retry-After", 1))
+                except ValueError:
+                    retry_after = 1
+                slack_rate_limiter.penalize(workspace, method, retry_after)
+                print(f"⏳ Slack rate limit ({method}): {retry_after}초 후 재시도 ({attempt + 1}/{SLACK_MAX_RETRIES})", flush=True)
+                continue
+
+            data = response.json()
+            slack_api_requests.inc(method=method, workspace=workspace_label, status='ok' if data.get("ok") else 'error')
+            return data
+
+        return {"ok": False, "error": "ratelimited"}
+
+    def iter_pages(self, method, params=None, priority=None):
+        """response_metadata.next_cursor를 따라가는 페이지 iterator
+
+        현재 페이지를 처리하는 동안 다음 페이지를 미리 요청한다. 실패한 페이지를
+        반환한 뒤에는 더 진행하지 않는다.
+        """
+        params = dict(params or {})
+        params.setdefault("limit", SLACK_PAGE_SIZES.get(method, 200))
+
+        # 첫 페이지는 호출한 스레드에서 바로 요청
+        data = self._api_get(method, dict(params), priority)
+        while True:
+            cursor = data.get("response_metadata", {}).get("next_cursor") if data.get("ok") else None
+            if not cursor:
+                yield data
+                return
+
+            params["cursor"] = cursor
+            future = _prefetch_executor.submit(self._api_get, method, dict(params), priority)
+            yield data
+            data = future.result()
+
+    def _api_get_all(self, method, key, params=None, priority=None):
+        """모든 페이지를 조회하여 key 항목을 합친 응답 반환
+
+        한 페이지라도 실패하면 그 페이지의 응답(ok=False)을 그대로 반환한다.
+        """
+        items = []
+        for data in self.iter_pages(method, params, priority):
+            if not data.get("ok"):
+                return data
+            items.extend(data.get(key, []))
+        return {"ok": True, key: items}
+
+    def test_connection(self):
+        """Slack 연결 테스트 및 봇 정보 가져오기"""
+        try:
+            data = self._api_get("auth.test")
+
+            print(f"\n=== auth.test 응답 ===")
+            print(f"Response: {data}")
+            print(f"=" * 50)
+
+            if data.get("ok"):
                 self.bot_user_id = data.get("user_id")
                 # 워크스페이스 URL 저장 (https://[team].slack.com)
                 self.team_url = data.get("url", "")
@@ -383,238 +2748,333 @@ class SlackNotifier:
 
     def get_channels_with_bot(self):
         """봇이 참여한 채널 목록 가져오기 (전역 캐시 + TTL)"""
-        global _global_channel_cache
+        # 전역 캐시 확인 (TTL은 캐시가 확인)
+        flight_key = ("users.conversations", self.cache_key)
+        cached = self._cached(_global_channel_cache, self.cache_key, flight_key, self._fetch_channels)
+        if cached is not None:
+            return cached
 
-        # 전역 캐시 확인
-        cache_key = self.token[:20]  # 토큰 일부를 키로 사용
-        if cache_key in _global_channel_cache:
-            cached = _global_channel_cache[cache_key]
-            # TTL 확인
-            if time.time() - cached["timestamp"] < CACHE_TTL:
-                return cached["data"]
+        channels = _lookup_flight.do(flight_key, self._fetch_channels)
+        return channels if channels is not None else []
 
+    def _fetch_channels(self):
+        """users.conversations 전체 조회 후 캐시 저장 (실패 시 None)"""
         try:
-            response = self.session.get(
-                "https://slack.com/api/users.conversations",
-                params={"types": "public_channel,private_channel"},
-                timeout=self.timeout
-            )
-            data = response.json()
+            data = self._api_get_all("users.conversations", "channels", {"types": "public_channel,private_channel"})
 
             if data.get("ok"):
                 channels = data.get("channels", [])
                 # 전역 캐시 저장
-                _global_channel_cache[cache_key] = {
-                    "data": channels,
-                    "timestamp": time.time()
-                }
+                _global_channel_cache.set(self.cache_key, channels)
+                persist_metadata('channels', self.cache_key, channels)
                 return channels
             else:
-                return []
+                return None
         except Exception as e:
             print(f"채널 조회 오류: {e}")
-            return []
+            return None
 
-    def get_channel_messages(self, channel_id, limit=50):
-        """특정 채널의 메시지 조회 (병렬 처리로 최적화)"""
-        try:
-            response = self.session.get(
-                "https://slack.com/api/conversations.history",
-                params={"channel": channel_id, "limit": limit},
-                timeout=self.timeout
-            )
-            data = response.json()
+    def get_dm_channel_ids(self):
+        """DM 채널 ID 목록 (전역 캐시 + TTL, 스캔마다 conversations.list를 부르지 않음)"""
+        flight_key = ("conversations.list:im", self.cache_key)
+        cached = self._cached(_global_im_cache, self.cache_key, flight_key, self._fetch_dm_channel_ids)
+        if cached is not None:
+            return cached
+
+        dm_ids = _lookup_flight.do(flight_key, self._fetch_dm_channel_ids)
+        return dm_ids if dm_ids is not None else []
 
+    def _fetch_dm_channel_ids(self):
+        """conversations.list(types=im) 전체 조회 후 캐시 저장 (실패 시 None)"""
+        try:
+            data = self._api_get_all("conversations.list", "channels", {
+                "types": "im"  # Direct Message
+            })
             if data.get("ok"):
-                messages = data.get("messages", [])
+                dm_channels = data.get("channels", [])
+                dm_ids = [dm_channel["id"] for dm_channel in dm_channels]
+                _global_im_cache.set(self.cache_key, dm_ids)
+                _global_dm_activity_cache.set(self.cache_key, {dm["id"]: dm_list_activity(dm) for dm in dm_channels})
+                persist_metadata('ims', self.cache_key, dm_ids)
+                return dm_ids
+            return None
+        except Exception as e:
+            print(f"DM 목록 조회 오류: {e}")
+            return None
 
-                if not messages:
-                    return []
+    def get_dm_activity(self):
+        """DM별 최근 활동 시각 {dm_id: ts 또는 None} (DM_ACTIVITY_REFRESH마다 conversations.list 한 번으로 갱신)
 
-                # 사용자 정보 캐시
-                user_cache = {}
-                bot_cache = {}
-
-                # 필요한 모든 사용자 ID와 봇 ID 수집
-                user_ids = set()
-                bot_ids = set()
-                mention_user_ids = set()
-
-                for msg in messages:
-                    # 메시지 작성자
-                    if "user" in msg:
-                        user_ids.add(msg["user"])
-                    elif "bot_id" in msg:
-                        bot_ids.add(msg["bot_id"])
-
-                    # 멘션된 사용자
-                    if "text" in msg:
-                        mentions = self.mention_pattern.findall(msg["text"])
-                        mention_user_ids.update(mentions)
-
-                # 모든 사용자를 병렬로 조회
-                all_user_ids = user_ids | mention_user_ids
-                if all_user_ids:
-                    user_cache = self.get_user_info_batch(list(all_user_ids))
-
-                # 봇 정보 조회 (병렬)
-                if bot_ids:
-                    def fetch_bot(bid):
-                        return bid, self.get_bot_info(bid)
-
-                    futures = [executor.submit(fetch_bot, bid) for bid in bot_ids]
-                    for future in as_completed(futures):
-                        bid, info = future.result()
-                        bot_cache[bid] = info
-
-                # 메시지에 정보 추가
-                for msg in messages:
-                    # 메시지 텍스트에서 사용자 멘션 변환
-                    if "text" in msg:
-                        msg["text"] = self.replace_user_mentions(msg["text"], user_cache)
-
-                    if "user" in msg:
-                        user_id = msg["user"]
-                        user_info = user_cache.get(user_id, {})
-                        msg["user_name"] = self.get_display_name(user_info)
-                        msg["is_bot"] = user_info.get("is_bot", False)
-                    elif "bot_id" in msg:
-                        bot_id = msg["bot_id"]
-                        bot_info = bot_cache.get(bot_id, {})
-                        msg["user_name"] = bot_info.get("name", msg.get("username", "Bot"))
-                        msg["is_bot"] = True
-                    elif "username" in msg:
-                        msg["user_name"] = msg["username"]
-                        msg["is_bot"] = True
-                    else:
-                        msg["user_name"] = "Unknown"
-                        msg["is_bot"] = False
-
-                    # 스레드 정보 추가
-                    if msg.get("thread_ts"):
-                        msg["has_thread"] = True
-                        msg["reply_count"] = msg.get("reply_count", 0)
-                        msg["reply_users_count"] = msg.get("reply_users_count", 0)
-                    else:
-                        msg["has_thread"] = False
+        조용한 DM마다 conversations.history를 부르는 대신, 목록 한 번으로 새 활동이 있는 DM만 골라낸다.
+        """
+        activity = _global_dm_activity_cache.get(self.cache_key)
+        if activity is None:
+            _lookup_flight.do(("conversations.list:im", self.cache_key), self._fetch_dm_channel_ids)
+            activity = _global_dm_activity_cache.get(self.cache_key)
+        return activity or {}
 
-                return messages
-            else:
+    def get_channel_messages(self, channel_id, limit=50):
+        """특정 채널의 메시지 조회 (로컬 아카이브 + delta 동기화, 병렬 처리로 최적화)"""
+        try:
+            messages = self._load_channel_messages(channel_id, limit)
+            if not messages:
                 return []
+            return self._enrich_messages(messages)
         except Exception as e:
             print(f"메시지 조회 오류: {e}")
             return []
 
+    def _load_channel_messages(self, channel_id, limit):
+        """채널의 최신 메시지 limit개 (원본 형태)
+
+        아카이브에 빈틈없이 저장된 구간이 있으면 최신 ts 이후의 delta만 Slack에서 받는다.
+        저장분이 limit보다 적거나 ARCHIVE_RESYNC_INTERVAL이 지나면 최신 페이지 전체를 다시 받는다.
+        """
+        archive = get_message_archive()
+        if archive is None:
+            data = self._api_get("conversations.history", {"channel": channel_id, "limit": limit})
+            return data.get("messages", []) if data.get("ok") else []
+
+        coverage = archive.coverage(self.cache_key, channel_id)
+        now = time.time()
+
+        if (coverage is None
+                or now - coverage["full_synced_at"] >= ARCHIVE_RESYNC_INTERVAL
+                or (not coverage["complete"] and coverage["count"] < limit)):
+            data = self._api_get("conversations.history", {"channel": channel_id, "limit": limit})
+            if not data.get("ok"):
+                return []
+            archive.replace(self.cache_key, channel_id, data.get("messages", []),
+                            data.get("has_more", False), now)
+        elif now - coverage["synced_at"] >= ARCHIVE_FRESH_SECONDS:
+            data = self._api_get_all("conversations.history", "messages", {
+                "channel": channel_id,
+                "oldest": coverage["newest"]
+            })
+            if data.get("ok"):
+                archive.append(self.cache_key, channel_id, coverage["newest"], data.get("messages", []), now)
+            else:
+                # delta 조회 실패 시 저장된 메시지로 응답
+                print(f"⚠️ 채널 {channel_id} delta 조회 실패: {data.get('error')}", flush=True)
+
+        return archive.latest(self.cache_key, channel_id, limit)
+
+    def archive_scanned_messages(self, channel_id, oldest, messages, synced_at):
+        """모니터링 스캔이 받은 oldest 이후 메시지를 아카이브에 이어 붙임"""
+        archive = get_message_archive()
+        if archive is None:
+            return
+        try:
+            archive.append(self.cache_key, channel_id, oldest, messages, synced_at)
+        except Exception as e:
+            print(f"⚠️ 메시지 아카이브 저장 오류: {e}", flush=True)
+
+    def archive_message_event(self, event):
+        """푸시로 받은 수정/삭제 이벤트를 아카이브에 반영"""
+        archive = get_message_archive()
+        if archive is None or event.get("type") != "message":
+            return
+        channel_id = event.get("channel")
+        try:
+            if event.get("subtype") == "message_changed" and event.get("message", {}).get("ts"):
+                archive.update_message(self.cache_key, channel_id, event["message"])
+            elif event.get("subtype") == "message_deleted" and event.get("deleted_ts"):
+                archive.delete_message(self.cache_key, channel_id, event["deleted_ts"])
+        except Exception as e:
+            print(f"⚠️ 메시지 아카이브 갱신 오류: {e}", flush=True)
+
+    def _message_refs(self, messages):
+        """메시지 묶음이 참조하는 사용자 ID(작성자, 멘션)와 봇 ID (user_ids, bot_ids)"""
+        user_ids = set()
+        bot_ids = set()
+        for msg in messages:
+            # 메시지 작성자
+            if "user" in msg:
+                user_ids.add(msg["user"])
+            elif "bot_id" in msg:
+                bot_ids.add(msg["bot_id"])
+
+            # 멘션된 사용자
+            if "text" in msg:
+                user_ids.update(self.mention_pattern.findall(msg["text"]))
+        return user_ids, bot_ids
+
+    def _lookup_message_refs(self, messages):
+        """메시지 묶음이 참조하는 사용자와 봇 정보를 한 번에 조회
+
+        (user_cache, bot_cache)를 반환한다.
+        """
+        user_ids, bot_ids = self._message_refs(messages)
+
+        # 모든 사용자를 병렬로 조회
+        user_cache = self.get_user_info_batch(list(user_ids)) if user_ids else {}
+
+        # 봇 정보 조회 (병렬)
+        bot_cache = {}
+        if bot_ids:
+            def fetch_bot(bid):
+                return bid, self.get_bot_info(bid)
+
+            futures = [_lookup_executor.submit(fetch_bot, bid) for bid in bot_ids]
+            for future in as_completed(futures):
+                bid, info = future.result()
+                bot_cache[bid] = info
+
+        return user_cache, bot_cache
+
+    def _author_name(self, msg, user_cache, bot_cache):
+        """메시지 작성자 표시 이름과 봇 여부 (user_name, is_bot)"""
+        if msg.get("user"):
+            user_info = user_cache.get(msg["user"], {})
+            return self.get_display_name(user_info), user_info.get("is_bot", False)
+        if msg.get("bot_id"):
+            bot_info = bot_cache.get(msg["bot_id"], {})
+            return bot_info.get("name", msg.get("username", "Bot")), True
+        if "username" in msg:
+            return msg["username"], True
+        return "Unknown", False
+
+    def _enrich_messages(self, messages, thread_info=True):
+        """메시지 변환 단계 (채널 메시지, 스레드 답글, 내 활동, 채널 스트림 공통)
+
+        참조하는 사용자/봇을 한 번에 조회한 뒤 작성자 이름, 멘션 변환,
+        스레드 정보(thread_info=True일 때)를 추가한다.
+        """
+        user_cache, bot_cache = self._lookup_message_refs(messages)
+
+        for msg in messages:
+            # 메시지 텍스트에서 사용자 멘션 변환
+            if "text" in msg:
+                msg["text"] = self.replace_user_mentions(msg["text"], user_cache)
+
+            msg["user_name"], msg["is_bot"] = self._author_name(msg, user_cache, bot_cache)
+
+            # 스레드 정보 추가
+            if not thread_info:
+                continue
+            if msg.get("thread_ts"):
+                msg["has_thread"] = True
+                msg["reply_count"] = msg.get("reply_count", 0)
+                msg["reply_users_count"] = msg.get("reply_users_count", 0)
+            else:
+                msg["has_thread"] = False
+
+        return messages
+
     def get_user_info(self, user_id):
         """사용자 정보 조회 (전역 캐시 + TTL)"""
-        global _global_user_cache
-
-        # 전역 캐시 확인
-        if user_id in _global_user_cache:
-            cached = _global_user_cache[user_id]
-            # TTL 확인
-            if time.time() - cached["timestamp"] < CACHE_TTL:
-                return cached["data"]
+        # 전역 캐시 확인 (TTL은 캐시가 확인)
+        cached = self._cached_user(user_id)
+        if cached is not None:
+            return cached
+
+        # 같은 사용자에 대한 동시 캐시 미스는 하나의 요청 결과를 공유
+        return _lookup_flight.do(("users.info", user_id), lambda: self._fetch_user_info(user_id))
+
+    def _cached_user(self, user_id):
+        """캐시된 사용자 정보 (stale이면 백그라운드 재검증)"""
+        return self._cached(_global_user_cache, user_id, ("users.info", user_id),
+                            lambda: self._fetch_user_info(user_id, revalidate=True))
+
+    def _fetch_user_info(self, user_id, revalidate=False):
+        """users.info 호출 후 캐시 저장"""
+        # 앞선 요청이 방금 캐시를 채웠을 수 있음
+        if not revalidate:
+            cached = _global_user_cache.get(user_id)
+            if cached is not None:
+                return cached
 
         try:
-            response = self.session.get(
-                "https://slack.com/api/users.info",
-                params={"user": user_id},
-                timeout=self.timeout
-            )
-            data = response.json()
+            data = self._api_get("users.info", {"user": user_id})
 
             if data.get("ok"):
                 user_info = data.get("user", {})
+                # 사용자 디렉토리 증분 갱신
+                get_user_directory(self.cache_key).upsert(user_info)
                 # 전역 캐시 저장
-                _global_user_cache[user_id] = {
-                    "data": user_info,
-                    "timestamp": time.time()
-                }
+                _global_user_cache.set(user_id, user_info)
+                persist_metadata('user', user_id, user_info)
                 return user_info
             return {}
         except Exception as e:
             print(f"사용자 정보 조회 오류: {e}")
             return {}
 
-    def get_user_id_by_username(self, username):
-        """username으로 user_id 조회 (캐싱 최적화)"""
-        global _global_users_list_cache
+    def get_user_directory(self):
+        """워크스페이스 사용자 디렉토리 (users.list 캐시가 만료되었으면 갱신)"""
+        cache_key = self.cache_key
+        directory = get_user_directory(cache_key)
 
-        try:
-            # 전역 캐시 확인
-            cache_key = self.token[:20]
-            members = None
-
-            if cache_key in _global_users_list_cache:
-                cached = _global_users_list_cache[cache_key]
-                # TTL 확인
-                if time.time() - cached["timestamp"] < USERS_LIST_CACHE_TTL:
-                    members = cached["data"]
-
-            # 캐시 미스 시 API 호출
-            if members is None:
-                response = self.session.get("https://slack.com/api/users.list", timeout=self.timeout)
-                data = response.json()
-
-                if data.get("ok"):
-                    members = data.get("members", [])
-                    # 전역 캐시 저장
-                    _global_users_list_cache[cache_key] = {
-                        "data": members,
-                        "timestamp": time.time()
-                    }
-                else:
-                    return None
+        # TTL 확인
+        if cache_key in _global_users_list_cache and len(directory):
+            return directory
 
-            # username 매칭
-            for member in members:
-                if (member.get("name") == username or
-                    member.get("real_name") == username or
-                    member.get("profile", {}).get("display_name") == username):
-                    return member.get("id")
-
-            return None
+        # 캐시 미스 시 API 호출 후 변경분만 다시 색인
+        data = self._api_get_all("users.list", "members")
+        if data.get("ok"):
+            members = data.get("members", [])
+            directory.update(members)
+            # 전역 캐시 저장
+            _global_users_list_cache.set(cache_key, members)
+        return directory
+
+    def resolve_username(self, username):
+        """username → (user_id, 동명이인 후보 목록)"""
+        try:
+            return self.get_user_directory().resolve(username)
         except Exception as e:
             print(f"username 조회 오류: {e}")
-            return None
+            return None, []
+
+    def get_user_id_by_username(self, username):
+        """username으로 user_id 조회 (인덱스 기반 O(1), 동명이인이면 None)"""
+        user_id, candidates = self.resolve_username(username)
+        if candidates:
+            print(f"⚠️ 사용자 '{username}'와 일치하는 사용자가 여러 명입니다: {', '.join(candidates)}")
+        return user_id
 
     def refresh_watched_user_ids(self):
         """watched_users를 user_id로 변환하여 캐시"""
         self.watched_user_ids = []
+        self.ambiguous_watched_users = {}
         for username in self.watched_users:
-            user_id = self.get_user_id_by_username(username)
+            user_id, candidates = self.resolve_username(username)
             if user_id:
                 self.watched_user_ids.append(user_id)
                 print(f"✅ 감시 사용자 변환: {username} -> {user_id}")
+            elif candidates:
+                self.ambiguous_watched_users[username] = candidates
+                print(f"⚠️ 사용자 '{username}'가 여러 명과 일치하여 감시에서 제외됨: {', '.join(candidates)}")
             else:
                 print(f"⚠️ 사용자 '{username}' 찾을 수 없음")
 
     def get_bot_info(self, bot_id):
         """봇 정보 조회 (전역 캐시 + TTL)"""
-        global _global_bot_cache
-
-        # 전역 캐시 확인
-        if bot_id in _global_bot_cache:
-            cached = _global_bot_cache[bot_id]
-            # TTL 확인
-            if time.time() - cached["timestamp"] < CACHE_TTL:
-                return cached["data"]
+        # 전역 캐시 확인 (TTL은 캐시가 확인, stale이면 백그라운드 재검증)
+        cached = self._cached(_global_bot_cache, bot_id, ("bots.info", bot_id),
+                              lambda: self._fetch_bot_info(bot_id, revalidate=True))
+        if cached is not None:
+            return cached
+
+        # 같은 봇에 대한 동시 캐시 미스는 하나의 요청 결과를 공유
+        return _lookup_flight.do(("bots.info", bot_id), lambda: self._fetch_bot_info(bot_id))
+
+    def _fetch_bot_info(self, bot_id, revalidate=False):
+        """bots.info 호출 후 캐시 저장"""
+        # 앞선 요청이 방금 캐시를 채웠을 수 있음
+        if not revalidate:
+            cached = _global_bot_cache.get(bot_id)
+            if cached is not None:
+                return cached
 
         try:
-            response = self.session.get(
-                "https://slack.com/api/bots.info",
-                params={"bot": bot_id}
-            , timeout=self.timeout)
-            data = response.json()
+            data = self._api_get("bots.info", {"bot": bot_id})
 
             if data.get("ok"):
                 bot_info = data.get("bot", {})
                 # 전역 캐시 저장
-                _global_bot_cache[bot_id] = {
-                    "data": bot_info,
-                    "timestamp": time.time()
-                }
+                _global_bot_cache.set(bot_id, bot_info)
+                persist_metadata('bot', bot_id, bot_info)
                 return bot_info
             return {}
         except Exception as e:
@@ -637,620 +3097,2177 @@ class SlackNotifier:
         if real_name:
             return real_name
 
-        # 3순위: name (사용자 ID)
-        return user_info.get("name", "Unknown")
+        # 3순위: name (사용자 ID)
+        return user_info.get("name", "Unknown")
+
+    def replace_user_mentions(self, text, user_cache):
+        """메시지 텍스트의 <@USER_ID>를 @사용자이름으로 변환 (정규표현식 치환 한 번)
+
+        user_cache에 없는 사용자는 한 번에 묶어 조회한 뒤 user_cache에 채운다.
+        """
+        if '<@' not in text:
+            return text
+
+        missing = {user_id for user_id in self.mention_pattern.findall(text) if user_id not in user_cache}
+        if missing:
+            user_cache.update(self.get_user_info_batch(list(missing)))
+
+        return self.mention_pattern.sub(
+            lambda match: f"@{self.get_display_name(user_cache.get(match.group(1), {}))}", text
+        )
+
+    def get_user_info_batch(self, user_ids):
+        """여러 사용자 정보를 병렬로 조회"""
+        results = {}
+        to_fetch = []
+
+        # 캐시에서 먼저 확인
+        for user_id in user_ids:
+            cached = self._cached_user(user_id)
+            if cached is not None:
+                results[user_id] = cached
+                continue
+            to_fetch.append(user_id)
+
+        # 병렬로 나머지 조회
+        if to_fetch:
+            def fetch_user(uid):
+                return uid, self.get_user_info(uid)
+
+            futures = [_lookup_executor.submit(fetch_user, uid) for uid in to_fetch]
+            for future in as_completed(futures):
+                uid, info = future.result()
+                results[uid] = info
+
+        return results
+
+    def get_thread_replies(self, channel_id, thread_ts):
+        """스레드 답글 조회"""
+        try:
+            data = self._api_get("conversations.replies", {
+                "channel": channel_id,
+                "ts": thread_ts
+            })
+
+            if data.get("ok"):
+                messages = data.get("messages", [])
+
+                if not messages:
+                    return []
+
+                # 첫 번째 메시지는 원본 메시지이므로 제외
+                thread_replies = messages[1:] if len(messages) > 1 else []
+
+                if thread_replies:
+                    self._enrich_messages(thread_replies, thread_info=False)
+                return thread_replies
+            else:
+                return []
+        except Exception as e:
+            print(f"스레드 답글 조회 오류: {e}")
+            return []
+
+    def get_my_activity(self, limit=50):
+        """내 활동 메시지 조회 (멘션, 반응, 스레드, DM 등 모든 활동)
+
+        사용자별 활동 피드를 증분 갱신한 뒤 최신 limit개를 반환한다.
+        """
+        try:
+            feed = get_activity_feed(self.cache_key, self.bot_user_id)
+            # 같은 피드의 동시 갱신은 하나로 합침
+            _lookup_flight.do(("activity", self.cache_key, self.bot_user_id), lambda: feed.refresh(self))
+
+            messages = feed.latest(limit)
+            if not messages:
+                print("=== 멘션 메시지 없음 ===")
+                return []
+
+            messages = self._enrich_messages(messages)
+            print(f"=== {len(messages)}개 메시지 반환 ===")
+            return messages
+        except Exception as e:
+            print(f"내 활동 조회 오류: {e}")
+            return []
+
+    def get_usergroup_index(self):
+        """워크스페이스 User Group 인덱스
+
+        처음 한 번만 동기로 구성하고, 이후 만료/재검증은 백그라운드에서 처리해 조회 경로를 막지 않는다.
+        """
+        index = get_usergroup_index(self.cache_key)
+        if not index.built_at:
+            # 동시 요청은 하나로 합치고, 실패하면 최소 간격 동안 다시 시도하지 않음
+            _lookup_flight.do(("usergroups.list", self.cache_key),
+                              lambda: index.claim_refresh() and self._rebuild_usergroup_index())
+        elif index.claim_refresh():
+            executor.submit(_lookup_flight.do, ("usergroups.list", self.cache_key), self._rebuild_usergroup_index)
+        return index
+
+    def request_usergroup_refresh(self):
+        """인덱스에 없는 그룹이 멘션되면 TTL 전이라도 백그라운드 재구성 (최소 간격 적용)"""
+        index = get_usergroup_index(self.cache_key)
+        if index.claim_refresh(force=True):
+            executor.submit(_lookup_flight.do, ("usergroups.list", self.cache_key), self._rebuild_usergroup_index)
+
+    def _rebuild_usergroup_index(self):
+        """usergroups.list(include_users) 한 번으로 인덱스 재구성"""
+        try:
+            data = self._api_get("usergroups.list", {"include_users": True})
+            if data.get("ok"):
+                index = get_usergroup_index(self.cache_key)
+                index.update(data.get("usergroups", []))
+                persist_metadata('usergroup_index', self.cache_key, index.snapshot())
+                print(f"👥 User Group 인덱스 갱신: {len(index)}개 그룹")
+            else:
+                print(f"❌ User Group 목록 조회 실패: {data.get('error')}")
+        except Exception as e:
+            print(f"❌ User Group 목록 조회 실패: {e}")
+
+    def detect_channel_notification(self, msg, channel_id, channel_name):
+        """채널 메시지 하나에 대한 알림 감지 및 분류
+
+        알림 대상이면 알림 dict를, 아니면 None을 반환한다.
+        """
+        notifications = self.detect_channel_notifications([msg], channel_id, channel_name)
+        return notifications[0] if notifications else None
+
+    def detect_channel_notifications(self, messages, channel_id, channel_name):
+        """채널 메시지 묶음에 대한 알림 감지 및 분류 (폴링/푸시 수신 공통 경로)
+
+        알림 대상 메시지를 먼저 고른 뒤, 그 메시지들이 참조하는 사용자/봇을 한 번에 조회한다.
+        """
+        candidates = []
+        for msg in messages:
+            reason = self._channel_notification_reason(msg)
+            if reason:
+                candidates.append((msg, reason))
+        if not candidates:
+            return []
+
+        user_cache, bot_cache = self._lookup_message_refs([msg for msg, _ in candidates])
+        return [self._build_channel_notification(msg, reason, channel_id, channel_name, user_cache, bot_cache)
+                for msg, reason in candidates]
+
+    def _channel_notification_reason(self, msg):
+        """채널 메시지의 알림 사유 (알림 대상이 아니면 None)"""
+        text = msg.get("text", "")
+        user_id = msg.get("user", "")
+
+        # 자신의 메시지는 제외
+        if user_id == self.bot_user_id:
+            return None
+
+        is_notification = False
+        notification_reason = ""
+
+        # 1. 봇 멘션 확인
+        if f'<@{self.bot_user_id}>' in text:
+            is_notification = True
+            notification_reason = "봇 멘션"
+
+        # 2. @channel, @here 확인
+        elif '@here' in text or '@channel' in text or '<!channel' in text or '<!here' in text:
+            is_notification = True
+            notification_reason = "@here/@channel"
+
+        # 3. User Group 멘션 확인 (<!subteam^ID> 또는 <!subteam^ID|@groupname> 형식)
+        elif '<!subteam^' in text:
+            # 두 가지 패턴 모두 지원: <!subteam^ID> 또는 <!subteam^ID|@groupname>
+            matches = self.subteam_pattern.findall(text)
+            index = self.get_usergroup_index()
+
+            # watched_users가 비어 있으면 모든 그룹 멘션, 아니면 감시 사용자나 봇이 속한 그룹만 대상
+            if self.watched_user_ids:
+                target_groups = index.groups_of(self.watched_user_ids + [self.bot_user_id])
+            else:
+                target_groups = None
+
+            for subteam_id, group_name in matches:
+                if not index.knows(subteam_id):
+                    # 새로 만든 그룹일 수 있으므로 다음 판정을 위해 인덱스 갱신 예약
+                    self.request_usergroup_refresh()
+                if target_groups is None or subteam_id in target_groups:
+                    is_notification = True
+                    # 메시지에 포함된 이름이 있으면 사용, 없으면 인덱스에서 조회
+                    notification_reason = f"그룹 멘션 (@{group_name or index.handle(subteam_id)})"
+                    break
+
+        # 4. 등록된 사용자 멘션 확인
+        if not is_notification:
+            for watched_user_id in self.watched_user_ids:
+                if f'<@{watched_user_id}>' in text:
+                    is_notification = True
+                    notification_reason = f"사용자 멘션"
+                    break
+
+        if not is_notification:
+            return None
+        return notification_reason
+
+    def _build_channel_notification(self, msg, notification_reason, channel_id, channel_name, user_cache, bot_cache):
+        """채널 알림 dict 생성 (사용자/봇 정보는 미리 조회한 캐시 사용)"""
+        text = msg.get("text", "")
+        ts = float(msg.get("ts", 0))
+
+        # 작성자 이름과 텍스트의 사용자 멘션 변환
+        display_name, _ = self._author_name(msg, user_cache, bot_cache)
+        display_text = self.replace_user_mentions(text, user_cache)
+
+        # 메시지 링크 생성
+        message_link = self.get_message_link(channel_id, str(ts))
+
+        # 우선순위 분류 (사용자별 키워드 사용, 키워드 매칭은 한 번만 스캔)
+        matcher = self.keyword_matcher or compile_priority_keywords(self.priority_keywords)
+        keyword_matches = matcher.find_all(text)
+        priority, priority_reason = classify_message_priority(
+            text, display_name, channel_name,
+            keywords=matcher, keyword_matches=keyword_matches
+        )
+
+        return {
+            "channel": channel_name,
+            "channel_id": channel_id,
+            "user": display_name,
+            "text": display_text,
+            "timestamp": ts,
+            "reason": notification_reason,
+            "time": datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"),
+            "message_link": message_link,
+            "priority": priority,
+            "priority_reason": priority_reason,
+            "matched_keywords": [{"keyword": keyword, "tier": tier} for keyword, tier, _ in keyword_matches]
+        }
+
+    def detect_dm_notification(self, msg, dm_id):
+        """DM 메시지 하나에 대한 알림 생성 (아니면 None)"""
+        notifications = self.detect_dm_notifications([msg], dm_id)
+        return notifications[0] if notifications else None
+
+    def detect_dm_notifications(self, messages, dm_id):
+        """DM 메시지 묶음에 대한 알림 생성 (폴링/푸시 수신 공통 경로)"""
+        # 내가 받은 DM (상대방이 보낸 메시지)만 알림
+        received = [msg for msg in messages if msg.get("user") != self.bot_user_id]
+        if not received:
+            return []
+
+        user_cache, _ = self._lookup_message_refs(received)
+        return [self._build_dm_notification(msg, dm_id, user_cache) for msg in received]
+
+    def _build_dm_notification(self, msg, dm_id, user_cache):
+        """DM 알림 dict 생성 (사용자 정보는 미리 조회한 캐시 사용)"""
+        user_id = msg.get("user", "")
+        text = msg.get("text", "")
+        ts = float(msg.get("ts", 0))
+
+        display_name = self.get_display_name(user_cache.get(user_id, {}))
+
+        # 텍스트에서 사용자 멘션을 실제 이름으로 변환
+        display_text = self.replace_user_mentions(text, user_cache)
+
+        # 메시지 링크 생성
+        message_link = self.get_message_link(dm_id, str(ts))
+
+        return {
+            "channel": f"DM from {display_name}",
+            "channel_id": dm_id,
+            "user": display_name,
+            "text": display_text,
+            "timestamp": ts,
+            "reason": "DM",
+            "time": datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"),
+            "message_link": message_link
+        }
+
+    def detect_event_notification(self, event):
+        """Slack 메시지 이벤트(Events API / Socket Mode)를 알림으로 변환
+
+        폴링과 동일한 감지/분류 경로를 사용한다. 알림 대상이 아니면 None.
+        """
+        if event.get("type") not in ("message", "app_mention"):
+            return None
+        # 수정/삭제 등 원본 메시지가 아닌 이벤트는 제외
+        if event.get("subtype") in IGNORED_MESSAGE_SUBTYPES:
+            return None
+
+        channel_id = event.get("channel")
+        if not channel_id or not event.get("ts"):
+            return None
+
+        if event.get("channel_type") == "im":
+            return self.detect_dm_notification(event, channel_id)
+
+        channel_names = {ch["id"]: ch["name"] for ch in self.get_channels_with_bot()}
+        if channel_id not in channel_names:
+            return None
+        return self.detect_channel_notification(event, channel_id, channel_names[channel_id])
+
+    def check_new_mentions(self, since_timestamp, watermarks=None, scheduler=None):
+        """새로운 멘션 확인 (병렬 처리 최적화)
+
+        watermarks(ChannelWatermarks)가 주어지면 since_timestamp 대신 채널/DM별
+        워터마크 이후의 메시지만 조회하고, 스캔한 채널의 워터마크를 각각 전진시킨다.
+        scheduler(ChannelScanScheduler)가 주어지면 이번 사이클에 스캔할 채널/DM과 순서를
+        스케줄러가 정하고, 스캔 결과(새 메시지 수)를 스케줄러에 기록한다.
+        """
+        def oldest_for(channel_id):
+            if watermarks is not None:
+                return watermarks.get(channel_id)
+            return str(since_timestamp)
+
+        notifications = []
+        channels = self.get_channels_with_bot()
+        max_timestamp = since_timestamp  # 처리한 메시지 중 가장 최신 timestamp 추적
+        workspace_label = metrics_workspace_label(self.cache_key)
+
+        # DM (Direct Message) 목록 (캐시, 스케줄러가 채널과 함께 순서를 정함)
+        dm_ids = self.get_dm_channel_ids()
+
+        # 채널/DM 병렬 처리 함수
+        def check_channel(channel_id, channel_name, is_dm):
+            channel_notifications = []
+            local_max_ts = since_timestamp
+            label = "DM" if is_dm else f"채널 {channel_name}"
+
+            try:
+                # 워터마크 이후 메시지가 한 페이지를 넘어도 빠짐없이 조회
+                oldest = oldest_for(channel_id)
+                scanned_at = time.time()
+                data = self._api_get_all("conversations.history", "messages", {
+                    "channel": channel_id,
+                    "oldest": oldest
+                })
+
+                if data.get("ok"):
+                    messages = data.get("messages", [])
+                    slack_channel_messages_scanned.inc(len(messages), workspace=workspace_label, channel=channel_id)
+                    self.archive_scanned_messages(channel_id, oldest, messages, scanned_at)
+                    if scheduler is not None:
+                        latest_ts = max((msg["ts"] for msg in messages), key=float) if messages else None
+                        scheduler.record(channel_id, len(messages), scanned_at, oldest, latest_ts)
+
+                    if is_dm:
+                        channel_notifications.extend(self.detect_dm_notifications(messages, channel_id))
+                    else:
+                        channel_notifications.extend(self.detect_channel_notifications(messages, channel_id, channel_name))
+
+                    # 메시지 timestamp 추적
+                    for msg in messages:
+                        ts = float(msg.get("ts", 0))
+                        if ts > local_max_ts:
+                            local_max_ts = ts
+
+                    if watermarks is not None:
+                        watermarks.mark_scanned(channel_id, messages, scanned_at)
+                else:
+                    print(f"⚠️ {label} 스캔 실패: {data.get('error')}", flush=True)
+
+            except Exception as e:
+                print(f"⚠️ {label} 스캔 오류: {e}", flush=True)
+
+            return channel_notifications, local_max_ts
+
+        targets = [(ch["id"], ch["name"], False) for ch in channels] + [(dm_id, "", True) for dm_id in dm_ids]
+        target_ids = [target[0] for target in targets]
+        if scheduler is not None:
+            # 스케줄러가 고른 채널만, 우선순위(DM/고정 채널 → 오래된 채널 → 활발한 채널) 순서로 제출
+            # 조용한 DM은 목록에 새 활동이 보일 때만 스캔
+            if dm_ids:
+                scheduler.note_listed_activity(self.get_dm_activity())
+            # 사이클 예산은 rate limiter에 남은 conversations.history 토큰 수로 제한
+            available, call_rate = slack_rate_limiter.capacity(self.cache_key, "conversations.history")
+            order = scheduler.select(target_ids, priority_ids=dm_ids, capacity=available, call_rate=call_rate)
+            rank = {channel_id: index for index, channel_id in enumerate(order)}
+            targets = sorted((target for target in targets if target[0] in rank), key=lambda target: rank[target[0]])
+
+        # 채널/DM들을 병렬로 처리
+        futures = [executor.submit(check_channel, *target) for target in targets]
+        for future in as_completed(futures):
+            channel_notifs, local_max = future.result()
+            notifications.extend(channel_notifs)
+            if local_max > max_timestamp:
+                max_timestamp = local_max
+
+        if watermarks is not None:
+            watermarks.checkpoint(target_ids)
+        return notifications, max_timestamp
+
+
+# ============================================================
+# 비동기 엔진 (asyncio + aiohttp)
+# ============================================================
+
+SLACK_ASYNC_ENGINE = os.environ.get('SLACK_ASYNC_ENGINE', '0') == '1'  # 공유 폴러 스캔을 asyncio로 수행
+ASYNC_SSE_PORT = int(os.environ.get('ASYNC_SSE_PORT', '0')) or None  # 설정 시 이 포트에서 비동기 SSE 제공
+APP_PORT = int(os.environ.get('PORT', '5001'))  # 메인 Flask 서버 포트
+# 비동기 SSE 서버가 쿠키를 포함한 교차 출처 요청을 허용할 앱 주소 (쉼표로 여러 개 지정,
+# 미설정 시 SSE 요청과 같은 호스트의 APP_PORT만 허용)
+APP_ORIGINS = [origin.strip().rstrip('/') for origin in os.environ.get('APP_ORIGIN', '').split(',') if origin.strip()]
+ASYNC_HTTP_POOL_SIZE = 100  # aiohttp 연결 풀 크기
+ASYNC_SCAN_CONCURRENCY = 50  # 한 스캔에서 동시에 조회하는 채널 수
+
+_async_loop = None
+_async_loop_lock = threading.Lock()
+
+
+def get_async_loop():
+    """비동기 엔진 공용 이벤트 루프 (전용 스레드에서 실행, 처음 호출 시 시작)"""
+    global _async_loop
+    with _async_loop_lock:
+        if _async_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, daemon=True).start()
+            _async_loop = loop
+        return _async_loop
+
+
+def run_async(coro, timeout=None):
+    """공용 이벤트 루프에서 코루틴을 실행하고 결과를 기다림 (동기 코드에서 호출)"""
+    return asyncio.run_coroutine_threadsafe(coro, get_async_loop()).result(timeout)
+
+
+class AsyncSlackNotifier:
+    """SlackNotifier의 asyncio 버전 (aiohttp 연결 풀 사용)
+
+    Slack 호출은 모두 코루틴으로 수행하고, 감지/분류/캐시 로직은 동기 SlackNotifier
+    (self.notifier)를 그대로 사용한다. 필요한 사용자/봇 정보를 먼저 비동기로 캐시에
+    채운 뒤 감지하므로 동기 로직이 Slack을 다시 호출하는 일은 드물다.
+    """
+
+    def __init__(self, token, bot_id=None, notifier=None):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp가 설치되어 있지 않습니다 (pip install aiohttp)")
+        self.token = token
+        # 감시 사용자, 키워드, 우선순위 등 상태는 동기 notifier와 공유
+        self.notifier = notifier or SlackNotifier(token, bot_id)
+        self.cache_key = self.notifier.cache_key
+        self.timeout = aiohttp.ClientTimeout(sock_connect=5, sock_read=10)
+        self._session = None
+        self._inflight = {}  # 같은 조회의 동시 요청 합치기 {key: Task}
+
+    def _get_session(self):
+        """aiohttp 세션 (이벤트 루프 안에서 처음 사용할 때 생성)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.notifier.headers,
+                connector=aiohttp.TCPConnector(limit=ASYNC_HTTP_POOL_SIZE),
+                timeout=self.timeout
+            )
+        return self._session
+
+    async def close(self):
+        """연결 풀 정리"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _single(self, key, factory):
+        """같은 key의 동시 요청은 하나의 코루틴 결과를 공유"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _api_get(self, method, params=None, priority=None):
+        """Slack Web API 호출 (rate limit 스케줄링 + 429/Retry-After 재시도)"""
+        if priority is None:
+            priority = self.notifier.request_priority
+        workspace = self.cache_key
+        workspace_label = metrics_workspace_label(workspace)
+        # aiohttp는 bool 파라미터를 받지 않으므로 requests와 같은 문자열로 변환
+        query = {key: str(value) for key, value in (params or {}).items()}
+
+        for attempt in range(SLACK_MAX_RETRIES + 1):
+            wait_started = time.perf_counter()
+            acquired = await slack_rate_limiter.acquire_async(workspace, method, priority)
+            slack_rate_limit_wait.observe(time.perf_counter() - wait_started, method=method)
+            if not acquired:
+                print(f"⚠️ Slack API 호출 대기 시간 초과 ({method})", flush=True)
+                slack_api_requests.inc(method=method, workspace=workspace_label, status='throttled')
+                return {"ok": False, "error": "ratelimited"}
+
+            started = time.perf_counter()
+            try:
+                response = await self._get_session().get(f"{SLACK_API_BASE}/{method}", params=query)
+            except Exception:
+                slack_api_requests.inc(method=method, workspace=workspace_label, status='exception')
+                raise
+            slack_api_latency.observe(time.perf_counter() - started, method=method)
+            async with response:
+                if response.status == 429:
+                    slack_api_requests.inc(method=method, workspace=workspace_label, status='ratelimited')
+                    try:
+                        retry_after = float(response.headers.get("Retry-After", 1))
+                    except ValueError:
+                        retry_after = 1
+                    slack_rate_limiter.penalize(workspace, method, retry_after)
+                    print(f"⏳ Slack rate limit ({method}): {retry_after}초 후 재시도 ({attempt + 1}/{SLACK_MAX_RETRIES})", flush=True)
+                    continue
+
+                data = await response.json(content_type=None)
+                slack_api_requests.inc(method=method, workspace=workspace_label, status='ok' if data.get("ok") else 'error')
+                return data
+
+        return {"ok": False, "error": "ratelimited"}
+
+    async def iter_pages(self, method, params=None, priority=None):
+        """response_metadata.next_cursor를 따라가는 비동기 페이지 iterator (다음 페이지 선요청)"""
+        params = dict(params or {})
+        params.setdefault("limit", SLACK_PAGE_SIZES.get(method, 200))
+
+        data = await self._api_get(method, dict(params), priority)
+        next_page = None
+        try:
+            while True:
+                cursor = data.get("response_metadata", {}).get("next_cursor") if data.get("ok") else None
+                if not cursor:
+                    yield data
+                    return
+
+                params["cursor"] = cursor
+                next_page = asyncio.ensure_future(self._api_get(method, dict(params), priority))
+                yield data
+                data = await next_page
+                next_page = None
+        finally:
+            # 소비자가 중간에 멈추면 선요청 취소
+            if next_page is not None:
+                next_page.cancel()
+
+    async def _api_get_all(self, method, key, params=None, priority=None):
+        """모든 페이지를 조회하여 key 항목을 합친 응답 반환"""
+        items = []
+        async for data in self.iter_pages(method, params, priority):
+            if not data.get("ok"):
+                return data
+            items.extend(data.get(key, []))
+        return {"ok": True, key: items}
+
+    async def get_channels_with_bot(self):
+        """봇이 참여한 채널 목록 (전역 캐시 공유)"""
+        cached = self.notifier._cached(_global_channel_cache, self.cache_key,
+                                       ("users.conversations", self.cache_key), self.notifier._fetch_channels)
+        if cached is not None:
+            return cached
+        return await self._single(("users.conversations",), self._fetch_channels)
+
+    async def _fetch_channels(self):
+        try:
+            data = await self._api_get_all("users.conversations", "channels", {"types": "public_channel,private_channel"})
+            if data.get("ok"):
+                channels = data.get("channels", [])
+                _global_channel_cache.set(self.cache_key, channels)
+                persist_metadata('channels', self.cache_key, channels)
+                return channels
+        except Exception as e:
+            print(f"채널 조회 오류: {e}")
+        return []
+
+    async def get_dm_channel_ids(self):
+        """DM 채널 ID 목록 (전역 캐시 공유)"""
+        cached = self.notifier._cached(_global_im_cache, self.cache_key, ("conversations.list:im", self.cache_key),
+                                       self.notifier._fetch_dm_channel_ids)
+        if cached is not None:
+            return cached
+        return await self._single(("conversations.list:im",), self._fetch_dm_channel_ids)
+
+    async def _fetch_dm_channel_ids(self):
+        try:
+            data = await self._api_get_all("conversations.list", "channels", {"types": "im"})
+            if data.get("ok"):
+                dm_channels = data.get("channels", [])
+                dm_ids = [dm["id"] for dm in dm_channels]
+                _global_im_cache.set(self.cache_key, dm_ids)
+                _global_dm_activity_cache.set(self.cache_key, {dm["id"]: dm_list_activity(dm) for dm in dm_channels})
+                persist_metadata('ims', self.cache_key, dm_ids)
+                return dm_ids
+        except Exception as e:
+            print(f"DM 목록 조회 오류: {e}")
+        return []
+
+    async def get_dm_activity(self):
+        """DM별 최근 활동 시각 (전역 캐시 공유, 없으면 conversations.list 한 번)"""
+        activity = _global_dm_activity_cache.get(self.cache_key)
+        if activity is None:
+            await self._single(("conversations.list:im",), self._fetch_dm_channel_ids)
+            activity = _global_dm_activity_cache.get(self.cache_key)
+        return activity or {}
+
+    async def get_user_info(self, user_id):
+        """사용자 정보 조회 (전역 캐시 공유)"""
+        cached = self.notifier._cached_user(user_id)
+        if cached is not None:
+            return cached
+        return await self._single(("users.info", user_id), lambda: self._fetch_user_info(user_id))
+
+    async def _fetch_user_info(self, user_id):
+        try:
+            data = await self._api_get("users.info", {"user": user_id})
+            if data.get("ok"):
+                user_info = data.get("user", {})
+                get_user_directory(self.cache_key).upsert(user_info)
+                _global_user_cache.set(user_id, user_info)
+                persist_metadata('user', user_id, user_info)
+                return user_info
+        except Exception as e:
+            print(f"사용자 정보 조회 오류: {e}")
+        return {}
+
+    async def get_bot_info(self, bot_id):
+        """봇 정보 조회 (전역 캐시 공유)"""
+        cached = self.notifier._cached(_global_bot_cache, bot_id, ("bots.info", bot_id),
+                                       lambda: self.notifier._fetch_bot_info(bot_id, revalidate=True))
+        if cached is not None:
+            return cached
+        return await self._single(("bots.info", bot_id), lambda: self._fetch_bot_info(bot_id))
+
+    async def _fetch_bot_info(self, bot_id):
+        try:
+            data = await self._api_get("bots.info", {"bot": bot_id})
+            if data.get("ok"):
+                bot_info = data.get("bot", {})
+                _global_bot_cache.set(bot_id, bot_info)
+                persist_metadata('bot', bot_id, bot_info)
+                return bot_info
+        except Exception as e:
+            print(f"봇 정보 조회 오류: {e}")
+        return {}
+
+    async def get_user_info_batch(self, user_ids):
+        """여러 사용자 정보를 동시에 조회"""
+        user_ids = list(user_ids)
+        infos = await asyncio.gather(*(self.get_user_info(uid) for uid in user_ids))
+        return dict(zip(user_ids, infos))
+
+    async def _prefetch_metadata(self, messages):
+        """메시지 작성자/멘션 사용자와 봇 정보를 미리 캐시에 채움"""
+        user_ids, bot_ids = self.notifier._message_refs(messages)
+        await asyncio.gather(self.get_user_info_batch(user_ids),
+                             *(self.get_bot_info(bid) for bid in bot_ids))
+
+    async def get_channel_messages(self, channel_id, limit=50):
+        """특정 채널의 메시지 조회 (로컬 아카이브 + delta 동기화)"""
+        try:
+            messages = await self._load_channel_messages(channel_id, limit)
+            if not messages:
+                return []
+            await self._prefetch_metadata(messages)
+            return self.notifier._enrich_messages(messages)
+        except Exception as e:
+            print(f"메시지 조회 오류: {e}")
+            return []
+
+    async def _load_channel_messages(self, channel_id, limit):
+        """SlackNotifier._load_channel_messages와 같은 동기화 규칙"""
+        archive = get_message_archive()
+        if archive is None:
+            data = await self._api_get("conversations.history", {"channel": channel_id, "limit": limit})
+            return data.get("messages", []) if data.get("ok") else []
+
+        coverage = archive.coverage(self.cache_key, channel_id)
+        now = time.time()
+
+        if (coverage is None
+                or now - coverage["full_synced_at"] >= ARCHIVE_RESYNC_INTERVAL
+                or (not coverage["complete"] and coverage["count"] < limit)):
+            data = await self._api_get("conversations.history", {"channel": channel_id, "limit": limit})
+            if not data.get("ok"):
+                return []
+            archive.replace(self.cache_key, channel_id, data.get("messages", []),
+                            data.get("has_more", False), now)
+        elif now - coverage["synced_at"] >= ARCHIVE_FRESH_SECONDS:
+            data = await self._api_get_all("conversations.history", "messages", {
+                "channel": channel_id,
+                "oldest": coverage["newest"]
+            })
+            if data.get("ok"):
+                archive.append(self.cache_key, channel_id, coverage["newest"], data.get("messages", []), now)
+            else:
+                print(f"⚠️ 채널 {channel_id} delta 조회 실패: {data.get('error')}", flush=True)
+
+        return archive.latest(self.cache_key, channel_id, limit)
+
+    async def get_thread_replies(self, channel_id, thread_ts):
+        """스레드 답글 조회"""
+        try:
+            data = await self._api_get("conversations.replies", {"channel": channel_id, "ts": thread_ts})
+            if not data.get("ok"):
+                return []
+            # 첫 번째 메시지는 원본 메시지이므로 제외
+            thread_replies = data.get("messages", [])[1:]
+            if not thread_replies:
+                return []
+            await self._prefetch_metadata(thread_replies)
+            return self.notifier._enrich_messages(thread_replies, thread_info=False)
+        except Exception as e:
+            print(f"스레드 답글 조회 오류: {e}")
+            return []
+
+    async def check_new_mentions(self, since_timestamp, watermarks=None, scheduler=None):
+        """새로운 멘션 확인 (SlackNotifier.check_new_mentions의 비동기 버전)
+
+        채널/DM 기록은 ASYNC_SCAN_CONCURRENCY개까지 동시에 조회하고, 감지/분류(키워드,
+        Claude)는 블로킹 작업이므로 스캔당 한 번 워커 스레드에서 수행한다.
+        """
+        def oldest_for(channel_id):
+            if watermarks is not None:
+                return watermarks.get(channel_id)
+            return str(since_timestamp)
+
+        semaphore = asyncio.Semaphore(ASYNC_SCAN_CONCURRENCY)
+
+        async def fetch_history(channel_id, label):
+            async with semaphore:
+                oldest = oldest_for(channel_id)
+                scanned_at = time.time()
+                try:
+                    data = await self._api_get_all("conversations.history", "messages", {
+                        "channel": channel_id,
+                        "oldest": oldest
+                    })
+                except Exception as e:
+                    print(f"⚠️ {label} 스캔 오류: {e}", flush=True)
+                    return None
+                if not data.get("ok"):
+                    print(f"⚠️ {label} 스캔 실패: {data.get('error')}", flush=True)
+                    return None
+                messages = data.get("messages", [])
+                if scheduler is not None:
+                    latest_ts = max((msg["ts"] for msg in messages), key=float) if messages else None
+                    scheduler.record(channel_id, len(messages), scanned_at, oldest, latest_ts)
+                return oldest, scanned_at, messages
+
+        # DM 목록은 채널 목록과 동시에 조회 (둘 다 캐시)
+        channels, dm_ids = await asyncio.gather(self.get_channels_with_bot(), self.get_dm_channel_ids())
+        target_ids = [ch["id"] for ch in channels] + dm_ids
+
+        if scheduler is not None:
+            # 스케줄러가 고른 채널/DM만 우선순위 순서로 조회 (세마포어 획득 순서 = 생성 순서)
+            if dm_ids:
+                scheduler.note_listed_activity(await self.get_dm_activity())
+            available, call_rate = slack_rate_limiter.capacity(self.cache_key, "conversations.history")
+            order = scheduler.select(target_ids, priority_ids=dm_ids, capacity=available, call_rate=call_rate)
+            rank = {channel_id: index for index, channel_id in enumerate(order)}
+            channels = sorted((ch for ch in channels if ch["id"] in rank), key=lambda ch: rank[ch["id"]])
+            dm_ids = sorted((dm_id for dm_id in dm_ids if dm_id in rank), key=rank.get)
+
+        # DM은 우선 스캔 대상이므로 채널보다 먼저 세마포어를 얻도록 먼저 생성
+        dm_tasks = [asyncio.ensure_future(fetch_history(dm_id, "DM")) for dm_id in dm_ids]
+        channel_results = await asyncio.gather(*(fetch_history(ch["id"], f"채널 {ch['name']}") for ch in channels))
+        dm_results = await asyncio.gather(*dm_tasks)
+
+        channel_scans = [(ch["id"], ch["name"], result) for ch, result in zip(channels, channel_results) if result]
+        dm_scans = [(dm_id, result) for dm_id, result in zip(dm_ids, dm_results) if result]
+
+        await self._prefetch_metadata([msg for _, _, (_, _, messages) in channel_scans for msg in messages]
+                                      + [msg for _, (_, _, messages) in dm_scans for msg in messages])
+        result = await asyncio.to_thread(self._detect_scanned, since_timestamp, watermarks, channel_scans, dm_scans)
+        if watermarks is not None:
+            watermarks.checkpoint(target_ids)
+        return result
+
+    def _detect_scanned(self, since_timestamp, watermarks, channel_scans, dm_scans):
+        """조회한 메시지에서 알림 감지, 아카이브 저장, 워터마크 전진 (워커 스레드에서 실행)"""
+        notifier = self.notifier
+        notifications = []
+        max_timestamp = since_timestamp
+        workspace_label = metrics_workspace_label(self.cache_key)
+
+        for channel_id, channel_name, (oldest, scanned_at, messages) in channel_scans:
+            slack_channel_messages_scanned.inc(len(messages), workspace=workspace_label, channel=channel_id)
+            notifier.archive_scanned_messages(channel_id, oldest, messages, scanned_at)
+            notifications.extend(notifier.detect_channel_notifications(messages, channel_id, channel_name))
+            for msg in messages:
+                max_timestamp = max(max_timestamp, float(msg.get("ts", 0)))
+            if watermarks is not None:
+                watermarks.mark_scanned(channel_id, messages, scanned_at)
+
+        for dm_id, (oldest, scanned_at, messages) in dm_scans:
+            slack_channel_messages_scanned.inc(len(messages), workspace=workspace_label, channel=dm_id)
+            notifier.archive_scanned_messages(dm_id, oldest, messages, scanned_at)
+            notifications.extend(notifier.detect_dm_notifications(messages, dm_id))
+            for msg in messages:
+                max_timestamp = max(max_timestamp, float(msg.get("ts", 0)))
+            if watermarks is not None:
+                watermarks.mark_scanned(dm_id, messages, scanned_at)
+
+        return notifications, max_timestamp
+
+
+# ============================================================
+# 알림 브로커 (이벤트 ID, 재연결 시 재전송)
+# ============================================================
+
+BROKER_RING_SIZE = 1000  # 스트림별로 보관하는 최근 이벤트 수 (재연결 시 재전송용)
+SUBSCRIBER_QUEUE_SIZE = 200  # 구독자별 대기 이벤트 한도 (넘으면 큐를 비우고 링 버퍼에서 다시 보냄)
+
+
+def notification_stream_key(token, bot_id):
+    """알림 스트림 키 (워크스페이스 + 봇/사용자)"""
+    return f"{token_cache_key(token)}:{bot_id}"
+
+
+def format_sse_event(event_id, notification):
+    """SSE 이벤트 문자열 (id 필드로 브라우저가 Last-Event-ID를 기억)"""
+    return f"id: {event_id}\ndata: {json.dumps(notification)}\n\n"
 
-    def replace_user_mentions(self, text, user_cache):
-        """메시지 텍스트에서 <@USER_ID> 형식을 실제 사용자 이름으로 변환 (최적화)"""
-        # 컴파일된 정규표현식 사용
-        mentions = self.mention_pattern.findall(text)
 
-        if not mentions:
-            return text
+def parse_last_event_id(value):
+    """Last-Event-ID 헤더/파라미터 값 (없거나 잘못되면 None)"""
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+class MonitoringSubscription:
+    """알림 스트림에 연결된 SSE 구독자 (세션당 연결 하나)
+
+    큐에는 (event_id, notification)이 들어간다. 소비가 밀려 큐가 SUBSCRIBER_QUEUE_SIZE를
+    넘으면 큐를 비우고 lagging으로 표시하며, SSE 루프는 next_events()에서 마지막으로
+    보낸 이벤트 이후를 링 버퍼에서 한 번에 다시 가져온다. loop가 주어지면 비동기 SSE
+    연결용으로 asyncio.Queue를 사용한다.
+    """
+
+    def __init__(self, stream, session_id, loop=None, last_event_id=None):
+        self.stream = stream
+        self.session_id = session_id
+        self.loop = loop
+        self.queue = asyncio.Queue() if loop is not None else queue.Queue()
+        self.last_event_id = last_event_id or 0  # 마지막으로 보낸 이벤트 ID
+        # Last-Event-ID가 있으면 첫 조회에서 놓친 이벤트부터 재전송
+        self.lagging = last_event_id is not None
+        self.dropped = 0  # 큐 초과로 비운 이벤트 수
+
+    def put(self, event):
+        """이벤트 전달 (발행 스레드에서 호출)"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._offer, event)
+        else:
+            self._offer(event)
 
-        # 각 멘션을 실제 이름으로 변환
-        for user_id in mentions:
-            if user_id not in user_cache:
-                user_cache[user_id] = self.get_user_info(user_id)
+    def _offer(self, event):
+        if self.queue.qsize() >= SUBSCRIBER_QUEUE_SIZE:
+            # 큐를 비우고 링 버퍼 재전송으로 합침
+            while True:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except (queue.Empty, asyncio.QueueEmpty):
+                    break
+            self.lagging = True
+        self.queue.put_nowait(event)
+
+    def next_events(self, event):
+        """큐에서 꺼낸 이벤트(없으면 None)로 보낼 이벤트 목록 계산
+
+        밀려서 비운 적이 있으면 링 버퍼에서 재전송분을 가져오고, 이미 보낸 ID는 제외한다.
+        """
+        events = []
+        if self.lagging:
+            self.lagging = False
+            events = notification_broker.replay(self.stream, self.session_id, self.last_event_id)
+        if event is not None:
+            events.append(event)
+
+        fresh = []
+        for event_id, notification in events:
+            if event_id > self.last_event_id:
+                fresh.append((event_id, notification))
+                self.last_event_id = event_id
+        return fresh
+
+
+class NotificationBroker:
+    """스트림(워크스페이스 + 봇)별 알림 브로커
+
+    - 이벤트 ID 부여와 보관(재연결 시 Last-Event-ID 이후 재전송)은 상태 백엔드가 담당
+      (메모리 구현은 스트림별 최근 BROKER_RING_SIZE개 링 버퍼, sqlite 구현은 공유 이벤트 로그)
+    - 이 프로세스의 SSE 구독자를 관리하고, 세션별 필터(모니터링 활성 여부, 세션 시작 시점)는
+      전달/재전송 시점에 적용
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()  # 이벤트 ID 순서대로 전달되도록 발행을 직렬화
+        self._subscribers = defaultdict(set)  # {stream: {MonitoringSubscription}}
+
+    def subscribe(self, stream, session_id, loop=None, last_event_id=None):
+        subscription = MonitoringSubscription(stream, session_id, loop, last_event_id)
+        with self._lock:
+            self._subscribers[stream].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.stream)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.stream]
+
+    def subscriber_count(self, stream):
+        with self._lock:
+            return len(self._subscribers.get(stream, ()))
+
+    def session_ids(self, stream):
+        """이 프로세스에서 스트림을 구독 중인 세션 ID"""
+        with self._lock:
+            return {sub.session_id for sub in self._subscribers.get(stream, ())}
+
+    def connection_counts(self):
+        """전체 SSE 구독자 수 {'thread': 스레드 SSE, 'async': 비동기 SSE}"""
+        counts = {'thread': 0, 'async': 0}
+        with self._lock:
+            for subscribers in self._subscribers.values():
+                for sub in subscribers:
+                    counts['async' if sub.loop is not None else 'thread'] += 1
+        return counts
+
+    @staticmethod
+    def _visible(session_id, notification, target_session):
+        if target_session is not None and target_session != session_id:
+            return False
+        state = state_backend.session(session_id)
+        if state is None or not state[0]:
+            return False
+        # 세션 시작 시점 이전 메시지 제외
+        return notification.get("timestamp", 0) > state[1]
+
+    def publish(self, stream, notifications, session_id=None):
+        """알림을 상태 백엔드에 기록하고 구독자에게 전달
+
+        session_id가 주어지면 해당 세션에만 전달한다 (테스트 알림).
+        공유 백엔드에서는 각 프로세스의 이벤트 로그 tail 스레드가 전달한다.
+        """
+        with self._publish_lock:
+            events = state_backend.append_events(stream, notifications, session_id)
+            if not state_backend.shared:
+                self.deliver(stream, events)
+
+    def deliver(self, stream, events):
+        """이벤트 [(event_id, notification, target)]를 이 프로세스의 구독자에게 전달"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(stream, ()))
+        for event_id, notification, target in events:
+            for sub in subscribers:
+                if self._visible(sub.session_id, notification, target):
+                    sub.put((event_id, notification))
+
+    def replay(self, stream, session_id, after_id):
+        """after_id 이후 이벤트 중 세션에 보일 이벤트 [(event_id, notification)]"""
+        return [(event_id, notification) for event_id, notification, target in state_backend.read_events(stream, after_id)
+                if self._visible(session_id, notification, target)]
+
+
+notification_broker = NotificationBroker()
 
-            user_info = user_cache[user_id]
-            user_name = self.get_display_name(user_info)
 
-            # <@USER_ID>를 @사용자이름으로 변환
-            text = text.replace(f'<@{user_id}>', f'@{user_name}')
+# ============================================================
+# 공유 상태 백엔드 (다중 프로세스/인스턴스 배포)
+# ============================================================
 
-        return text
+# - memory: 프로세스 안에서만 상태를 공유 (기본값, 워커 하나)
+# - sqlite: STATE_DB_PATH의 SQLite(WAL)로 여러 프로세스가 상태와 알림 이벤트를 공유
+STATE_BACKEND = os.environ.get('STATE_BACKEND', 'memory').lower()
+STATE_DB_PATH = os.environ.get('STATE_DB_PATH', os.path.join(USER_DATA_DIR, 'shared_state.sqlite3'))
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"  # lease/presence 소유자 식별자
+POLLER_LEASE_TTL = 15  # 폴러 리더 lease 유효 시간 (갱신이 끊기면 다른 프로세스가 넘겨받음, 초)
+POLLER_LEASE_RENEW = 5  # 리더가 lease와 구독자 presence를 갱신하는 주기 (초)
+POLLER_LEASE_RETRY = 2  # 리더가 아닌 폴러가 lease 획득을 다시 시도하는 주기 (초)
+EVENT_LOG_POLL_INTERVAL = 0.2  # 공유 이벤트 로그에서 새 알림을 읽어 오는 주기 (초)
+EVENT_LOG_RETENTION = 3600  # 공유 이벤트 로그 보관 시간 (재연결 재전송용, 초)
+SESSION_CACHE_TTL = 1.0  # 세션 상태(모니터링 여부/시작 시점) 조회 캐시 (초)
+
+
+class StateBackend(ABC):
+    """프로세스 간에 공유해야 하는 모니터링 상태 인터페이스
+
+    - 세션: 모니터링 활성 여부와 감지 시작 시점 (start/stop/test 요청이 어느 워커에 오든 같은 값)
+    - presence: 스트림별로 SSE 구독 중인 세션 (프로세스가 주기적으로 자기 구독자를 기록)
+    - lease: 봇(스트림)당 폴러 하나만 스캔하도록 리더를 정함
+    - 이벤트 로그: 알림에 전역 이벤트 ID를 붙여 기록 (어느 프로세스의 SSE 연결이든 전달/재전송)
+
+    shared가 False이면 publish한 프로세스가 바로 구독자에게 전달하고, True이면 각 프로세스의
+    이벤트 로그 tail 스레드가 latest_event_id/events_after로 새 이벤트를 읽어 전달하고 prune으로 정리한다.
+    모든 메서드가 추상 메서드이므로, 빠진 메서드가 있는 백엔드는 생성할 때 TypeError가 난다.
+    """
+
+    shared = False
+
+    # ---- 세션 ----
+    @abstractmethod
+    def init_session(self, session_id, since):
+        """세션이 없으면 비활성 상태로 생성"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def start_session(self, session_id, since):
+        """모니터링 시작 (비활성 상태였으면 감지 시작 시점을 since로 설정)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stop_session(self, session_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def session(self, session_id):
+        """(active, since) 또는 None"""
+        raise NotImplementedError
+
+    # ---- presence ----
+    @abstractmethod
+    def set_presence(self, stream, owner, session_ids, ttl):
+        """owner 프로세스의 스트림 구독 세션 목록 기록 (ttl 안에 갱신하지 않으면 만료)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def active_sessions(self, stream):
+        """구독 중이고 모니터링이 활성화된 세션 {session_id: since}"""
+        raise NotImplementedError
+
+    # ---- lease ----
+    @abstractmethod
+    def acquire_lease(self, name, owner, ttl):
+        """lease 획득 또는 갱신 (다른 소유자의 lease가 유효하면 False)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def release_lease(self, name, owner):
+        raise NotImplementedError
+
+    # ---- 이벤트 로그 ----
+    @abstractmethod
+    def append_events(self, stream, notifications, target=None):
+        """알림에 이벤트 ID를 붙여 기록 → [(event_id, notification, target)]"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def read_events(self, stream, after_id):
+        """after_id 이후 스트림 이벤트 [(event_id, notification, target)] (재전송용)"""
+        raise NotImplementedError
+
+    # ---- 이벤트 로그 tail (shared 백엔드의 프로세스별 전달 스레드가 사용) ----
+    @abstractmethod
+    def latest_event_id(self):
+        """지금까지 기록된 가장 최근 이벤트 ID (없으면 0)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def events_after(self, after_id, limit=1000):
+        """모든 스트림의 after_id 이후 이벤트 [(event_id, stream, notification, target)] (ID 순)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def prune(self):
+        """보관 기간이 지난 이벤트, 만료된 presence/lease 정리"""
+        raise NotImplementedError
+
+
+class InProcessStateBackend(StateBackend):
+    """프로세스 메모리 기반 구현 (워커 하나로 실행할 때)"""
+
+    def __init__(self, ring_size=BROKER_RING_SIZE):
+        self._lock = threading.Lock()
+        self._sessions = {}  # {session_id: [active, since]}
+        self._presence = defaultdict(dict)  # {stream: {owner: (session_ids, expires_at)}}
+        self._leases = {}  # {name: (owner, expires_at)}
+        # 이벤트 ID는 단조 증가 (재시작해도 줄어들지 않도록 밀리초 시각에서 시작)
+        self._next_id = int(time.time() * 1000)
+        self._rings = defaultdict(lambda: deque(maxlen=ring_size))  # {stream: deque[(event_id, notification, target)]}
+
+    def init_session(self, session_id, since):
+        with self._lock:
+            self._sessions.setdefault(session_id, [False, since])
+
+    def start_session(self, session_id, since):
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None or not state[0]:
+                self._sessions[session_id] = [True, since]
+
+    def stop_session(self, session_id):
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is not None:
+                state[0] = False
+
+    def session(self, session_id):
+        state = self._sessions.get(session_id)
+        return tuple(state) if state is not None else None
+
+    def set_presence(self, stream, owner, session_ids, ttl):
+        with self._lock:
+            if session_ids:
+                self._presence[stream][owner] = (set(session_ids), time.time() + ttl)
+            else:
+                self._presence[stream].pop(owner, None)
+                if not self._presence[stream]:
+                    del self._presence[stream]
+
+    def active_sessions(self, stream):
+        now = time.time()
+        with self._lock:
+            present = set()
+            for session_ids, expires_at in self._presence.get(stream, {}).values():
+                if expires_at > now:
+                    present |= session_ids
+            return {session_id: self._sessions[session_id][1] for session_id in present
+                    if self._sessions.get(session_id, (False,))[0]}
+
+    def acquire_lease(self, name, owner, ttl):
+        now = time.time()
+        with self._lock:
+            current = self._leases.get(name)
+            if current is not None and current[0] != owner and current[1] > now:
+                return False
+            self._leases[name] = (owner, now + ttl)
+            return True
+
+    def release_lease(self, name, owner):
+        with self._lock:
+            if self._leases.get(name, (None,))[0] == owner:
+                del self._leases[name]
+
+    def append_events(self, stream, notifications, target=None):
+        events = []
+        with self._lock:
+            ring = self._rings[stream]
+            for notification in notifications:
+                self._next_id += 1
+                ring.append((self._next_id, notification, target))
+                events.append((self._next_id, notification, target))
+        return events
+
+    def read_events(self, stream, after_id):
+        with self._lock:
+            ring = list(self._rings.get(stream, ()))
+        return [event for event in ring if event[0] > after_id]
+
+    def latest_event_id(self):
+        with self._lock:
+            return self._next_id
+
+    def events_after(self, after_id, limit=1000):
+        with self._lock:
+            events = [(event_id, stream, notification, target)
+                      for stream, ring in self._rings.items()
+                      for event_id, notification, target in ring if event_id > after_id]
+        events.sort(key=lambda event: event[0])
+        return events[:limit]
+
+    def prune(self):
+        """만료된 presence/lease 정리 (이벤트는 스트림별 링 버퍼 크기로 제한됨)"""
+        now = time.time()
+        with self._lock:
+            for stream in list(self._presence):
+                owners = self._presence[stream]
+                for owner in [owner for owner, (_, expires_at) in owners.items() if expires_at < now]:
+                    del owners[owner]
+                if not owners:
+                    del self._presence[stream]
+            for name in [name for name, (_, expires_at) in self._leases.items() if expires_at < now]:
+                del self._leases[name]
+
+
+class SqliteStateBackend(StateBackend):
+    """SQLite(WAL) 기반 구현 (같은 호스트의 여러 워커 프로세스가 공유)
+
+    이벤트 로그의 이벤트 ID는 AUTOINCREMENT이며, 메모리 구현과 이어지도록 밀리초 시각에서 시작한다.
+    폴링 알림은 (channel_id, timestamp)로 중복을 거르므로, 푸시 이벤트를 받은 워커와 리더 폴러가
+    같은 메시지를 기록해도 한 번만 전달된다.
+    """
+
+    shared = True
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._session_cache = {}  # {session_id: ((active, since) 또는 None, 조회 시각)}
+
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                active INTEGER NOT NULL,
+                since REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS presence (
+                stream TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (stream, session_id, owner)
+            );
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS events (
+                event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                stream TEXT NOT NULL,
+                target TEXT,
+                dedupe_key TEXT,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_events_stream ON events (stream, event_id);
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_events_dedupe ON events (stream, dedupe_key);
+        """)
+        with conn:
+            conn.execute(
+                "INSERT INTO sqlite_sequence (name, seq) SELECT 'events', ? "
+                "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'events')",
+                (int(time.time() * 1000),)
+            )
 
-    def get_user_info_batch(self, user_ids):
-        """여러 사용자 정보를 병렬로 조회"""
-        global _global_user_cache
+    def _conn(self):
+        """스레드별 연결"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---- 세션 ----
+    def init_session(self, session_id, since):
+        with self._conn() as conn:
+            conn.execute("INSERT OR IGNORE INTO sessions (session_id, active, since, updated_at) VALUES (?, 0, ?, ?)",
+                         (session_id, since, time.time()))
+        self._session_cache.pop(session_id, None)
+
+    def start_session(self, session_id, since):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO sessions (session_id, active, since, updated_at) VALUES (?, 1, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET "
+                "since = CASE WHEN sessions.active THEN sessions.since ELSE excluded.since END, "
+                "active = 1, updated_at = excluded.updated_at",
+                (session_id, since, time.time())
+            )
+        self._session_cache.pop(session_id, None)
+
+    def stop_session(self, session_id):
+        with self._conn() as conn:
+            conn.execute("UPDATE sessions SET active = 0, updated_at = ? WHERE session_id = ?",
+                         (time.time(), session_id))
+        self._session_cache.pop(session_id, None)
+
+    def session(self, session_id):
+        # 알림마다 구독자 수만큼 조회하므로 짧게 캐시 (다른 워커의 start/stop은 최대 SESSION_CACHE_TTL 늦게 반영)
+        now = time.time()
+        cached = self._session_cache.get(session_id)
+        if cached is not None and now - cached[1] < SESSION_CACHE_TTL:
+            return cached[0]
+        row = self._conn().execute("SELECT active, since FROM sessions WHERE session_id = ?",
+                                   (session_id,)).fetchone()
+        state = (bool(row[0]), row[1]) if row else None
+        self._session_cache[session_id] = (state, now)
+        return state
+
+    # ---- presence ----
+    def set_presence(self, stream, owner, session_ids, ttl):
+        expires_at = time.time() + ttl
+        with self._conn() as conn:
+            conn.execute("DELETE FROM presence WHERE stream = ? AND owner = ?", (stream, owner))
+            conn.executemany("INSERT INTO presence (stream, session_id, owner, expires_at) VALUES (?, ?, ?, ?)",
+                             [(stream, session_id, owner, expires_at) for session_id in set(session_ids)])
+
+    def active_sessions(self, stream):
+        rows = self._conn().execute(
+            "SELECT DISTINCT s.session_id, s.since FROM presence p JOIN sessions s ON s.session_id = p.session_id "
+            "WHERE p.stream = ? AND p.expires_at > ? AND s.active = 1",
+            (stream, time.time())
+        ).fetchall()
+        return dict(rows)
+
+    # ---- lease ----
+    def acquire_lease(self, name, owner, ttl):
+        now = time.time()
+        with self._conn() as conn:
+            # 비어 있거나, 내 lease이거나, 만료된 경우에만 기록
+            conn.execute(
+                "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.owner = excluded.owner OR leases.expires_at <= ?",
+                (name, owner, now + ttl, now)
+            )
+            row = conn.execute("SELECT owner FROM leases WHERE name = ?", (name,)).fetchone()
+        return row is not None and row[0] == owner
 
-        results = {}
-        to_fetch = []
+    def release_lease(self, name, owner):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
 
-        # 캐시에서 먼저 확인
-        for user_id in user_ids:
-            if user_id in _global_user_cache:
-                cached = _global_user_cache[user_id]
-                if time.time() - cached["timestamp"] < CACHE_TTL:
-                    results[user_id] = cached["data"]
-                    continue
-            to_fetch.append(user_id)
+    # ---- 이벤트 로그 ----
+    @staticmethod
+    def _dedupe_key(notification, target):
+        if target is not None or not notification.get("channel_id"):
+            return None
+        return f"{notification['channel_id']}:{notification.get('timestamp')}"
+
+    def append_events(self, stream, notifications, target=None):
+        events = []
+        now = time.time()
+        with self._conn() as conn:
+            for notification in notifications:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO events (stream, target, dedupe_key, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (stream, target, self._dedupe_key(notification, target),
+                     json.dumps(notification, ensure_ascii=False), now)
+                )
+                if cursor.rowcount:
+                    events.append((cursor.lastrowid, notification, target))
+        return events
+
+    def read_events(self, stream, after_id):
+        rows = self._conn().execute(
+            "SELECT event_id, data, target FROM events WHERE stream = ? AND event_id > ? "
+            "ORDER BY event_id DESC LIMIT ?",
+            (stream, after_id, BROKER_RING_SIZE)
+        ).fetchall()
+        return [(event_id, json.loads(data), target) for event_id, data, target in reversed(rows)]
+
+    def latest_event_id(self):
+        row = self._conn().execute("SELECT MAX(event_id) FROM events").fetchone()
+        return row[0] or 0
+
+    def events_after(self, after_id, limit=1000):
+        """모든 스트림의 after_id 이후 이벤트 [(event_id, stream, notification, target)] (tail용)"""
+        rows = self._conn().execute(
+            "SELECT event_id, stream, data, target FROM events WHERE event_id > ? ORDER BY event_id LIMIT ?",
+            (after_id, limit)
+        ).fetchall()
+        return [(event_id, stream, json.loads(data), target) for event_id, stream, data, target in rows]
+
+    def prune(self):
+        """보관 기간이 지난 이벤트, 만료된 presence/lease, 오래된 비활성 세션 정리"""
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("DELETE FROM events WHERE created_at < ?", (now - EVENT_LOG_RETENTION,))
+            conn.execute("DELETE FROM presence WHERE expires_at < ?", (now,))
+            conn.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+            conn.execute("DELETE FROM sessions WHERE active = 0 AND updated_at < ?", (now - 24 * 3600,))
+
+
+def create_state_backend():
+    """STATE_BACKEND 설정에 따른 상태 백엔드 (sqlite를 열 수 없으면 memory로 대체)"""
+    if STATE_BACKEND == 'sqlite':
+        try:
+            backend = SqliteStateBackend(STATE_DB_PATH)
+            print(f"🗄️ 공유 상태 백엔드: sqlite ({STATE_DB_PATH}, process={PROCESS_ID})")
+            if not FLASK_SECRET_KEY:
+                # 워커마다 임의의 키로 세션 쿠키를 서명하므로, 다른 워커로 간 요청은 로그인/SSE 세션을 읽지 못함
+                print("⚠️ STATE_BACKEND=sqlite인데 FLASK_SECRET_KEY가 설정되지 않았습니다. "
+                      "워커마다 다른 세션 키를 사용하므로 다른 워커로 전달된 요청에서 로그인이 풀립니다. "
+                      "모든 워커에 같은 FLASK_SECRET_KEY를 지정하세요", flush=True)
+            return backend
+        except Exception as e:
+            print(f"⚠️ 공유 상태 백엔드 사용 불가 ({STATE_DB_PATH}): {e}")
+    elif STATE_BACKEND != 'memory':
+        print(f"⚠️ 알 수 없는 STATE_BACKEND: {STATE_BACKEND} (memory 사용)")
+    return InProcessStateBackend()
 
-        # 병렬로 나머지 조회
-        if to_fetch:
-            def fetch_user(uid):
-                return uid, self.get_user_info(uid)
 
-            futures = [executor.submit(fetch_user, uid) for uid in to_fetch]
-            for future in as_completed(futures):
-                uid, info = future.result()
-                results[uid] = info
+state_backend = create_state_backend()
 
-        return results
 
-    def get_thread_replies(self, channel_id, thread_ts):
-        """스레드 답글 조회"""
+def event_log_tail_thread():
+    """공유 이벤트 로그의 새 알림을 이 프로세스의 SSE 구독자에게 전달 (다른 워커가 발행한 알림 포함)"""
+    cursor = state_backend.latest_event_id()
+    last_prune = time.time()
+    while True:
+        time.sleep(EVENT_LOG_POLL_INTERVAL)
         try:
-            response = self.session.get(
-                "https://slack.com/api/conversations.replies",
-                params={
-                    "channel": channel_id,
-                    "ts": thread_ts
-                }
-            , timeout=self.timeout)
-            data = response.json()
+            events = state_backend.events_after(cursor)
+            if events:
+                cursor = events[-1][0]
+                by_stream = defaultdict(list)
+                for event_id, stream, notification, target in events:
+                    by_stream[stream].append((event_id, notification, target))
+                for stream, stream_events in by_stream.items():
+                    notification_broker.deliver(stream, stream_events)
+            if time.time() - last_prune >= 60:
+                state_backend.prune()
+                last_prune = time.time()
+        except Exception as e:
+            print(f"⚠️ 이벤트 로그 읽기 실패: {e}", flush=True)
+            time.sleep(1)
 
-            if data.get("ok"):
-                messages = data.get("messages", [])
+if state_backend.shared:
+    event_log_thread = threading.Thread(target=event_log_tail_thread, daemon=True)
+    event_log_thread.start()
 
-                if not messages:
-                    return []
 
-                # 첫 번째 메시지는 원본 메시지이므로 제외
-                thread_replies = messages[1:] if len(messages) > 1 else []
+class WorkspacePoller:
+    """token/bot_id당 하나의 백그라운드 폴러
 
-                # 사용자 정보 캐시
-                user_cache = {}
-                bot_cache = {}
-
-                # 필요한 모든 사용자 ID와 봇 ID 수집
-                user_ids = set()
-                bot_ids = set()
-                mention_user_ids = set()
-
-                for msg in thread_replies:
-                    # 메시지 작성자
-                    if "user" in msg:
-                        user_ids.add(msg["user"])
-                    elif "bot_id" in msg:
-                        bot_ids.add(msg["bot_id"])
-
-                    # 멘션된 사용자
-                    if "text" in msg:
-                        mentions = self.mention_pattern.findall(msg["text"])
-                        mention_user_ids.update(mentions)
-
-                # 모든 사용자를 병렬로 조회
-                all_user_ids = user_ids | mention_user_ids
-                if all_user_ids:
-                    user_cache = self.get_user_info_batch(list(all_user_ids))
-
-                # 봇 정보 조회 (병렬)
-                if bot_ids:
-                    def fetch_bot(bid):
-                        return bid, self.get_bot_info(bid)
-
-                    futures = [executor.submit(fetch_bot, bid) for bid in bot_ids]
-                    for future in as_completed(futures):
-                        bid, info = future.result()
-                        bot_cache[bid] = info
-
-                # 메시지에 정보 추가
-                for msg in thread_replies:
-                    # 메시지 텍스트에서 사용자 멘션 변환
-                    if "text" in msg:
-                        msg["text"] = self.replace_user_mentions(msg["text"], user_cache)
-
-                    if "user" in msg:
-                        user_id = msg["user"]
-                        user_info = user_cache.get(user_id, {})
-                        msg["user_name"] = self.get_display_name(user_info)
-                        msg["is_bot"] = user_info.get("is_bot", False)
-                    elif "bot_id" in msg:
-                        bot_id = msg["bot_id"]
-                        bot_info = bot_cache.get(bot_id, {})
-                        msg["user_name"] = bot_info.get("name", msg.get("username", "Bot"))
-                        msg["is_bot"] = True
-                    elif "username" in msg:
-                        msg["user_name"] = msg["username"]
-                        msg["is_bot"] = True
-                    else:
-                        msg["user_name"] = "Unknown"
-                        msg["is_bot"] = False
+    check_new_mentions 스캔은 폴러가 한 번만 수행하고, 결과를 구독 중인 모든 SSE 세션에
+    전달한다. 세션별 필터(모니터링 활성 여부, 세션 시작 시점)는 전달 시점에만 적용하므로
+    브라우저 탭이 늘어나도 Slack API 호출 수는 그대로 유지된다.
 
-                return thread_replies
+    여러 프로세스로 실행하면 SSE 구독자가 있는 프로세스마다 폴러가 생기지만, 스트림별
+    lease를 가진 리더 하나만 스캔하고 나머지는 lease가 비기를 기다린다.
+    """
+
+    # 폴링 주기 (채널별 스캔 간격은 ChannelScanScheduler가 결정)
+    POLLING_FAST = 0.2      # 사이클 사이 최소 대기 시간
+    POLLING_SLOW = 0.8      # 활성 세션이 없을 때 대기 시간
+    SEEN_LIMIT = 5000       # 중복 전달 방지용 (channel_id, ts) 기록 개수
+
+    def __init__(self, token, bot_id, team_url=''):
+        self.token = token
+        self.bot_id = bot_id
+        self.notifier = SlackNotifier(token, bot_id)
+        self.notifier.team_url = team_url
+        # 알림 스캔은 화면 조회보다 먼저 rate limit 토큰을 받음
+        self.notifier.request_priority = SLACK_PRIORITY_SCAN
+        # 비동기 엔진 사용 시 스캔은 공용 이벤트 루프에서 수행 (채널 조회에 스레드를 쓰지 않음)
+        self.async_notifier = None
+        if SLACK_ASYNC_ENGINE and aiohttp is not None:
+            self.async_notifier = AsyncSlackNotifier(token, bot_id, notifier=self.notifier)
+        self.stream = notification_stream_key(token, bot_id)  # 알림 브로커 스트림
+        self.lease_name = f"poller:{self.stream}"  # 리더 lease 이름
+        self.is_leader = False
+        self._lease_renewed_at = 0
+        self._presence_sent = (None, 0)  # (마지막으로 기록한 구독 세션, 기록 시각)
+        self._thread = None
+        self._running = False
+        self.watermarks = None  # 채널/DM별 워터마크 (첫 스캔 시 로드)
+        self.scheduler = ChannelScanScheduler()  # 채널별 스캔 간격
+        # 푸시 수신과 폴백 폴링이 같은 메시지를 두 번 전달하지 않도록 기록
+        self._seen = OrderedDict()
+        self._seen_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        # 설정 저장소에서 받은 변경 (폴러 스레드에서 반영)
+        self._config_changes = {}  # {name: value}
+        self._config_lock = threading.Lock()
+
+    def start(self):
+        """백그라운드 스레드 시작"""
+        self._running = True
+        config_store.subscribe(self._on_config_change, self.bot_id)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _initialize(self):
+        """폴러 초기화 (watched_users, 우선순위 키워드 로드)"""
+        # watched_users 로드 (사용자별)
+        self.notifier.watched_users = load_user_watched_users(self.bot_id)
+        # 우선순위 키워드 로드 (사용자별, 컴파일된 매처 캐시 사용)
+        self.notifier.priority_keywords = get_user_priority_keywords(self.bot_id)
+        self.notifier.keyword_matcher = get_bot_keyword_matcher(self.bot_id)
+        # watched_users를 user_id로 변환 (초기화 시 한 번만)
+        self.notifier.refresh_watched_user_ids()
+        # 사용자가 고정한 채널 (DM과 함께 우선 스캔)
+        self.scheduler.set_pinned(load_user_settings(self.bot_id).get('pinned_channels', []))
+        print(f"✅ 공유 폴러 시작 (bot_id={self.bot_id}, watched_users={self.notifier.watched_users})", flush=True)
+
+    def subscribe(self, session_id, loop=None, last_event_id=None):
+        """SSE 세션 구독 등록 (last_event_id 이후 이벤트는 재전송)"""
+        subscription = notification_broker.subscribe(self.stream, session_id, loop, last_event_id)
+        self._update_presence(force=True)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """SSE 세션 구독 해제"""
+        notification_broker.unsubscribe(subscription)
+        self._update_presence(force=True)
+        if self.subscriber_count() == 0:
+            # 폴백 대기 중이어도 바로 종료 판정하도록 깨움
+            self._wakeup.set()
+
+    def subscriber_count(self):
+        return notification_broker.subscriber_count(self.stream)
+
+    def _active_sessions(self):
+        """모든 프로세스에서 구독 중이고 모니터링이 활성화된 세션 {session_id: 시작 시점}"""
+        return state_backend.active_sessions(self.stream)
+
+    def _update_presence(self, force=False):
+        """이 프로세스의 구독 세션을 상태 백엔드에 기록 (바뀌었거나 POLLER_LEASE_RENEW가 지났을 때)"""
+        session_ids = notification_broker.session_ids(self.stream)
+        last_ids, last_sent = self._presence_sent
+        if not force and session_ids == last_ids and time.time() - last_sent < POLLER_LEASE_RENEW:
+            return
+        state_backend.set_presence(self.stream, PROCESS_ID, session_ids, POLLER_LEASE_TTL)
+        self._presence_sent = (session_ids, time.time())
+
+    def _renew_lease(self):
+        """리더 lease 획득/갱신 (리더가 바뀌면 로그 출력 후 워터마크를 디스크에서 다시 읽도록 초기화)"""
+        if self.is_leader and time.time() - self._lease_renewed_at < POLLER_LEASE_RENEW:
+            return True
+        leader = state_backend.acquire_lease(self.lease_name, PROCESS_ID, POLLER_LEASE_TTL)
+        if leader:
+            self._lease_renewed_at = time.time()
+        if leader != self.is_leader:
+            self.is_leader = leader
+            if leader:
+                print(f"👑 폴러 리더 획득 (bot_id={self.bot_id}, process={PROCESS_ID})", flush=True)
             else:
-                return []
+                print(f"🔁 폴러 리더 상실 (bot_id={self.bot_id}, process={PROCESS_ID})", flush=True)
+                if self.watermarks is not None:
+                    self.watermarks.flush(force=True)
+            # 리더가 바뀌는 사이 다른 프로세스가 전진시킨 워터마크부터 이어서 스캔
+            self.watermarks = None
+        return leader
+
+    def _wait(self, timeout):
+        """timeout 동안 대기 (깨우면 바로 반환). 대기 중에도 lease와 구독 세션 기록을 갱신"""
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            if self._wakeup.wait(min(remaining, POLLER_LEASE_RENEW)):
+                self._wakeup.clear()
+                return
+            self._update_presence()
+            if self.is_leader:
+                self._renew_lease()
+
+    def _filter_unseen(self, notifications):
+        """이미 전달한 메시지를 제외"""
+        unseen = []
+        with self._seen_lock:
+            for notif in notifications:
+                key = (notif.get("channel_id"), notif.get("timestamp"))
+                if key in self._seen:
+                    continue
+                self._seen[key] = True
+                unseen.append(notif)
+            while len(self._seen) > self.SEEN_LIMIT:
+                self._seen.popitem(last=False)
+        return unseen
+
+    def _publish(self, notifications):
+        """알림 브로커로 발행 (세션별 필터는 브로커가 전달 시점에 적용)
+
+        채널별 워터마크로 중복 없이 스캔하므로, 세션 필터는 세션 시작 시점
+        이전 메시지를 거르는 용도로만 사용한다.
+        """
+        if notifications:
+            notification_broker.publish(self.stream, notifications)
+
+    def ingest_event(self, event):
+        """푸시로 수신한 메시지 이벤트를 폴링과 같은 감지 경로로 처리하여 즉시 전달"""
+        self.notifier.archive_message_event(event)
+        channel_id = event.get("channel")
+        if channel_id and event.get("ts"):
+            self.scheduler.note_activity(channel_id, event["ts"])
+        if event.get("channel_type") == "im" and channel_id not in _global_im_cache.get(self.notifier.cache_key, ()):
+            # 새로 열린 DM: 다음 폴백 스캔에서 DM 목록을 다시 조회
+            _global_im_cache.pop(self.notifier.cache_key)
+        # 리더가 아니어도 받은 푸시는 바로 발행 (공유 이벤트 로그가 리더의 폴백 스캔과 중복을 거름)
+        if not self._active_sessions():
+            return
+        notification = self.notifier.detect_event_notification(event)
+        if not notification:
+            return
+        notifications = self._filter_unseen([notification])
+        if notifications:
+            print(f"⚡ 푸시 알림 전달 (bot_id={self.bot_id}): {notification.get('reason')}: {notification.get('channel')}", flush=True)
+            self._publish(notifications)
+
+    def _on_config_change(self, bot_id, name, value):
+        """설정 저장소 변경 알림 (저장한 스레드에서 호출되므로 기록만 하고 폴러를 깨움)"""
+        with self._config_lock:
+            self._config_changes[name] = value
+        self._wakeup.set()
+
+    def _apply_config_changes(self):
+        """받은 설정 변경을 폴러 스레드에서 반영 (디스크를 다시 읽지 않음)"""
+        with self._config_lock:
+            changes, self._config_changes = self._config_changes, {}
+        if 'watched_users' in changes:
+            self._reload_watched_users(changes['watched_users'] or [])
+        if 'settings' in changes:
+            self._reload_pinned_channels((changes['settings'] or {}).get('pinned_channels', []))
+
+    def _reload_watched_users(self, new_watched_users):
+        try:
+            # 변경 사항이 있으면 리로드
+            if new_watched_users != self.notifier.watched_users:
+                self.notifier.watched_users = new_watched_users
+                self.notifier.refresh_watched_user_ids()
+                print(f"🔄 감시 사용자 목록 리로드됨 ({self.bot_id}): {self.notifier.watched_users}")
         except Exception as e:
-            print(f"스레드 답글 조회 오류: {e}")
-            return []
+            print(f"⚠️ watched_users 리로드 실패: {e}")
 
-    def get_my_activity(self, limit=50):
-        """내 활동 메시지 조회 (멘션, 반응, 스레드, DM 등 모든 활동)"""
-        try:
-            all_activities = []
-            channels = self.get_channels_with_bot()
+    def _reload_pinned_channels(self, pinned):
+        pinned = set(pinned)
+        if pinned != self.scheduler.pinned:
+            self.scheduler.set_pinned(pinned)
+            print(f"🔄 고정 채널 리로드됨 ({self.bot_id}): {len(pinned)}개")
 
-            print(f"=== 내 활동 조회 시작: 총 {len(channels)}개 채널 검색 ===")
+    def _run(self):
+        try:
+            self._initialize()
+        except Exception as e:
+            print(f"❌ 공유 폴러 초기화 오류: {e}", flush=True)
 
-            # 1. 각 채널에서 나와 관련된 활동 찾기
-            for channel in channels:
-                channel_id = channel["id"]
-                channel_name = channel["name"]
-                channel_type = "channel"
+        while True:
+            # 구독자가 모두 떠나면 폴러 종료
+            with _workspace_pollers_lock:
+                if self.subscriber_count() == 0:
+                    self._running = False
+                    self._wakeup.set()
+                    config_store.unsubscribe(self._on_config_change)
+                    if self.watermarks is not None:
+                        self.watermarks.flush(force=True)
+                    # 다른 프로세스의 폴러가 바로 넘겨받도록 lease와 구독 세션 기록 반환
+                    state_backend.set_presence(self.stream, PROCESS_ID, (), POLLER_LEASE_TTL)
+                    if self.is_leader:
+                        state_backend.release_lease(self.lease_name, PROCESS_ID)
+                    if self.async_notifier is not None:
+                        asyncio.run_coroutine_threadsafe(self.async_notifier.close(), get_async_loop())
+                    if _workspace_pollers.get((self.token, self.bot_id)) is self:
+                        del _workspace_pollers[(self.token, self.bot_id)]
+                    print(f"🛑 공유 폴러 종료 (bot_id={self.bot_id})", flush=True)
+                    return
 
-                try:
-                    response = self.session.get(
-                        "https://slack.com/api/conversations.history",
-                        params={
-                            "channel": channel_id,
-                            "limit": 100  # 각 채널에서 최근 100개 확인
-                        }
-                    , timeout=self.timeout)
-                    data = response.json()
-
-                    if data.get("ok"):
-                        messages = data.get("messages", [])
-
-                        for msg in messages:
-                            text = msg.get("text", "")
-                            activity_type = None
-                            msg_user = msg.get("user")
-
-                            # 1) 나에 대한 직접 멘션
-                            if f'<@{self.bot_user_id}>' in text:
-                                activity_type = "mention"
-                                msg["activity_type"] = "멘션"
-                                msg["activity_icon"] = "💬"
-
-                            # 2) 내가 보낸 메시지에 대한 스레드 답글
-                            elif msg.get("thread_ts") and msg.get("thread_ts") != msg.get("ts"):
-                                # 스레드의 원본 메시지가 내가 작성한 것인지 확인
-                                thread_parent_ts = msg.get("thread_ts")
-                                # 원본 메시지 찾기
-                                parent_msg = next((m for m in messages if m.get("ts") == thread_parent_ts), None)
-                                # 원본 메시지가 내가 작성한 것이고, 답글은 다른 사람이 작성한 경우만 포함
-                                if parent_msg and parent_msg.get("user") == self.bot_user_id and msg_user != self.bot_user_id:
-                                    activity_type = "thread"
-                                    msg["activity_type"] = "스레드 답글"
-                                    msg["activity_icon"] = "💭"
-
-                            # 3) 내 메시지에 대한 반응 (내가 작성한 메시지만)
-                            elif msg.get("reactions") and msg_user == self.bot_user_id:
-                                activity_type = "reaction"
-                                reactions_text = ", ".join([f":{r['name']}:" for r in msg.get("reactions", [])])
-                                msg["activity_type"] = f"반응: {reactions_text}"
-                                msg["activity_icon"] = "❤️"
-
-                            # 4) @channel, @here 전체 멘션 (내가 보낸 것이 아닌 경우만)
-                            elif ("@channel" in text or "@here" in text) and msg_user != self.bot_user_id:
-                                activity_type = "broadcast"
-                                msg["activity_type"] = "전체 멘션"
-                                msg["activity_icon"] = "📢"
-
-                            if activity_type:
-                                msg["channel_id"] = channel_id
-                                msg["channel_name"] = channel_name
-                                msg["channel_type"] = channel_type
-                                all_activities.append(msg)
+            try:
+                self._update_presence()
+                # 스트림당 리더 하나만 스캔 (다른 프로세스가 리더면 lease가 빌 때까지 대기)
+                if not self._renew_lease():
+                    self._wait(POLLER_LEASE_RETRY)
+                    continue
 
-                except Exception as e:
-                    print(f"채널 {channel_name} 조회 오류: {e}")
+                sessions = self._active_sessions()
+                if not sessions:
+                    # 활성 세션이 없으면 스캔하지 않음 (재개 시 워터마크부터 이어서 스캔)
+                    self._wait(self.POLLING_SLOW)
                     continue
 
-            # 2. DM (Direct Message) 조회
-            try:
-                dm_response = self.session.get(
-                    "https://slack.com/api/conversations.list",
-                    params={
-                        "types": "im",  # Direct Message
-                        "limit": 100
-                    }
-                , timeout=self.timeout)
-                dm_data = dm_response.json()
-
-                if dm_data.get("ok"):
-                    dm_channels = dm_data.get("channels", [])
-                    print(f"=== {len(dm_channels)}개 DM 채널 검색 ===")
-
-                    for dm_channel in dm_channels[:10]:  # 최근 10개 DM만 확인
-                        dm_id = dm_channel["id"]
-
-                        try:
-                            dm_history = self.session.get(
-                                "https://slack.com/api/conversations.history",
-                                params={
-                                    "channel": dm_id,
-                                    "limit": 20
-                                }
-                            , timeout=self.timeout)
-                            dm_history_data = dm_history.json()
-
-                            if dm_history_data.get("ok"):
-                                dm_messages = dm_history_data.get("messages", [])
-
-                                for msg in dm_messages:
-                                    # 내가 받은 DM (상대방이 보낸 메시지)
-                                    if msg.get("user") != self.bot_user_id:
-                                        msg["channel_id"] = dm_id
-                                        msg["channel_name"] = "DM"
-                                        msg["channel_type"] = "dm"
-                                        msg["activity_type"] = "DM"
-                                        msg["activity_icon"] = "✉️"
-                                        all_activities.append(msg)
-                        except Exception as e:
-                            print(f"DM 조회 오류: {e}")
-                            continue
+                # 0. 설정 저장소에서 받은 watched_users, 고정 채널 변경 반영
+                self._apply_config_changes()
+
+                # 키워드 변경 시 재생성된 매처 반영 (캐시 조회만 수행)
+                self.notifier.keyword_matcher = get_bot_keyword_matcher(self.bot_id)
+
+                # 1. 워터마크 로드 (워터마크가 없는 채널은 활성 세션 중 가장 이른 시점부터)
+                if self.watermarks is None:
+                    default_since = min(sessions.values())
+                    self.watermarks = ChannelWatermarks(self.bot_id, default_since)
+
+                # 2. 실제 Slack 알림 확인 (구독자 수와 무관하게 한 번만, 스캔 시점이 된 채널의 델타만 조회)
+                cycle_started = time.perf_counter()
+                if self.async_notifier is not None:
+                    notifications, _ = run_async(self.async_notifier.check_new_mentions(
+                        self.watermarks.default_since, self.watermarks, self.scheduler))
+                else:
+                    notifications, _ = self.notifier.check_new_mentions(
+                        self.watermarks.default_since, self.watermarks, self.scheduler)
+                workspace_label = metrics_workspace_label(self.notifier.cache_key)
+                slack_scan_cycle_duration.observe(time.perf_counter() - cycle_started, workspace=workspace_label,
+                                                  engine='async' if self.async_notifier is not None else 'sync')
+                slack_scan_notifications.inc(len(notifications), workspace=workspace_label)
+                self.watermarks.flush()
+                notifications = self._filter_unseen(notifications)
+
+                if notifications:
+                    print(f"🔔 {len(notifications)}개 알림 전송 (bot_id={self.bot_id}, 구독자={len(sessions)}, 채널={self.scheduler.stats()})", flush=True)
+                    for i, notif in enumerate(notifications):
+                        print(f"  [{i+1}] {notif.get('reason')}: {notif.get('channel')} - {notif.get('text')[:50]}", flush=True)
+
+                # 3. 세션별 필터는 전달 시점에 적용
+                self._publish(notifications)
+
+                # 푸시 수신이 동작 중이면 폴링은 누락 보완용 폴백으로만 수행
+                if push_ingestion_active():
+                    self._wait(PUSH_FALLBACK_POLLING)
+                else:
+                    # 다음 채널의 스캔 시점까지 대기 (DM/고정 채널이 있으면 최대 PRIORITY_SCAN_MAX_STALENESS)
+                    # 설정 변경 알림을 받으면 바로 깨어나 반영
+                    self._wait(max(self.POLLING_FAST, self.scheduler.next_due_in()))
 
             except Exception as e:
-                print(f"DM 목록 조회 오류: {e}")
+                print(f"⚠️ 공유 폴러 루프 오류: {e}", flush=True)
+                import traceback
+                traceback.print_exc()
+                # 에러가 나도 계속 진행
+                time.sleep(1)
 
-            print(f"=== 총 {len(all_activities)}개 활동 발견 ===")
 
-            # 타임스탬프로 정렬 (최신순)
-            all_activities.sort(key=lambda x: float(x.get('ts', 0)), reverse=True)
+def subscribe_workspace_poller(token, bot_id, session_id, team_url='', loop=None, last_event_id=None):
+    """token/bot_id에 해당하는 공유 폴러에 세션을 구독 (폴러가 없으면 생성 후 시작)
 
-            # limit 적용
-            messages = all_activities[:limit]
+    loop는 비동기 SSE 연결에서 구독할 때 해당 이벤트 루프를 전달한다.
+    last_event_id가 주어지면 그 이후 이벤트를 상태 백엔드(링 버퍼/공유 이벤트 로그)에서 재전송한다.
+    """
+    key = (token, bot_id)
+    with _workspace_pollers_lock:
+        poller = _workspace_pollers.get(key)
+        if poller is None or not poller._running:
+            poller = WorkspacePoller(token, bot_id, team_url)
+            _workspace_pollers[key] = poller
+            poller.start()
+        elif team_url and not poller.notifier.team_url:
+            poller.notifier.team_url = team_url
+        # 폴러 종료 판정과 경합하지 않도록 같은 락 안에서 구독
+        subscription = poller.subscribe(session_id, loop, last_event_id)
+    return poller, subscription
 
-            if not messages:
-                print("=== 멘션 메시지 없음 ===")
-                return []
 
-            # 사용자 정보 캐싱
-            user_cache = {}
-            bot_cache = {}
 
-            # 필요한 모든 사용자 ID와 봇 ID 수집
-            user_ids = set()
-            bot_ids = set()
-            mention_user_ids = set()
+# ============================================================
+# 채널 실시간 스트림 (채널당 폴러 하나)
+# ============================================================
 
-            for msg in messages:
-                # 메시지 작성자
-                if "user" in msg:
-                    user_ids.add(msg["user"])
-                elif "bot_id" in msg:
-                    bot_ids.add(msg["bot_id"])
-
-                # 멘션된 사용자
-                if "text" in msg:
-                    mentions = self.mention_pattern.findall(msg["text"])
-                    mention_user_ids.update(mentions)
-
-            # 모든 사용자를 병렬로 조회
-            all_user_ids = user_ids | mention_user_ids
-            if all_user_ids:
-                user_cache = self.get_user_info_batch(list(all_user_ids))
-
-            # 봇 정보 조회 (병렬)
-            if bot_ids:
-                def fetch_bot(bid):
-                    return bid, self.get_bot_info(bid)
-
-                futures = [executor.submit(fetch_bot, bid) for bid in bot_ids]
-                for future in as_completed(futures):
-                    bid, info = future.result()
-                    bot_cache[bid] = info
-
-            # 메시지에 정보 추가
-            for msg in messages:
-                # 메시지 텍스트에서 사용자 멘션 변환
-                if "text" in msg:
-                    msg["text"] = self.replace_user_mentions(msg["text"], user_cache)
-
-                if "user" in msg:
-                    user_id = msg["user"]
-                    user_info = user_cache.get(user_id, {})
-                    msg["user_name"] = self.get_display_name(user_info)
-                    msg["is_bot"] = user_info.get("is_bot", False)
-                elif "bot_id" in msg:
-                    bot_id = msg["bot_id"]
-                    bot_info = bot_cache.get(bot_id, {})
-                    msg["user_name"] = bot_info.get("name", msg.get("username", "Bot"))
-                    msg["is_bot"] = True
-                elif "username" in msg:
-                    msg["user_name"] = msg["username"]
-                    msg["is_bot"] = True
-                else:
-                    msg["user_name"] = "Unknown"
-                    msg["is_bot"] = False
+CHANNEL_STREAM_INTERVAL = 1.5  # 채널 새 메시지 확인 주기 (초)
+CHANNEL_STREAM_BACKLOG = 10  # 새로 연결한 시청자에게도 보내는 최근 메시지 범위 (초)
+CHANNEL_VIEWER_QUEUE_SIZE = 100  # 시청자별 대기 메시지 한도 (넘으면 버림)
+
+_channel_streams = {}  # {(token, channel_id): ChannelStream}
+_channel_streams_lock = threading.Lock()
+
+
+class ChannelStream:
+    """채널당 하나의 새 메시지 폴러 (시청자 수와 무관)
+
+    마지막으로 본 ts 이후의 메시지만 조회하고, 새 메시지만 한 번 변환(이름/멘션)하여
+    모든 시청자 큐에 전달한다. 마지막 시청자가 떠나면 종료한다.
+    """
+
+    def __init__(self, token, channel_id, bot_id=None):
+        self.key = (token, channel_id)
+        self.channel_id = channel_id
+        self.notifier = SlackNotifier(token, bot_id)
+        self.last_ts = f"{time.time() - CHANNEL_STREAM_BACKLOG:.6f}"
+        self._viewers = set()
+        self._recent = deque(maxlen=50)  # 새 시청자에게 보낼 최근 메시지 (변환 완료, 전달 순서)
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def subscribe(self):
+        """시청자 등록 (최근 CHANNEL_STREAM_BACKLOG초 메시지는 바로 전달)"""
+        viewer = queue.Queue(maxsize=CHANNEL_VIEWER_QUEUE_SIZE)
+        cutoff = time.time() - CHANNEL_STREAM_BACKLOG
+        with self._lock:
+            for msg in self._recent:
+                if float(msg.get("ts", 0)) > cutoff:
+                    viewer.put_nowait(msg)
+            self._viewers.add(viewer)
+        return viewer
+
+    def unsubscribe(self, viewer):
+        with self._lock:
+            self._viewers.discard(viewer)
+
+    def viewer_count(self):
+        with self._lock:
+            return len(self._viewers)
+
+    def _poll(self):
+        """last_ts 이후 새 메시지를 조회하여 시청자에게 전달"""
+        oldest = self.last_ts
+        scanned_at = time.time()
+        data = self.notifier._api_get_all("conversations.history", "messages", {
+            "channel": self.channel_id,
+            "oldest": oldest
+        })
+        if not data.get("ok"):
+            print(f"⚠️ 채널 스트림 조회 실패 ({self.channel_id}): {data.get('error')}", flush=True)
+            return
 
-            print(f"=== {len(messages)}개 메시지 반환 ===")
-            return messages
-        except Exception as e:
-            print(f"내 활동 조회 오류: {e}")
-            return []
+        messages = data.get("messages", [])
+        self.notifier.archive_scanned_messages(self.channel_id, oldest, messages, scanned_at)
+        if not messages:
+            return
 
-    def get_usergroup_handle(self, subteam_id):
-        """User Group ID로 handle 조회 (캐싱 적용)"""
-        current_time = time.time()
+        self.last_ts = max((msg["ts"] for msg in messages), key=float)
+        # 새 메시지만 변환 (최신순)
+        messages = self.notifier._enrich_messages(messages)
+        print(f">>> 새 메시지 {len(messages)}개 발견! ({self.channel_id}, 시청자={self.viewer_count()})")
+
+        with self._lock:
+            self._recent.extend(messages)
+            viewers = list(self._viewers)
+        for viewer in viewers:
+            for msg in messages:
+                try:
+                    viewer.put_nowait(msg)
+                except queue.Full:
+                    break
 
-        # 캐시가 유효하고 해당 ID가 캐시에 있으면 반환
-        if (current_time - self._usergroups_cache_time < self._usergroups_cache_ttl and
-            subteam_id in self._usergroups_cache):
-            return self._usergroups_cache[subteam_id]
+    def _run(self):
+        print(f"채널 스트리밍 시작: {self.channel_id}, last_ts={self.last_ts}")
+        while True:
+            # 시청자가 모두 떠나면 종료
+            with _channel_streams_lock:
+                if self.viewer_count() == 0:
+                    self._running = False
+                    if _channel_streams.get(self.key) is self:
+                        del _channel_streams[self.key]
+                    print(f"🛑 채널 스트리밍 종료: {self.channel_id}")
+                    return
 
-        # 캐시가 만료되었거나 없으면 전체 목록 새로 조회
-        if current_time - self._usergroups_cache_time >= self._usergroups_cache_ttl:
             try:
-                list_response = self.session.get(
-                    "https://slack.com/api/usergroups.list",
-                    params={"include_users": False}
-                , timeout=self.timeout)
-                list_data = list_response.json()
-                if list_data.get("ok"):
-                    # 전체 캐시 갱신
-                    self._usergroups_cache = {
-                        ug.get("id"): ug.get("handle", "그룹")
-                        for ug in list_data.get("usergroups", [])
-                    }
-                    self._usergroups_cache_time = current_time
+                self._poll()
+                time.sleep(CHANNEL_STREAM_INTERVAL)
             except Exception as e:
-                print(f"❌ User Group 목록 조회 실패: {e}")
+                print(f"!!! 채널 스트림 오류: {e}")
+                import traceback
+                traceback.print_exc()
+                time.sleep(5)
+
+
+def subscribe_channel_stream(token, channel_id, bot_id=None):
+    """채널 스트림에 시청자 등록 (스트림이 없으면 생성 후 시작)"""
+    key = (token, channel_id)
+    with _channel_streams_lock:
+        stream = _channel_streams.get(key)
+        if stream is None or not stream._running:
+            stream = ChannelStream(token, channel_id, bot_id)
+            _channel_streams[key] = stream
+            stream.start()
+        # 스트림 종료 판정과 경합하지 않도록 같은 락 안에서 등록
+        viewer = stream.subscribe()
+    return stream, viewer
+
+# ============================================================
+# 푸시 기반 메시지 수신 (Events API / Socket Mode)
+# ============================================================
+
+_last_push_event_at = 0.0  # 마지막으로 푸시 이벤트를 받은 시각
+
+
+def push_ingestion_enabled():
+    """푸시 수신 경로가 설정되어 있는지 여부 (events는 서명 검증 키가 있어야 활성화)"""
+    if SLACK_INGESTION_MODE == 'events':
+        return bool(SLACK_SIGNING_SECRET)
+    if SLACK_INGESTION_MODE == 'socket':
+        return socket_mode_client is not None
+    return False
+
+
+def push_ingestion_active():
+    """푸시 수신이 실제로 동작 중인지 여부 (동작 중이면 폴링은 폴백으로만 수행)
 
-        # 캐시에서 반환 (없으면 기본값)
-        return self._usergroups_cache.get(subteam_id, "그룹")
+    설정만으로는 판단하지 않고, 최근 PUSH_EVENT_LIVENESS 안에 이벤트를 받은 경우에만
+    동작 중으로 본다. 이벤트가 끊기면 평소 주기의 폴링으로 돌아간다.
+    """
+    if not push_ingestion_enabled():
+        return False
+    if SLACK_INGESTION_MODE == 'socket' and not socket_mode_client.connected:
+        return False
+    return time.time() - _last_push_event_at < PUSH_EVENT_LIVENESS
+
+
+def dispatch_slack_event(payload):
+    """Events API / Socket Mode 페이로드를 해당 봇의 공유 폴러로 전달
 
-    def get_usergroup_members(self, subteam_id):
-        """User Group ID로 멤버 리스트 조회 (캐싱 적용)"""
-        current_time = time.time()
+    전달한 폴러 수를 반환한다.
+    """
+    global _last_push_event_at
+    if payload.get("type") != "event_callback":
+        return 0
+    _last_push_event_at = time.time()
 
-        # 캐시가 유효하고 해당 ID가 캐시에 있으면 반환
-        if (subteam_id in self._usergroup_members_cache_time and
-            current_time - self._usergroup_members_cache_time[subteam_id] < self._usergroup_members_cache_ttl):
-            return self._usergroup_members_cache.get(subteam_id, [])
+    event = payload.get("event", {})
+    # 이벤트를 받을 권한이 있는 봇/사용자 (없으면 모든 폴러에 전달)
+    authorized_ids = {auth.get("user_id") for auth in payload.get("authorizations", [])}
 
-        # 캐시가 없거나 만료되면 API 호출
+    with _workspace_pollers_lock:
+        pollers = [poller for poller in _workspace_pollers.values()
+                   if not authorized_ids or poller.bot_id in authorized_ids]
+
+    for poller in pollers:
         try:
-            response = self.session.get(
-                "https://slack.com/api/usergroups.users.list",
-                params={"usergroup": subteam_id}
-            , timeout=self.timeout)
-            data = response.json()
-            if data.get("ok"):
-                members = data.get("users", [])
-                # 캐시 저장
-                self._usergroup_members_cache[subteam_id] = members
-                self._usergroup_members_cache_time[subteam_id] = current_time
-                return members
+            poller.ingest_event(event)
         except Exception as e:
-            print(f"❌ 그룹 멤버 조회 실패: {e}")
+            print(f"⚠️ 이벤트 처리 오류 (bot_id={poller.bot_id}): {e}", flush=True)
+    return len(pollers)
 
-        # 실패 시 빈 리스트 반환
-        return []
 
-    def check_new_mentions(self, since_timestamp):
-        """새로운 멘션 확인 (병렬 처리 최적화)"""
-        notifications = []
-        channels = self.get_channels_with_bot()
-        max_timestamp = since_timestamp  # 처리한 메시지 중 가장 최신 timestamp 추적
+def verify_slack_signature(headers, body):
+    """Events API 요청 서명 검증 (SLACK_SIGNING_SECRET 미설정 시 항상 거부)"""
+    if not SLACK_SIGNING_SECRET:
+        return False
 
-        # 채널 병렬 처리 함수
-        def check_channel(channel):
-            channel_notifications = []
-            local_max_ts = since_timestamp
-            channel_id = channel["id"]
-            channel_name = channel["name"]
+    timestamp = headers.get('X-Slack-Request-Timestamp', '')
+    signature = headers.get('X-Slack-Signature', '')
+    try:
+        # 재전송 공격 방지 (5분 이상 지난 요청 거부)
+        if abs(time.time() - int(timestamp)) > 60 * 5:
+            return False
+    except ValueError:
+        return False
 
-            try:
-                response = self.session.get(
-                    "https://slack.com/api/conversations.history",
-                    params={
-                        "channel": channel_id,
-                        "oldest": str(since_timestamp),
-                        "limit": 100
-                    },
-                    timeout=self.timeout
-                )
-                data = response.json()
+    base = f"v0:{timestamp}:".encode('utf-8') + body
+    expected = 'v0=' + hmac.new(SLACK_SIGNING_SECRET.encode('utf-8'), base, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
 
-                if data.get("ok"):
-                    messages = data.get("messages", [])
 
-                    for msg in messages:
-                        text = msg.get("text", "")
-                        user_id = msg.get("user", "")
-                        bot_id = msg.get("bot_id", "")
-                        ts = float(msg.get("ts", 0))
+class SocketModeClient:
+    """Slack Socket Mode 웹소켓 클라이언트
 
-                        # 자신의 메시지는 제외
-                        if user_id == self.bot_user_id:
-                            continue
-
-                        is_notification = False
-                        notification_reason = ""
-
-                        # 1. 봇 멘션 확인
-                        if f'<@{self.bot_user_id}>' in text:
-                            is_notification = True
-                            notification_reason = "봇 멘션"
-
-                        # 2. @channel, @here 확인
-                        elif '@here' in text or '@channel' in text or '<!channel' in text or '<!here' in text:
-                            is_notification = True
-                            notification_reason = "@here/@channel"
-
-                        # 3. User Group 멘션 확인 (<!subteam^ID> 또는 <!subteam^ID|@groupname> 형식)
-                        elif '<!subteam^' in text:
-                            # 두 가지 패턴 모두 지원: <!subteam^ID> 또는 <!subteam^ID|@groupname>
-                            subteam_pattern = re.compile(r'<!subteam\^([A-Z0-9]+)(?:\|@([^>]+))?>')
-                            matches = subteam_pattern.findall(text)
-                            for match in matches:
-                                subteam_id = match[0]
-                                # 메시지에 포함된 이름이 있으면 사용, 없으면 캐시에서 조회
-                                group_name = match[1] if match[1] else self.get_usergroup_handle(subteam_id)
-
-                                # User Group 멤버 확인 (캐싱 사용)
-                                members = self.get_usergroup_members(subteam_id)
-
-                                # 1) 감시 중인 사용자가 그룹에 속해있는지 확인
-                                for watched_user_id in self.watched_user_ids:
-                                    if watched_user_id in members:
-                                        is_notification = True
-                                        notification_reason = f"그룹 멘션 (@{group_name})"
-                                        break
-
-                                # 2) watched_users가 비어있거나, 봇 자신이 그룹 멤버인 경우
-                                if not is_notification:
-                                    if not self.watched_user_ids or self.bot_user_id in members:
-                                        is_notification = True
-                                        notification_reason = f"그룹 멘션 (@{group_name})"
-
-                                if is_notification:
-                                    break
-
-                        # 4. 등록된 사용자 멘션 확인
-                        if not is_notification:
-                            for watched_user_id in self.watched_user_ids:
-                                if f'<@{watched_user_id}>' in text:
-                                    is_notification = True
-                                    notification_reason = f"사용자 멘션"
-                                    break
-
-                        if is_notification:
-                            # 사용자 또는 봇 정보 가져오기
-                            if user_id:
-                                user_info = self.get_user_info(user_id)
-                                display_name = self.get_display_name(user_info)
-                            elif bot_id:
-                                bot_info = self.get_bot_info(bot_id)
-                                display_name = bot_info.get("name", msg.get("username", "Bot"))
-                            else:
-                                display_name = msg.get("username", "Unknown")
-
-                            # 텍스트에서 사용자 멘션을 실제 이름으로 변환
-                            user_cache = {}
-                            display_text = self.replace_user_mentions(text, user_cache)
-
-                            # 메시지 링크 생성
-                            message_link = self.get_message_link(channel_id, str(ts))
-
-                            # 우선순위 분류 (사용자별 키워드 사용)
-                            priority, priority_reason = classify_message_priority(
-                                text, display_name, channel_name,
-                                keywords=self.priority_keywords
-                            )
-
-                            channel_notifications.append({
-                                "channel": channel_name,
-                                "channel_id": channel_id,
-                                "user": display_name,
-                                "text": display_text,
-                                "timestamp": ts,
-                                "reason": notification_reason,
-                                "time": datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"),
-                                "message_link": message_link,
-                                "priority": priority,
-                                "priority_reason": priority_reason
-                            })
-
-                        # 메시지 timestamp 추적
-                        if ts > local_max_ts:
-                            local_max_ts = ts
+    수신한 events_api 페이로드를 on_payload로 넘긴다. ws_factory(url)와 open_url()을
+    주입하면 로컬 가짜 이벤트 소스로도 동작한다.
+    """
+
+    MAX_RECONNECT_DELAY = 30
+
+    def __init__(self, app_token, on_payload, ws_factory=None, open_url=None):
+        self.app_token = app_token
+        self.on_payload = on_payload
+        self.ws_factory = ws_factory or self._create_connection
+        self.open_url = open_url or self._open_connection_url
+        self.connected = False
+        self._ws = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _open_connection_url(self):
+        """apps.connections.open으로 웹소켓 URL 발급"""
+        response = requests.post(
+            f"{SLACK_API_BASE}/apps.connections.open",
+            headers={"Authorization": f"Bearer {self.app_token}"},
+            timeout=(5, 10)
+        )
+        data = response.json()
+        if not data.get("ok"):
+            raise RuntimeError(data.get("error", "Unknown error"))
+        return data["url"]
+
+    def _create_connection(self, url):
+        if websocket is None:
+            raise RuntimeError("Socket Mode를 사용하려면 websocket-client 패키지가 필요합니다")
+        return websocket.create_connection(url)
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
 
+    def _run(self):
+        reconnect_delay = 1
+        while not self._stopped.is_set():
+            try:
+                self._ws = self.ws_factory(self.open_url())
+                self.connected = True
+                reconnect_delay = 1
+                print("✅ Socket Mode 연결됨", flush=True)
+                self._receive_loop(self._ws)
             except Exception as e:
-                pass  # 에러는 무시 (로그 감소)
+                if not self._stopped.is_set():
+                    print(f"⚠️ Socket Mode 연결 오류: {e}", flush=True)
+            finally:
+                self.connected = False
+                if self._ws is not None:
+                    try:
+                        self._ws.close()
+                    except Exception:
+                        pass
+                    self._ws = None
+
+            # 재연결 대기 (지수 백오프)
+            self._stopped.wait(reconnect_delay)
+            reconnect_delay = min(reconnect_delay * 2, self.MAX_RECONNECT_DELAY)
+
+    def _receive_loop(self, ws):
+        while not self._stopped.is_set():
+            raw = ws.recv()
+            if not raw:
+                # 서버가 연결을 닫음
+                return
+
+            envelope = json.loads(raw)
+
+            # 3초 안에 ack 해야 Slack이 재전송하지 않음 (처리는 ack 후 비동기로)
+            if envelope.get("envelope_id"):
+                ws.send(json.dumps({"envelope_id": envelope["envelope_id"]}))
+
+            envelope_type = envelope.get("type")
+            if envelope_type == "disconnect":
+                # 서버 측 재연결 요청
+                return
+            if envelope_type == "events_api":
+                executor.submit(self.on_payload, envelope.get("payload", {}))
+
+
+socket_mode_client = None
+
+if SLACK_INGESTION_MODE == 'socket':
+    if SLACK_APP_TOKEN:
+        socket_mode_client = SocketModeClient(SLACK_APP_TOKEN, dispatch_slack_event)
+        socket_mode_client.start()
+    else:
+        print("⚠️ SLACK_INGESTION_MODE=socket 이지만 SLACK_APP_TOKEN이 없어 폴링으로 동작합니다")
+elif SLACK_INGESTION_MODE == 'events' and not SLACK_SIGNING_SECRET:
+    print("⚠️ SLACK_INGESTION_MODE=events 이지만 SLACK_SIGNING_SECRET이 없어 /api/slack/events를 비활성화하고 폴링으로 동작합니다")
 
-            return channel_notifications, local_max_ts
 
-        # 채널들을 병렬로 처리
-        futures = [executor.submit(check_channel, ch) for ch in channels]
-        for future in as_completed(futures):
-            channel_notifs, local_max = future.result()
-            notifications.extend(channel_notifs)
-            if local_max > max_timestamp:
-                max_timestamp = local_max
+# ============================================================
+# 비동기 SSE 서버 (aiohttp, ASYNC_SSE_PORT 설정 시)
+# ============================================================
 
-        # 4. DM (Direct Message) 확인
-        try:
-            dm_response = self.session.get(
-                "https://slack.com/api/conversations.list",
-                params={
-                    "types": "im",  # Direct Message
-                    "limit": 100
-                }
-            , timeout=self.timeout)
-            dm_data = dm_response.json()
+def load_flask_session(cookie_value):
+    """Flask 세션 쿠키 해독 (비동기 SSE 서버에서 같은 로그인 세션을 사용)"""
+    if not cookie_value:
+        return {}
+    serializer = app.session_interface.get_signing_serializer(app)
+    try:
+        return serializer.loads(cookie_value, max_age=int(app.permanent_session_lifetime.total_seconds()))
+    except Exception:
+        return {}
+
+
+def strip_port(host):
+    """Host 헤더에서 포트 제거 (IPv6 주소 [..]는 그대로)"""
+    if host.endswith(']') or ':' not in host:
+        return host
+    return host.rsplit(':', 1)[0]
+
+
+def allowed_sse_origins(request):
+    """비동기 SSE 서버가 CORS로 허용하는 출처 (설정된 앱 주소 + SSE 서버 자신)"""
+    own_origin = f"{request.scheme}://{request.host}"
+    if APP_ORIGINS:
+        return set(APP_ORIGINS) | {own_origin}
+    return {f"{request.scheme}://{strip_port(request.host)}:{APP_PORT}", own_origin}
+
+
+async def async_monitoring_events(request):
+    """/api/monitoring/events의 비동기 버전 (연결당 스레드 없이 이벤트 루프에서 처리)"""
+    # 로그인 쿠키로 알림을 읽을 수 있으므로 앱 주소가 아닌 출처의 요청은 거부
+    origin = request.headers.get('Origin')
+    if origin and origin.rstrip('/') not in allowed_sse_origins(request):
+        print(f"⚠️ 비동기 SSE: 허용되지 않은 출처 거부 ({origin})", flush=True)
+        return aiohttp_web.Response(status=403, text='forbidden origin')
+
+    session_id = request.query.get('session_id', str(time.time()))
+    flask_session = load_flask_session(request.cookies.get(app.config['SESSION_COOKIE_NAME']))
+    token = flask_session.get('token')
+    bot_id = flask_session.get('bot_id')
+    team_url = flask_session.get('team_url', '')
+    last_event_id = parse_last_event_id(request.headers.get('Last-Event-ID') or request.query.get('last_event_id'))
+
+    headers = {'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache', 'Vary': 'Origin'}
+    # 메인 페이지와 포트가 다르므로 앱 주소에서 온 요청에만 쿠키를 포함한 교차 출처 요청 허용
+    if origin:
+        headers['Access-Control-Allow-Origin'] = origin
+        headers['Access-Control-Allow-Credentials'] = 'true'
+    response = aiohttp_web.StreamResponse(headers=headers)
+    await response.prepare(request)
+
+    print(f"🔥 비동기 SSE 연결 요청 (session_id={session_id}, bot_id={bot_id})", flush=True)
 
-            if dm_data.get("ok"):
-                dm_channels = dm_data.get("channels", [])
+    if not token:
+        await response.write(f"data: {json.dumps({'error': '연결되지 않음'})}\n\n".encode('utf-8'))
+        return response
 
-                for dm_channel in dm_channels:
-                    dm_id = dm_channel["id"]
+    try:
+        # 구독/재전송/해제는 상태 백엔드(SQLite)를 읽고 쓰므로 이벤트 루프를 막지 않도록 워커 스레드에서 수행
+        poller, subscription = await asyncio.to_thread(subscribe_workspace_poller, token, bot_id, session_id,
+                                                       team_url, loop=asyncio.get_running_loop(),
+                                                       last_event_id=last_event_id)
+    except Exception as e:
+        print(f"❌ SSE 초기화 오류: {e}", flush=True)
+        await response.write(f"data: {json.dumps({'error': f'초기화 실패: {str(e)}'})}\n\n".encode('utf-8'))
+        return response
 
-                    try:
-                        dm_history = self.session.get(
-                            "https://slack.com/api/conversations.history",
-                            params={
-                                "channel": dm_id,
-                                "oldest": str(since_timestamp),
-                                "limit": 50
-                            },
-                            timeout=self.timeout
-                        )
-                        dm_history_data = dm_history.json()
-
-                        if dm_history_data.get("ok"):
-                            dm_messages = dm_history_data.get("messages", [])
-
-                            for msg in dm_messages:
-                                # 내가 받은 DM (상대방이 보낸 메시지)
-                                if msg.get("user") != self.bot_user_id:
-                                    user_id = msg.get("user", "")
-                                    text = msg.get("text", "")
-                                    ts = float(msg.get("ts", 0))
-
-                                    user_info = self.get_user_info(user_id)
-                                    display_name = self.get_display_name(user_info)
-
-                                    # 텍스트에서 사용자 멘션을 실제 이름으로 변환
-                                    user_cache = {}
-                                    display_text = self.replace_user_mentions(text, user_cache)
-
-                                    # 메시지 링크 생성
-                                    message_link = self.get_message_link(dm_id, str(ts))
-
-                                    notifications.append({
-                                        "channel": f"DM from {display_name}",
-                                        "channel_id": dm_id,
-                                        "user": display_name,
-                                        "text": display_text,
-                                        "timestamp": ts,
-                                        "reason": "DM",
-                                        "time": datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"),
-                                        "message_link": message_link
-                                    })
-
-                                    # 메시지 timestamp 추적
-                                    if ts > max_timestamp:
-                                        max_timestamp = ts
-                    except Exception as e:
-                        print(f"DM 확인 오류: {e}")
-                        continue
+    heartbeat_interval = 15  # 유휴 시 연결 종료 감지용 heartbeat 주기
+    try:
+        await response.write(b": heartbeat\n\n")
+        last_sent_time = time.time()
+
+        # 재연결이면 놓친 이벤트부터 전송
+        for event_id, notif in await asyncio.to_thread(subscription.next_events, None):
+            await response.write(format_sse_event(event_id, notif).encode('utf-8'))
+
+        while True:
+            # 브로커가 전달한 알림 전송 (테스트 알림 포함)
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                event = None
 
+            if subscription.lagging:
+                # 밀린 구독자는 상태 백엔드에서 재전송분을 읽음
+                events = await asyncio.to_thread(subscription.next_events, event)
+            else:
+                events = subscription.next_events(event)
+            if not events:
+                if time.time() - last_sent_time >= heartbeat_interval:
+                    await response.write(b": heartbeat\n\n")
+                    last_sent_time = time.time()
+                continue
+
+            for event_id, notif in events:
+                await response.write(format_sse_event(event_id, notif).encode('utf-8'))
+            last_sent_time = time.time()
+    except ConnectionResetError:
+        # 클라이언트 연결 종료
+        print(f"🔌 비동기 SSE 연결 종료됨 (session_id={session_id})", flush=True)
+    finally:
+        await asyncio.to_thread(poller.unsubscribe, subscription)
+    return response
+
+
+def start_async_sse_server(port):
+    """공용 이벤트 루프에서 비동기 SSE 서버 시작"""
+    async def start():
+        web_app = aiohttp_web.Application()
+        web_app.router.add_get('/api/monitoring/events', async_monitoring_events)
+        runner = aiohttp_web.AppRunner(web_app)
+        await runner.setup()
+        await aiohttp_web.TCPSite(runner, '0.0.0.0', port).start()
+        return runner
+
+    runner = run_async(start())
+    print(f"⚡ 비동기 SSE 서버 시작 (port={port})", flush=True)
+    return runner
+
+
+async_sse_runner = None
+
+if ASYNC_SSE_PORT:
+    if aiohttp_web is None:
+        print("⚠️ ASYNC_SSE_PORT가 설정되었지만 aiohttp가 없어 기본 SSE로 동작합니다")
+    else:
+        try:
+            async_sse_runner = start_async_sse_server(ASYNC_SSE_PORT)
         except Exception as e:
-            print(f"DM 목록 조회 오류: {e}")
+            print(f"⚠️ 비동기 SSE 서버 시작 실패 (port={ASYNC_SSE_PORT}): {e}")
+
+if SLACK_ASYNC_ENGINE and aiohttp is None:
+    print("⚠️ SLACK_ASYNC_ENGINE=1 이지만 aiohttp가 없어 스레드 기반으로 스캔합니다")
 
-        return notifications, max_timestamp
+
+def monitoring_events_url():
+    """브라우저가 연결할 SSE 주소 (비동기 SSE 서버가 있으면 해당 포트)"""
+    if async_sse_runner is None:
+        return '/api/monitoring/events'
+    return f"{request.scheme}://{strip_port(request.host)}:{ASYNC_SSE_PORT}/api/monitoring/events"
 
 
 # Flask 라우트
 @app.route('/')
 def index():
     """메인 페이지"""
-    return render_template('index.html')
+    return render_template('index.html', events_url=monitoring_events_url())
 
 
 @app.route('/api/connect', methods=['POST'])
@@ -1273,10 +5290,7 @@ def connect():
         session_id = session.sid if hasattr(session, 'sid') else str(time.time())
 
         # 사용자별 초기화
-        if session_id not in monitoring_active:
-            monitoring_active[session_id] = False
-            last_check_times[session_id] = time.time()
-            notification_queues[session_id] = []
+        state_backend.init_session(session_id, time.time())
 
     return jsonify(result)
 
@@ -1314,16 +5328,11 @@ def debug_channels():
 
     try:
         # 모든 public 채널 조회
-        response = requests.get(
-            "https://slack.com/api/conversations.list",
-            headers={"Authorization": f"Bearer {token}"},
-            params={
-                "types": "public_channel,private_channel",
-                "exclude_archived": True,
-                "limit": 200
-            }
-        )
-        data = response.json()
+        notifier = SlackNotifier(token)
+        data = notifier._api_get_all("conversations.list", "channels", {
+            "types": "public_channel,private_channel",
+            "exclude_archived": True
+        })
 
         if data.get("ok"):
             all_channels = data.get("channels", [])
@@ -1395,16 +5404,12 @@ def get_my_activity():
 def start_monitoring():
     """실시간 모니터링 시작"""
     session_id = request.json.get('session_id', str(time.time()))
+    bot_id = session.get('bot_id')
 
-    if session_id not in monitoring_active:
-        monitoring_active[session_id] = False
-        # 10초 전부터 감지하도록 설정
-        last_check_times[session_id] = time.time() - 10
-        notification_queues[session_id] = []
-
-    monitoring_active[session_id] = True
-    # 모니터링 시작 시점도 10초 전으로 설정
-    last_check_times[session_id] = time.time() - 10
+    # 저장된 체크포인트(마지막으로 모든 채널을 스캔한 시점)가 있으면 그때부터, 없으면 10초 전부터 감지
+    # (체크포인트는 최대 WATERMARK_MAX_CATCHUP 전까지만, 이미 활성 상태면 유지)
+    resume_point = load_watermark_resume_point(bot_id) if bot_id else None
+    state_backend.start_session(session_id, resume_point if resume_point is not None else time.time() - 10)
 
     return jsonify({"success": True, "message": "모니터링 시작됨"})
 
@@ -1414,8 +5419,7 @@ def stop_monitoring():
     """실시간 모니터링 중지"""
     session_id = request.json.get('session_id', str(time.time()))
 
-    if session_id in monitoring_active:
-        monitoring_active[session_id] = False
+    state_backend.stop_session(session_id)
 
     return jsonify({"success": True, "message": "모니터링 중지됨"})
 
@@ -1424,6 +5428,10 @@ def stop_monitoring():
 def test_notification():
     """테스트 알림 생성"""
     session_id = request.json.get('session_id', str(time.time()))
+    token = session.get('token')
+
+    if not token:
+        return jsonify({"success": False, "error": "연결되지 않음"})
 
     # 더미 알림 데이터 생성
     test_notifications = [
@@ -1456,11 +5464,9 @@ def test_notification():
         }
     ]
 
-    # 세션의 알림 큐에 추가
-    if session_id not in notification_queues:
-        notification_queues[session_id] = []
-
-    notification_queues[session_id].extend(test_notifications)
+    # 해당 세션에만 보이는 이벤트로 발행
+    notification_broker.publish(notification_stream_key(token, session.get('bot_id')), test_notifications,
+                                session_id=session_id)
 
     return jsonify({"success": True, "message": f"{len(test_notifications)}개의 테스트 알림 생성됨"})
 
@@ -1473,8 +5479,10 @@ def monitoring_events():
     token = session.get('token')
     bot_id = session.get('bot_id')
     team_url = session.get('team_url', '')
+    # 브라우저 자동 재연결은 Last-Event-ID 헤더, 페이지의 수동 재연결은 last_event_id 파라미터로 전달
+    last_event_id = parse_last_event_id(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
 
-    print(f"🔥 SSE 연결 요청 (session_id={session_id}, bot_id={bot_id})", flush=True)
+    print(f"🔥 SSE 연결 요청 (session_id={session_id}, bot_id={bot_id}, last_event_id={last_event_id})", flush=True)
 
     def generate():
         # 클로저로 session_id, token, bot_id, team_url 사용
@@ -1484,110 +5492,108 @@ def monitoring_events():
             return
 
         try:
-            notifier = SlackNotifier(token, bot_id)
-            notifier.team_url = team_url
-
-            # watched_users 로드 (사용자별)
-            notifier.watched_users = load_user_watched_users(bot_id)
-
-            # 우선순위 키워드 로드 (사용자별)
-            notifier.priority_keywords = get_user_priority_keywords(bot_id)
-
-            # watched_users를 user_id로 변환 (초기화 시 한 번만)
-            notifier.refresh_watched_user_ids()
-
-            # 적응형 폴링 설정
-            polling_fast = 0.2      # 빠른 모드: 알림 있을 때
-            polling_normal = 0.5    # 일반 모드: 활동 중
-            polling_slow = 0.8      # 느린 모드: 알림 없을 때
-            current_polling = polling_normal
-
-            # 폴링 속도 조정을 위한 변수
-            consecutive_empty_checks = 0  # 연속 빈 체크 횟수
-            last_notification_time = time.time()
-
-            # 감시 사용자 목록 리로드 타이머
-            last_reload_time = time.time()
-            reload_interval = 5  # 5초마다 watched_users 다시 읽기
+            # 워크스페이스 공유 폴러에 구독 (스캔은 폴러가 한 번만 수행)
+            poller, subscription = subscribe_workspace_poller(token, bot_id, session_id, team_url,
+                                                              last_event_id=last_event_id)
 
             # 연결 성공 heartbeat 전송
             yield f": heartbeat\n\n"
 
-            print(f"✅ SSE 연결 성공 (session_id={session_id}, watched_users={notifier.watched_users}, adaptive_polling=ON)", flush=True)
+            print(f"✅ SSE 연결 성공 (session_id={session_id}, bot_id={bot_id}, 구독자={poller.subscriber_count()})", flush=True)
         except Exception as e:
             print(f"❌ SSE 초기화 오류: {e}", flush=True)
             yield f"data: {json.dumps({'error': f'초기화 실패: {str(e)}'})}\n\n"
             return
 
-        while True:
-            try:
-                if session_id in monitoring_active and monitoring_active[session_id]:
-                    # 0. 주기적으로 watched_users 리로드 (사용자별)
-                    current_time = time.time()
-                    if current_time - last_reload_time >= reload_interval:
-                        try:
-                            new_watched_users = load_user_watched_users(bot_id)
-                            # 변경 사항이 있으면 리로드
-                            if new_watched_users != notifier.watched_users:
-                                notifier.watched_users = new_watched_users
-                                notifier.refresh_watched_user_ids()
-                                print(f"🔄 감시 사용자 목록 리로드됨 ({bot_id}): {notifier.watched_users}")
-                            last_reload_time = current_time
-                        except Exception as e:
-                            print(f"⚠️ watched_users 리로드 실패: {e}")
-
-                    # 1. 큐에 있는 테스트 알림 먼저 전송
-                    if session_id in notification_queues and notification_queues[session_id]:
-                        queued_notifications = notification_queues[session_id][:]
-                        notification_queues[session_id] = []
-                        for notif in queued_notifications:
-                            yield f"data: {json.dumps(notif)}\n\n"
-
-                    # 2. 실제 Slack 알림 확인
-                    since = last_check_times.get(session_id, time.time())
-                    notifications, max_timestamp = notifier.check_new_mentions(since)
-
-                    if notifications:
-                        # 알림이 있으면 빠른 모드로 전환
-                        consecutive_empty_checks = 0
-                        current_polling = polling_fast
-                        last_notification_time = time.time()
-
-                        print(f"🔔 {len(notifications)}개 알림 전송 (session_id={session_id}, polling={current_polling}s)", flush=True)
-                        for i, notif in enumerate(notifications):
-                            print(f"  [{i+1}] {notif.get('reason')}: {notif.get('channel')} - {notif.get('text')[:50]}", flush=True)
-                            yield f"data: {json.dumps(notif)}\n\n"
-                    else:
-                        # 알림이 없으면 점점 느리게
-                        consecutive_empty_checks += 1
-
-                        if consecutive_empty_checks >= 6:
-                            # 6회 이상 빈 체크: 느린 모드 (1.5초)
-                            current_polling = polling_slow
-                        elif consecutive_empty_checks >= 3:
-                            # 3-5회 빈 체크: 일반 모드 (0.5초)
-                            current_polling = polling_normal
-                        # else: 1-2회는 빠른 모드 유지 (0.2초)
-
-                    # 가장 최신 메시지 timestamp로 업데이트 (time.time() 대신)
-                    last_check_times[session_id] = max_timestamp
-
-                time.sleep(current_polling)
-
-            except GeneratorExit:
-                # 클라이언트 연결 종료
-                print(f"🔌 SSE 연결 종료됨 (session_id={session_id})", flush=True)
-                break
-            except Exception as e:
-                print(f"⚠️ 모니터링 루프 오류: {e}", flush=True)
-                import traceback
-                traceback.print_exc()
-                # 에러가 나도 계속 진행
-                time.sleep(1)
+        heartbeat_interval = 15  # 유휴 시 연결 종료 감지용 heartbeat 주기
+        last_sent_time = time.time()
+
+        try:
+            # 재연결이면 놓친 이벤트부터 전송
+            for event_id, notif in subscription.next_events(None):
+                yield format_sse_event(event_id, notif)
+
+            while True:
+                try:
+                    # 브로커가 전달한 알림 전송 (테스트 알림 포함)
+                    try:
+                        event = subscription.queue.get(timeout=1.0)
+                    except queue.Empty:
+                        event = None
+
+                    events = subscription.next_events(event)
+                    if not events:
+                        if time.time() - last_sent_time >= heartbeat_interval:
+                            yield f": heartbeat\n\n"
+                            last_sent_time = time.time()
+                        continue
+
+                    for event_id, notif in events:
+                        yield format_sse_event(event_id, notif)
+                    last_sent_time = time.time()
+
+                except GeneratorExit:
+                    raise
+                except Exception as e:
+                    print(f"⚠️ 모니터링 루프 오류: {e}", flush=True)
+                    import traceback
+                    traceback.print_exc()
+                    # 에러가 나도 계속 진행
+                    time.sleep(1)
+        except GeneratorExit:
+            # 클라이언트 연결 종료
+            print(f"🔌 SSE 연결 종료됨 (session_id={session_id})", flush=True)
+        finally:
+            poller.unsubscribe(subscription)
 
     return Response(generate(), mimetype='text/event-stream')
 
 
+@app.route('/api/slack/events', methods=['POST'])
+def slack_events():
+    """Events API 수신 엔드포인트 (SLACK_INGESTION_MODE=events이고 SLACK_SIGNING_SECRET이 있을 때만 활성화)"""
+    if SLACK_INGESTION_MODE != 'events':
+        return jsonify({"success": False, "error": "events 수신 모드가 아닙니다"}), 404
+    if not SLACK_SIGNING_SECRET:
+        # 서명을 검증할 수 없으면 위조 이벤트를 막기 위해 엔드포인트를 열지 않음
+        return jsonify({"success": False, "error": "SLACK_SIGNING_SECRET이 설정되지 않았습니다"}), 503
+
+    body = request.get_data()
+    if not verify_slack_signature(request.headers, body):
+        return jsonify({"success": False, "error": "서명 검증 실패"}), 401
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return jsonify({"success": False, "error": "잘못된 요청"}), 400
+
+    # 엔드포인트 등록 시 URL 검증
+    if payload.get("type") == "url_verification":
+        return jsonify({"challenge": payload.get("challenge")})
+
+    # Slack은 3초 안의 응답을 요구하므로 처리는 비동기로
+    executor.submit(dispatch_slack_event, payload)
+    return "", 200
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus 메트릭 (텍스트 형식, METRICS_ENABLED=1일 때만)
+
+    채널 ID와 Claude 비용이 포함되므로 METRICS_TOKEN이 있으면 Bearer 토큰을,
+    없으면 로컬 요청만 허용한다.
+    """
+    if not METRICS_ENABLED:
+        return jsonify({"success": False, "error": "메트릭이 비활성화되어 있습니다"}), 404
+    if METRICS_TOKEN:
+        authorization = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(authorization.encode('utf-8'), f"Bearer {METRICS_TOKEN}".encode('utf-8')):
+            return jsonify({"success": False, "error": "인증 실패"}), 401
+    elif request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify({"success": False, "error": "METRICS_TOKEN 없이 원격 접근할 수 없습니다"}), 403
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.route('/api/channel/stream/<channel_id>')
 def channel_stream(channel_id):
     """채널 메시지 실시간 스트리밍"""
@@ -1602,40 +5608,31 @@ def channel_stream(channel_id):
             yield f"data: {json.dumps({'error': '연결되지 않음'})}\n\n"
             return
 
-        notifier = SlackNotifier(token)
-        notifier.bot_user_id = bot_id
-
-        # 초기 타임스탬프 설정 (10초 전부터 감지하도록)
-        last_ts = time.time() - 10
-
-        print(f"채널 스트리밍 루프 시작: {channel_id}, last_ts={last_ts}")
+        # 같은 채널의 시청자는 하나의 스트림을 공유
+        stream, viewer = subscribe_channel_stream(token, channel_id, bot_id)
+        print(f"채널 스트림 구독: {channel_id} (시청자={stream.viewer_count()})")
 
-        while True:
-            try:
-                # 최신 메시지 조회 (limit 5로 줄여서 API 응답속도 향상)
-                messages = notifier.get_channel_messages(channel_id, limit=5)
-
-                if messages:
-                    # 새로운 메시지만 전송
-                    new_messages = [msg for msg in messages if float(msg.get('ts', 0)) > last_ts]
-
-                    if new_messages:
-                        print(f">>> 새 메시지 {len(new_messages)}개 발견!")
-                        # 타임스탬프 업데이트
-                        last_ts = max(float(msg.get('ts', 0)) for msg in messages)
+        heartbeat_interval = 15  # 유휴 시 연결 종료 감지용 heartbeat 주기
+        last_sent_time = time.time()
 
-                        # 새 메시지 전송 (최신순)
-                        for msg in new_messages:
-                            print(f"메시지 전송: {msg.get('text', '')[:30]}...")
-                            yield f"data: {json.dumps(msg, ensure_ascii=False)}\n\n"
-
-                time.sleep(1.5)  # 1.5초마다 체크 (응답속도 최적화)
+        try:
+            yield f": heartbeat\n\n"
+            while True:
+                try:
+                    msg = viewer.get(timeout=1.0)
+                except queue.Empty:
+                    if time.time() - last_sent_time >= heartbeat_interval:
+                        yield f": heartbeat\n\n"
+                        last_sent_time = time.time()
+                    continue
 
-            except Exception as e:
-                print(f"!!! 채널 스트림 오류: {e}")
-                import traceback
-                traceback.print_exc()
-                time.sleep(5)
+                yield f"data: {json.dumps(msg, ensure_ascii=False)}\n\n"
+                last_sent_time = time.time()
+        except GeneratorExit:
+            # 클라이언트 연결 종료
+            print(f"🔌 채널 스트림 연결 종료됨: {channel_id}")
+        finally:
+            stream.unsubscribe(viewer)
 
     return Response(generate(), mimetype='text/event-stream', headers={
         'Cache-Control': 'no-cache',
@@ -1673,7 +5670,15 @@ def add_watched_user():
     if user not in users:
         users.append(user)
         if save_user_watched_users(bot_id, users):
-            return jsonify({"success": True, "users": users})
+            result = {"success": True, "users": users}
+            # 동명이인이면 감시 대상으로 결정할 수 없으므로 알려줌
+            token = session.get('token')
+            if token:
+                _, candidates = SlackNotifier(token, bot_id).resolve_username(user)
+                if candidates:
+                    result["warning"] = f"'{user}'와 일치하는 사용자가 여러 명입니다. 고유한 사용자 이름(name)을 사용하세요."
+                    result["candidates"] = candidates
+            return jsonify(result)
         else:
             return jsonify({"success": False, "error": "저장 실패"})
 
@@ -1821,7 +5826,9 @@ def update_settings():
         return jsonify({"success": False, "error": "연결되지 않음"})
 
     data = request.json
-    settings = data.get('settings', {})
+    # 화면에 없는 설정(예: 다른 탭에서 바꾼 항목)이 지워지지 않도록 기존 설정과 병합
+    settings = load_user_settings(bot_id)
+    settings.update(data.get('settings', {}))
 
     if save_user_settings(bot_id, settings):
         return jsonify({"success": True, "settings": settings})
@@ -1831,13 +5838,21 @@ def update_settings():
 # ===== 별표 메시지 API =====
 @app.route('/api/starred', methods=['GET'])
 def get_starred_messages():
-    """사용자별 별표 메시지 조회"""
+    """사용자별 별표 메시지 조회 (최신순, cursor 페이지네이션)"""
     bot_id = session.get('bot_id')
     if not bot_id:
         return jsonify({"success": False, "error": "연결되지 않음"})
 
-    starred_messages = load_user_starred_messages(bot_id)
-    return jsonify({"success": True, "messages": starred_messages})
+    limit = min(max(request.args.get('limit', STARRED_PAGE_SIZE, type=int), 1), STARRED_PAGE_MAX)
+    cursor = request.args.get('cursor', type=int)
+    log = get_starred_log(bot_id)
+    messages, next_cursor = log.page(limit, cursor)
+    return jsonify({
+        "success": True,
+        "messages": messages,
+        "next_cursor": str(next_cursor) if next_cursor else "",
+        "total": len(log)
+    })
 
 @app.route('/api/starred', methods=['POST'])
 def add_starred_message():
@@ -1852,24 +5867,22 @@ def add_starred_message():
     if not message:
         return jsonify({"success": False, "error": "메시지 데이터 없음"})
 
-    # 기존 별표 메시지 로드
-    starred_messages = load_user_starred_messages(bot_id)
-
     # 메시지 ID 생성 (channel_id + ts)
     message_id = f"{message.get('channel_id', '')}_{message.get('ts', '')}"
     message['message_id'] = message_id
     message['starred_at'] = time.time()
 
-    # 중복 체크 (이미 별표한 메시지인지)
-    if not any(msg.get('message_id') == message_id for msg in starred_messages):
-        starred_messages.append(message)
+    # 중복 체크는 인덱스 조회로 처리 (이미 별표한 메시지면 기록하지 않음)
+    try:
+        added = get_starred_log(bot_id).add(message)
+    except OSError as e:
+        print(f"⚠️ starred_messages 저장 실패 ({bot_id}): {e}", flush=True)
+        return jsonify({"success": False, "error": "저장 실패"})
 
-        if save_user_starred_messages(bot_id, starred_messages):
-            return jsonify({"success": True, "message": "별표 추가됨"})
-        else:
-            return jsonify({"success": False, "error": "저장 실패"})
+    if added:
+        return jsonify({"success": True, "message": "별표 추가됨", "message_id": message_id})
     else:
-        return jsonify({"success": True, "message": "이미 별표된 메시지"})
+        return jsonify({"success": True, "message": "이미 별표된 메시지", "message_id": message_id})
 
 @app.route('/api/starred/<message_id>', methods=['DELETE'])
 def remove_starred_message(message_id):
@@ -1878,17 +5891,14 @@ def remove_starred_message(message_id):
     if not bot_id:
         return jsonify({"success": False, "error": "연결되지 않음"})
 
-    # 기존 별표 메시지 로드
-    starred_messages = load_user_starred_messages(bot_id)
-
-    # 메시지 제거
-    starred_messages = [msg for msg in starred_messages if msg.get('message_id') != message_id]
-
-    if save_user_starred_messages(bot_id, starred_messages):
-        return jsonify({"success": True, "message": "별표 제거됨"})
-    else:
+    try:
+        get_starred_log(bot_id).remove(message_id)
+    except OSError as e:
+        print(f"⚠️ starred_messages 저장 실패 ({bot_id}): {e}", flush=True)
         return jsonify({"success": False, "error": "저장 실패"})
 
+    return jsonify({"success": True, "message": "별표 제거됨"})
+
 
 if __name__ == '__main__':
     # user_data 디렉토리 생성
@@ -1898,8 +5908,8 @@ if __name__ == '__main__':
     print("=" * 60)
     print("🌐 Slack 알림 모니터링 웹 서버 시작")
     print("=" * 60)
-    print("📍 URL: http://localhost:5001")
+    print(f"📍 URL: http://localhost:{APP_PORT}")
     print("🔄 브라우저에서 위 주소로 접속하세요")
     print("=" * 60)
 
-    app.run(debug=True, host='0.0.0.0', port=5001, threaded=True, use_reloader=False)
+    app.run(debug=True, host='0.0.0.0', port=APP_PORT, threaded=True, use_reloader=False)
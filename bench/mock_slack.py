@@ -0,0 +1,374 @@
+"""
+로컬 mock Slack Web API 서버 (벤치마크용)
+
+채널 수, 채널별 메시지 발생 속도, 응답 지연, 429 주입 비율을 설정할 수 있다.
+메시지는 서버 시작 시각을 기준으로 결정적으로 생성되므로 같은 설정이면 같은 결과가 나온다.
+"""
+
+import hashlib
+import hmac
+import json
+import math
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+BOT_USER_ID = 'UBENCHBOT'
+
+
+class MockSlackConfig:
+    """mock 서버 설정"""
+
+    def __init__(self, channels=50, msgs_per_min=20, backlog=100, users=200, dms=10, idle_dms=0,
+                 usergroups=20, usergroup_size=15, latency_ms=20, jitter_ms=5, rate_limit_ratio=0.0, retry_after=1,
+                 mention_every=25, here_every=40, subteam_every=30, keyword_every=10, seed=42):
+        self.channels = channels  # 봇이 참여한 채널 수
+        self.msgs_per_min = msgs_per_min  # 채널별 분당 메시지 수
+        self.backlog = backlog  # 서버 시작 전에 이미 있던 채널별 메시지 수
+        self.users = users  # 워크스페이스 사용자 수
+        self.dms = dms  # DM 채널 수
+        self.idle_dms = idle_dms  # 그중 메시지가 전혀 없는 DM 수
+        self.usergroups = usergroups  # User Group 수 (짝수 번째 그룹에는 봇이 속함)
+        self.usergroup_size = usergroup_size  # 그룹별 멤버 수
+        self.latency_ms = latency_ms  # 응답 지연 (밀리초)
+        self.jitter_ms = jitter_ms  # 응답 지연 편차 (밀리초)
+        self.rate_limit_ratio = rate_limit_ratio  # 429 응답 비율 (0~1)
+        self.retry_after = retry_after  # 429 응답의 Retry-After (초)
+        self.mention_every = mention_every  # n번째 메시지마다 봇 멘션
+        self.here_every = here_every  # n번째 메시지마다 @here
+        self.subteam_every = subteam_every  # n번째 메시지마다 User Group 멘션
+        self.keyword_every = keyword_every  # n번째 메시지마다 우선순위 키워드 포함
+        self.seed = seed
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class MockSlackState:
+    """결정적 메시지 생성과 호출 통계"""
+
+    def __init__(self, config):
+        self.config = config
+        self.started = time.time()
+        self.interval = 60.0 / config.msgs_per_min if config.msgs_per_min else None
+        self.calls = defaultdict(int)  # {method: 호출 수}
+        self.rate_limited = defaultdict(int)  # {method: 429 응답 수}
+        self.history_oldest = {}  # {channel_id: 마지막 conversations.history 요청의 oldest}
+        self.history_calls = defaultdict(int)  # {channel_id: conversations.history 호출 수}
+        self._lock = threading.Lock()
+        self._random = random.Random(config.seed)
+
+    # ---- 메시지 생성 ----
+
+    def channel_ids(self):
+        return [f"C{index:05d}" for index in range(self.config.channels)]
+
+    def dm_ids(self):
+        return [f"D{index:05d}" for index in range(self.config.dms)]
+
+    def usergroup_members(self, index):
+        cfg = self.config
+        members = [f"U{(index * cfg.usergroup_size + k) % cfg.users:05d}" for k in range(cfg.usergroup_size)]
+        if index % 2 == 0:
+            members.append(BOT_USER_ID)
+        return members
+
+    def _base(self, index, count):
+        """채널 index의 0번째 메시지 시각 (채널별로 엇갈리게 배치)"""
+        return self.started + (index / max(count, 1)) * self.interval
+
+    def _message(self, channel_id, index, count, i):
+        cfg = self.config
+        ts = self._base(index, count) + i * self.interval
+        user = f"U{(index * 7 + i) % cfg.users:05d}"
+        if cfg.mention_every and i % cfg.mention_every == 0:
+            text = f"<@{BOT_USER_ID}> 확인 부탁드립니다 #{i}"
+        elif cfg.here_every and i % cfg.here_every == 0:
+            text = f"@here 공지 #{i}"
+        elif cfg.subteam_every and cfg.usergroups and i % cfg.subteam_every == 0:
+            text = f"<!subteam^S{(index + i) % cfg.usergroups:04d}> 확인 부탁드립니다 #{i}"
+        elif cfg.keyword_every and i % cfg.keyword_every == 0:
+            text = f"배포 중 에러 발생, 긴급 리뷰 요청 <@U{(i * 13) % cfg.users:05d}> #{i}"
+        else:
+            text = f"일반 메시지 {channel_id} #{i}"
+        return {"type": "message", "user": user, "text": text, "ts": f"{ts:.6f}"}
+
+    def messages(self, channel_id, oldest=None, latest=None):
+        """oldest < ts <= latest인 메시지 (최신순)"""
+        if self.interval is None:
+            return []
+        if channel_id.startswith('C'):
+            ids = self.channel_ids()
+        else:
+            ids = self.dm_ids()
+        try:
+            index = ids.index(channel_id)
+        except ValueError:
+            return []
+        if not channel_id.startswith('C') and index >= len(ids) - self.config.idle_dms:
+            return []
+        count = len(ids)
+        base = self._base(index, count)
+        now = time.time()
+        latest = min(float(latest), now) if latest else now
+
+        i_max = math.floor((latest - base) / self.interval)
+        i_min = -self.config.backlog
+        if oldest:
+            i_min = max(i_min, math.floor((float(oldest) - base) / self.interval) + 1)
+        # ts 문자열 반올림 때문에 경계 메시지가 중복되지 않도록 한 번 더 거른다
+        floor_ts = float(oldest) if oldest else 0.0
+        messages = (self._message(channel_id, index, count, i) for i in range(i_max, i_min - 1, -1))
+        return [message for message in messages if float(message['ts']) > floor_ts]
+
+    # ---- 통계 ----
+
+    def record(self, method):
+        with self._lock:
+            self.calls[method] += 1
+
+    def should_rate_limit(self, method):
+        with self._lock:
+            if self.config.rate_limit_ratio and self._random.random() < self.config.rate_limit_ratio:
+                self.rate_limited[method] += 1
+                return True
+        return False
+
+    def stats(self):
+        with self._lock:
+            return {"calls": dict(self.calls), "rate_limited": dict(self.rate_limited),
+                    "total_calls": sum(self.calls.values())}
+
+
+def _page(items, params, default_limit=200):
+    """offset 기반 cursor 페이지네이션"""
+    limit = int(params.get('limit', default_limit))
+    offset = int(params.get('cursor') or 0)
+    page = items[offset:offset + limit]
+    next_offset = offset + limit
+    next_cursor = str(next_offset) if next_offset < len(items) else ""
+    return page, next_cursor
+
+
+class MockSlackHandler(BaseHTTPRequestHandler):
+    state = None  # MockSlackState (서버 생성 시 설정)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle(parse_qs(urlparse(self.path).query))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+        params = parse_qs(urlparse(self.path).query)
+        params.update(parse_qs(body))
+        self._handle(params)
+
+    def _handle(self, raw_params):
+        state = self.state
+        cfg = state.config
+        method = urlparse(self.path).path.rsplit('/', 1)[-1]
+        params = {key: values[-1] for key, values in raw_params.items()}
+
+        if method == '_stats':
+            return self._send(200, state.stats())
+
+        state.record(method)
+        if cfg.latency_ms or cfg.jitter_ms:
+            time.sleep(max(0.0, cfg.latency_ms + random.uniform(-cfg.jitter_ms, cfg.jitter_ms)) / 1000.0)
+
+        if state.should_rate_limit(method):
+            return self._send(429, {"ok": False, "error": "ratelimited"}, {"Retry-After": str(cfg.retry_after)})
+
+        handler = getattr(self, 'api_' + method.replace('.', '_'), None)
+        if handler is None:
+            return self._send(200, {"ok": False, "error": "unknown_method"})
+        return self._send(200, handler(params))
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    # ---- Slack API ----
+
+    def api_auth_test(self, params):
+        return {"ok": True, "user_id": BOT_USER_ID, "user": "bench-bot", "team": "bench",
+                "url": "https://bench.slack.com/"}
+
+    def api_users_conversations(self, params):
+        channels = [{"id": channel_id, "name": f"bench-{channel_id.lower()}"} for channel_id in self.state.channel_ids()]
+        page, cursor = _page(channels, params, 1000)
+        return {"ok": True, "channels": page, "response_metadata": {"next_cursor": cursor}}
+
+    def api_conversations_list(self, params):
+        dms = []
+        for index, dm_id in enumerate(self.state.dm_ids()):
+            # updated는 대화 정보가 바뀐 시각 (밀리초), latest는 최근 메시지 (메시지가 없는 DM은 생략)
+            dm = {"id": dm_id, "is_im": True, "user": f"U{index:05d}", "updated": int((self.state.started - 86400) * 1000)}
+            latest = self.state.messages(dm_id, oldest=time.time() - 3600)[:1]
+            if latest:
+                dm["latest"] = {"ts": latest[0]["ts"]}
+            dms.append(dm)
+        page, cursor = _page(dms, params, 1000)
+        return {"ok": True, "channels": page, "response_metadata": {"next_cursor": cursor}}
+
+    def api_conversations_history(self, params):
+        self.state.history_oldest[params.get('channel', '')] = params.get('oldest')
+        self.state.history_calls[params.get('channel', '')] += 1
+        messages = self.state.messages(params.get('channel', ''), params.get('oldest'), params.get('latest'))
+        page, cursor = _page(messages, params, 100)
+        return {"ok": True, "messages": page, "has_more": bool(cursor),
+                "response_metadata": {"next_cursor": cursor}}
+
+    def api_conversations_replies(self, params):
+        ts = params.get('ts', '0')
+        parent = {"type": "message", "user": "U00000", "text": "스레드 원본", "ts": ts, "thread_ts": ts}
+        replies = [{"type": "message", "user": f"U{i:05d}", "text": f"답글 {i} <@U{(i + 1):05d}>",
+                    "ts": f"{float(ts) + i + 1:.6f}", "thread_ts": ts} for i in range(5)]
+        return {"ok": True, "messages": [parent] + replies}
+
+    def api_users_info(self, params):
+        user_id = params.get('user', '')
+        return {"ok": True, "user": {"id": user_id, "name": user_id.lower(), "real_name": f"User {user_id}",
+                                     "profile": {"display_name": f"user-{user_id[-3:]}"}}}
+
+    def api_users_list(self, params):
+        members = [{"id": f"U{i:05d}", "name": f"u{i:05d}", "profile": {"display_name": f"user-{i:03d}"}}
+                   for i in range(self.state.config.users)]
+        page, cursor = _page(members, params, 200)
+        return {"ok": True, "members": page, "response_metadata": {"next_cursor": cursor}}
+
+    def api_bots_info(self, params):
+        return {"ok": True, "bot": {"id": params.get('bot', ''), "name": "bench-bot"}}
+
+    def api_usergroups_list(self, params):
+        include_users = params.get('include_users') in ('true', 'True', '1')
+        usergroups = []
+        for index in range(self.state.config.usergroups):
+            group = {"id": f"S{index:04d}", "handle": f"bench-team-{index}"}
+            if include_users:
+                group["users"] = self.state.usergroup_members(index)
+            usergroups.append(group)
+        return {"ok": True, "usergroups": usergroups}
+
+    def api_usergroups_users_list(self, params):
+        subteam_id = params.get('usergroup', '')
+        try:
+            index = int(subteam_id[1:])
+        except ValueError:
+            return {"ok": False, "error": "no_such_subteam"}
+        if not 0 <= index < self.state.config.usergroups:
+            return {"ok": False, "error": "no_such_subteam"}
+        return {"ok": True, "users": self.state.usergroup_members(index)}
+
+
+class MockSlackServer:
+    """백그라운드 스레드에서 동작하는 mock 서버"""
+
+    def __init__(self, config, host='127.0.0.1', port=0):
+        self.state = MockSlackState(config)
+        handler = type('BoundMockSlackHandler', (MockSlackHandler,), {'state': self.state})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# ---- 푸시 이벤트 (Events API / Socket Mode) ----
+
+def message_event(channel_id, text, user='U00001', ts=None, channel_type='channel'):
+    """message 이벤트 본문"""
+    return {"type": "message", "channel": channel_id, "channel_type": channel_type, "user": user,
+            "text": text, "ts": ts or f"{time.time():.6f}"}
+
+
+def event_callback(event, authorized_user_id=BOT_USER_ID):
+    """Events API / Socket Mode로 전달되는 event_callback 페이로드"""
+    return {"type": "event_callback", "event": event, "authorizations": [{"user_id": authorized_user_id}]}
+
+
+def sign_event_request(payload, signing_secret, timestamp=None):
+    """Slack과 같은 방식으로 서명한 Events API 요청 (본문, 헤더)"""
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    timestamp = str(int(timestamp if timestamp is not None else time.time()))
+    base = f"v0:{timestamp}:".encode('utf-8') + body
+    signature = 'v0=' + hmac.new(signing_secret.encode('utf-8'), base, hashlib.sha256).hexdigest()
+    return body, {'Content-Type': 'application/json', 'X-Slack-Request-Timestamp': timestamp,
+                  'X-Slack-Signature': signature}
+
+
+class FakeSocketModeConnection:
+    """SocketModeClient의 ws_factory로 넘기는 가짜 웹소켓
+
+    push()로 넣은 envelope을 recv()로 돌려주고, 클라이언트가 보낸 ack의 envelope_id를 모은다.
+    """
+
+    def __init__(self):
+        self.acks = []
+        self._inbox = queue.Queue()
+        self._counter = 0
+
+    def push(self, payload):
+        self._counter += 1
+        envelope_id = f"env-{self._counter}"
+        self._inbox.put(json.dumps({"type": "events_api", "envelope_id": envelope_id, "payload": payload}))
+        return envelope_id
+
+    def disconnect(self):
+        self._inbox.put(json.dumps({"type": "disconnect"}))
+
+    def recv(self):
+        return self._inbox.get()
+
+    def send(self, raw):
+        self.acks.append(json.loads(raw).get("envelope_id"))
+
+    def close(self):
+        self._inbox.put('')
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='mock Slack Web API 서버')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--channels', type=int, default=50)
+    parser.add_argument('--msgs-per-min', type=float, default=20)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--rate-limit-ratio', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = MockSlackServer(MockSlackConfig(channels=args.channels, msgs_per_min=args.msgs_per_min,
+                                             latency_ms=args.latency_ms, rate_limit_ratio=args.rate_limit_ratio),
+                             port=args.port).start()
+    print(f"mock Slack API: {server.base_url} (SLACK_API_BASE로 지정)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,449 @@
+"""
+Slack 알림 모니터링 벤치마크
+
+로컬 mock Slack API(bench/mock_slack.py)를 띄우고 app.py의 실제 스캔/감지/전달 경로를
+그대로 실행하여 다음을 측정한다.
+
+- 폴링 사이클 시간 (첫 스캔 / 워터마크 이후 델타 스캔)
+- 사이클당 Slack API 호출 수
+- 감지 지연 (메시지 ts → 알림 생성 시각) p50/p95/max
+- 채널 메시지 조회 (캐시 cold / warm)
+- 키워드 분류 처리량
+- 알림 브로커 fan-out 지연 (구독자 S명)
+- 실제 tier 한도에서 스캔이 버킷을 가득 채운 상태의 화면 조회 지연 (tier 시나리오)
+- CPU 시간, 메모리 (--trace-memory 지정 시 tracemalloc 할당 최대치 포함)
+
+사용법:
+    python bench/run_bench.py                        # 모든 시나리오 실행
+    python bench/run_bench.py --scenario small       # 시나리오 하나만
+    python bench/run_bench.py --save-baseline        # 결과를 기준선으로 저장
+    python bench/run_bench.py --baseline             # 기준선과 비교 출력
+"""
+
+import argparse
+import json
+import os
+import platform
+import queue
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+BASELINE_PATH = os.path.join(RESULTS_DIR, 'baseline.json')
+
+sys.path.insert(0, BENCH_DIR)
+from mock_slack import BOT_USER_ID, MockSlackConfig, MockSlackServer  # noqa: E402
+
+SCENARIOS = {
+    # 작은 워크스페이스: 기본 동작 확인용
+    'small': {
+        'mock': {'channels': 50, 'msgs_per_min': 20, 'dms': 10, 'latency_ms': 20, 'jitter_ms': 5},
+        'cycles': 10,
+        'subscribers': 10,
+    },
+    # 큰 워크스페이스: 채널 500개 × 분당 20개 메시지, DM 50개 (40개는 대화 없음)
+    'large': {
+        'mock': {'channels': 500, 'msgs_per_min': 20, 'dms': 50, 'idle_dms': 40, 'latency_ms': 30, 'jitter_ms': 10},
+        'cycles': 5,
+        'subscribers': 100,
+    },
+    # 429 응답이 섞인 경우
+    'ratelimited': {
+        'mock': {'channels': 100, 'msgs_per_min': 20, 'dms': 10, 'latency_ms': 20, 'jitter_ms': 5,
+                 'rate_limit_ratio': 0.02, 'retry_after': 1},
+        'cycles': 5,
+        'subscribers': 10,
+    },
+    # 실제 Slack tier 한도: 알림 스캔 10개가 conversations.history 버킷을 계속 채우는 동안 화면 조회 지연
+    'tier': {
+        'mock': {'channels': 100, 'msgs_per_min': 2, 'dms': 0, 'latency_ms': 20, 'jitter_ms': 5},
+        'rate_multiplier': 1.0,
+        'ui_under_scan': {'scanners': 10, 'ui_requests': 5},
+    },
+}
+
+# 결과 비교 시 값이 작을수록 좋은 지표
+LOWER_IS_BETTER = ('_ms', '_calls', 'cpu_', 'memory_', 'rate_limited', '_failed')
+
+
+def prepare_environment(workdir):
+    """app.py import 전에 벤치마크용 환경 설정 (실제 사용자 데이터/Claude API를 건드리지 않음)"""
+    os.environ.pop('ANTHROPIC_API_KEY', None)
+    os.environ['METADATA_CACHE_PATH'] = os.path.join(workdir, 'metadata_cache.sqlite3')
+    os.environ['MESSAGE_ARCHIVE_PATH'] = os.path.join(workdir, 'message_archive.sqlite3')
+    os.environ.setdefault('SLACK_API_BASE', 'http://127.0.0.1:1/api')  # 시나리오마다 다시 지정
+    os.chdir(workdir)
+    os.makedirs('user_data', exist_ok=True)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize_ms(values):
+    """초 단위 값 목록 → 밀리초 p50/p95/max"""
+    ms = [v * 1000 for v in values]
+    return {
+        'p50_ms': round(percentile(ms, 50), 2) if ms else None,
+        'p95_ms': round(percentile(ms, 95), 2) if ms else None,
+        'max_ms': round(max(ms), 2) if ms else None,
+        'count': len(ms),
+    }
+
+
+def reset_app_state(app, base_url, rate_multiplier=1000.0):
+    """시나리오 사이에 캐시/스케줄러/아카이브 상태 초기화"""
+    app.SLACK_API_BASE = base_url
+    # mock 서버는 tier 한도가 없으므로 기본적으로는 스케줄러가 병목이 되지 않도록 한도를 크게 올림
+    # (tier 시나리오는 1.0으로 실제 한도를 적용)
+    app.SLACK_RATE_LIMIT_MULTIPLIER = rate_multiplier
+    app.slack_rate_limiter = app.SlackRateLimiter()
+    for cache in app.get_global_caches():
+        cache.clear()
+    app._user_directories.clear()
+    app._usergroup_indexes.clear()
+    app._activity_feeds.clear()
+    archive = app.get_message_archive()
+    if archive is not None:
+        with archive._conn() as conn:
+            conn.execute("DELETE FROM messages")
+            conn.execute("DELETE FROM coverage")
+
+
+def api_calls(server):
+    return server.state.stats()['total_calls']
+
+
+def bench_poll_cycles(app, server, scenario, token):
+    """WorkspacePoller와 같은 방식(채널별 워터마크 + 적응형 스케줄러)으로 스캔 사이클 반복"""
+    bot_id = f"{BOT_USER_ID}-{scenario['name']}"
+    notifier = app.SlackNotifier(token, BOT_USER_ID)
+    notifier.request_priority = app.SLACK_PRIORITY_SCAN
+    notifier.watched_users = []
+    notifier.priority_keywords = app.get_user_priority_keywords(bot_id)
+    notifier.keyword_matcher = app.get_bot_keyword_matcher(bot_id)
+
+    # 첫 스캔이 mock의 최근 메시지를 포함하도록 조금 앞에서 시작
+    watermarks = app.ChannelWatermarks(bot_id, default_since=time.time() - 30)
+    scheduler = app.ChannelScanScheduler()
+
+    cycle_times = []
+    cycle_calls = []
+    latencies = []
+    notification_count = 0
+    for index in range(scenario['cycles']):
+        calls_before = api_calls(server)
+        started = time.perf_counter()
+        notifications, _ = notifier.check_new_mentions(watermarks.default_since, watermarks, scheduler)
+        detected_at = time.time()
+        cycle_times.append(time.perf_counter() - started)
+        cycle_calls.append(api_calls(server) - calls_before)
+        watermarks.flush()
+
+        notification_count += len(notifications)
+        # 첫 사이클은 과거 메시지를 한 번에 따라잡으므로 감지 지연에서 제외
+        if index > 0:
+            latencies.extend(detected_at - float(notif['timestamp']) for notif in notifications)
+        time.sleep(max(app.WorkspacePoller.POLLING_FAST, scheduler.next_due_in()))
+
+    warm_times = cycle_times[1:] or cycle_times
+    warm_calls = cycle_calls[1:] or cycle_calls
+    return {
+        'cold_cycle_ms': round(cycle_times[0] * 1000, 2),
+        'warm_cycle_ms': round(statistics.median(warm_times) * 1000, 2),
+        'cold_cycle_calls': cycle_calls[0],
+        'warm_cycle_calls': round(statistics.median(warm_calls), 1),
+        'notifications': notification_count,
+        'detection_latency': summarize_ms(latencies),
+    }
+
+
+def bench_channel_messages(app, server, token, channel_ids, limit=50):
+    """채널 메시지 조회: 처음 조회(cold)와 아카이브/캐시가 채워진 뒤 조회(warm)"""
+    notifier = app.SlackNotifier(token, BOT_USER_ID)
+    cold, warm = [], []
+    calls_before = api_calls(server)
+    for channel_id in channel_ids:
+        started = time.perf_counter()
+        notifier.get_channel_messages(channel_id, limit)
+        cold.append(time.perf_counter() - started)
+    cold_calls = api_calls(server) - calls_before
+
+    calls_before = api_calls(server)
+    for channel_id in channel_ids:
+        started = time.perf_counter()
+        notifier.get_channel_messages(channel_id, limit)
+        warm.append(time.perf_counter() - started)
+    warm_calls = api_calls(server) - calls_before
+
+    return {
+        'cold': summarize_ms(cold),
+        'warm': summarize_ms(warm),
+        'cold_calls': cold_calls,
+        'warm_calls': warm_calls,
+    }
+
+
+def bench_keyword_classification(app, iterations=20000):
+    texts = [
+        "배포 중 에러 발생, 긴급 리뷰 요청 부탁드립니다",
+        "오늘 점심 뭐 먹을까요?",
+        "장애 공지: 결제 API 응답 지연",
+        "PR 올렸습니다. 시간 되실 때 확인 부탁드려요",
+        "일반 메시지입니다 " * 10,
+    ]
+    matcher = app.compile_priority_keywords()
+    started = time.perf_counter()
+    for i in range(iterations):
+        text = texts[i % len(texts)]
+        app.classify_message_by_keywords(text, keyword_matches=matcher.find_all(text))
+    elapsed = time.perf_counter() - started
+    return {'ops_per_sec': round(iterations / elapsed, 1)}
+
+
+def bench_broker_fanout(app, subscribers, events=100):
+    """구독자 S명에게 알림 전달: publish 호출 → 각 구독자 큐 수신까지의 지연
+
+    앱의 브로커와 상태 백엔드(STATE_BACKEND)를 그대로 사용한다.
+    """
+    broker = app.notification_broker
+    stream = 'bench:fanout'
+    subscriptions = []
+    for i in range(subscribers):
+        session_id = f"bench-session-{i}"
+        app.state_backend.start_session(session_id, 0)
+        subscriptions.append(broker.subscribe(stream, session_id))
+
+    latencies = []
+    lock = threading.Lock()
+
+    def consume(subscription):
+        local = []
+        for _ in range(events):
+            try:
+                _, notification = subscription.queue.get(timeout=10)
+            except queue.Empty:
+                # 큐 초과로 비워진 이벤트 (SSE 루프라면 링 버퍼에서 재전송)
+                break
+            local.append(time.perf_counter() - notification['published_at'])
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=consume, args=(sub,), daemon=True) for sub in subscriptions]
+    for thread in threads:
+        thread.start()
+
+    started = time.perf_counter()
+    for i in range(events):
+        broker.publish(stream, [{'timestamp': time.time(), 'channel_id': 'C0', 'published_at': time.perf_counter()}])
+    publish_elapsed = time.perf_counter() - started
+    for thread in threads:
+        thread.join(timeout=30)
+
+    for subscription in subscriptions:
+        broker.unsubscribe(subscription)
+        app.state_backend.stop_session(subscription.session_id)
+
+    result = summarize_ms(latencies)
+    result['dropped'] = sum(subscription.dropped for subscription in subscriptions)
+    result['publish_per_event_ms'] = round(publish_elapsed / events * 1000, 3)
+    return result
+
+
+def bench_ui_under_scan(app, server, token, scanners=10, ui_requests=5):
+    """알림 스캔 scanners개가 conversations.history 버킷을 계속 채우는 동안 화면 조회 대기 시간
+
+    스캔 우선순위가 버킷을 독점하면 화면 조회는 SLACK_ACQUIRE_TIMEOUT까지 기다리다 실패한다.
+    """
+    scan_notifier = app.SlackNotifier(token, BOT_USER_ID)
+    scan_notifier.request_priority = app.SLACK_PRIORITY_SCAN
+    ui_notifier = app.SlackNotifier(token, BOT_USER_ID)
+    channel_ids = server.state.channel_ids()
+    stop = threading.Event()
+    scan_calls = []
+
+    def scan_loop(offset):
+        index = offset
+        while not stop.is_set():
+            data = scan_notifier._api_get("conversations.history", {"channel": channel_ids[index % len(channel_ids)], "limit": 1})
+            if data.get("ok"):
+                scan_calls.append(1)
+            index += scanners
+
+    threads = [threading.Thread(target=scan_loop, args=(i,), daemon=True) for i in range(scanners)]
+    for thread in threads:
+        thread.start()
+    time.sleep(3)  # 버스트 토큰 소진
+
+    waits, failed = [], 0
+    for index in range(ui_requests):
+        started = time.perf_counter()
+        data = ui_notifier._api_get("conversations.history", {"channel": channel_ids[index], "limit": 1})
+        if data.get("ok"):
+            waits.append(time.perf_counter() - started)
+        else:
+            failed += 1
+
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=70)
+    result = summarize_ms(waits)
+    result['ui_failed'] = failed
+    result['scan_granted'] = len(scan_calls)
+    return result
+
+
+def run_scenario(app, name, scenario, trace_memory=False):
+    scenario = dict(scenario, name=name)
+    print(f"▶ 시나리오 {name}: {scenario['mock']}", flush=True)
+    server = MockSlackServer(MockSlackConfig.from_dict(scenario['mock'])).start()
+    try:
+        reset_app_state(app, server.base_url, scenario.get('rate_multiplier', 1000.0))
+        token = f"xoxb-bench-{name}-{int(time.time())}"
+
+        if trace_memory:
+            tracemalloc.start()
+        cpu_started = time.process_time()
+        wall_started = time.perf_counter()
+
+        if scenario.get('ui_under_scan'):
+            # 실제 tier 한도에서는 다른 측정이 한도 대기 시간만 재게 되므로 이 측정만 수행
+            result = {'ui_under_scan': bench_ui_under_scan(app, server, token, **scenario['ui_under_scan'])}
+        else:
+            result = {
+                'poll': bench_poll_cycles(app, server, scenario, token),
+                'channel_messages': bench_channel_messages(app, server, token, server.state.channel_ids()[:20]),
+                'keyword_classification': bench_keyword_classification(app),
+                'broker_fanout': bench_broker_fanout(app, scenario['subscribers']),
+            }
+
+        wall = time.perf_counter() - wall_started
+        peak = None
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        stats = server.state.stats()
+        result['resources'] = {
+            'cpu_seconds': round(time.process_time() - cpu_started, 3),
+            'wall_seconds': round(wall, 3),
+            'memory_peak_mb': round(peak / (1024 * 1024), 2) if peak is not None else None,
+            'memory_maxrss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+            'total_calls': stats['total_calls'],
+            'rate_limited': sum(stats['rate_limited'].values()),
+        }
+        result['api_calls'] = stats['calls']
+        return result
+    finally:
+        server.stop()
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def flatten(data, prefix=''):
+    """중첩 dict → {'a.b.c': 숫자}"""
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(results, baseline):
+    """기준선 대비 변화 출력"""
+    print("\n📊 기준선 비교 (baseline: {})".format(baseline.get('meta', {}).get('git_commit')), flush=True)
+    for name, result in results['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if base is None:
+            print(f"  {name}: 기준선 없음")
+            continue
+        print(f"  [{name}]")
+        current_flat, base_flat = flatten(result), flatten(base)
+        for key in sorted(current_flat):
+            if key.startswith('api_calls.') or key not in base_flat:
+                continue
+            old, new = base_flat[key], current_flat[key]
+            if old == 0:
+                continue
+            delta = (new - old) / abs(old) * 100
+            lower_better = any(marker in key for marker in LOWER_IS_BETTER)
+            better = delta < 0 if lower_better else delta > 0
+            mark = '✅' if better and abs(delta) >= 5 else ('⚠️' if abs(delta) >= 5 else '  ')
+            print(f"    {mark} {key}: {old} → {new} ({delta:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Slack 알림 모니터링 벤치마크')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='실행할 시나리오 (여러 번 지정 가능, 기본: 전체)')
+    parser.add_argument('--cycles', type=int, help='시나리오의 폴링 사이클 수 덮어쓰기')
+    parser.add_argument('--output', help='결과 JSON 경로 (기본: bench/results/<commit>.json)')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='tracemalloc으로 할당 최대치 측정 (시간 측정값이 느려지므로 별도 실행 권장)')
+    parser.add_argument('--baseline', action='store_true', help='bench/results/baseline.json과 비교')
+    parser.add_argument('--save-baseline', action='store_true', help='결과를 기준선으로 저장')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='slack-bench-')
+    prepare_environment(workdir)
+    sys.path.insert(0, REPO_DIR)
+    import app  # noqa: E402  (환경 설정 후 import)
+
+    names = args.scenario or list(SCENARIOS)
+    results = {
+        'meta': {
+            'git_commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'scenarios': {},
+    }
+    for name in names:
+        scenario = dict(SCENARIOS[name])
+        if args.cycles:
+            scenario['cycles'] = args.cycles
+        results['scenarios'][name] = run_scenario(app, name, scenario, args.trace_memory)
+        print(json.dumps(results['scenarios'][name], ensure_ascii=False, indent=2), flush=True)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['meta']['git_commit'] or 'latest'}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"💾 결과 저장: {output}", flush=True)
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 기준선 저장: {BASELINE_PATH}", flush=True)
+
+    if args.baseline:
+        if os.path.exists(BASELINE_PATH):
+            with open(BASELINE_PATH, 'r', encoding='utf-8') as f:
+                compare(results, json.load(f))
+        else:
+            print("⚠️ 기준선이 없습니다 (--save-baseline으로 먼저 저장)", flush=True)
+
+
+if __name__ == '__main__':
+    main()
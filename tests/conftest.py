@@ -0,0 +1,65 @@
+"""
+테스트 공통 설정
+
+app.py는 import 시점에 환경 변수를 읽으므로, import 전에 임시 작업 디렉토리와
+로컬 경로를 지정하여 실제 사용자 데이터/Slack/Claude API를 건드리지 않도록 한다.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'bench'))
+
+WORK_DIR = tempfile.mkdtemp(prefix='slack-monitor-tests-')
+os.environ.pop('ANTHROPIC_API_KEY', None)
+os.environ['METADATA_CACHE_PATH'] = os.path.join(WORK_DIR, 'metadata_cache.sqlite3')
+os.environ['MESSAGE_ARCHIVE_PATH'] = os.path.join(WORK_DIR, 'message_archive.sqlite3')
+os.environ.setdefault('SLACK_API_BASE', 'http://127.0.0.1:1/api')
+os.chdir(WORK_DIR)
+
+
+def wait_until(predicate, timeout=5.0, interval=0.02):
+    """predicate가 참이 될 때까지 대기 (백그라운드 스레드 처리 확인용)"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return predicate()
+
+
+@pytest.fixture(scope='session')
+def slack_app():
+    import app
+    return app
+
+
+@pytest.fixture
+def mock_slack(slack_app, monkeypatch):
+    """mock Slack API 서버를 띄우고 앱이 그 서버를 호출하도록 설정 (설정별로 여러 번 호출 가능)"""
+    from mock_slack import MockSlackConfig, MockSlackServer
+
+    servers = []
+
+    def start(**config):
+        config.setdefault('latency_ms', 0)
+        config.setdefault('jitter_ms', 0)
+        server = MockSlackServer(MockSlackConfig(**config)).start()
+        servers.append(server)
+        monkeypatch.setattr(slack_app, 'SLACK_API_BASE', server.base_url)
+        for cache in slack_app.get_global_caches():
+            cache.clear()
+        slack_app._user_directories.clear()
+        slack_app._usergroup_indexes.clear()
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
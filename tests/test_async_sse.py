@@ -0,0 +1,59 @@
+"""비동기 SSE 서버의 교차 출처 허용 범위"""
+
+import socket
+
+import pytest
+import requests
+
+aiohttp = pytest.importorskip('aiohttp')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope='module')
+def sse_port(slack_app):
+    port = free_port()
+    runner = slack_app.start_async_sse_server(port)
+    yield port
+    slack_app.run_async(runner.cleanup())
+
+
+def get_events(port, origin=None):
+    headers = {'Origin': origin} if origin else {}
+    return requests.get(f"http://127.0.0.1:{port}/api/monitoring/events", headers=headers, timeout=5)
+
+
+def test_foreign_origin_is_rejected(sse_port):
+    response = get_events(sse_port, 'https://evil.example')
+
+    assert response.status_code == 403
+    assert 'Access-Control-Allow-Origin' not in response.headers
+    assert 'Access-Control-Allow-Credentials' not in response.headers
+
+
+def test_app_origin_is_allowed_with_credentials(slack_app, sse_port):
+    origin = f"http://127.0.0.1:{slack_app.APP_PORT}"
+
+    response = get_events(sse_port, origin)
+
+    assert response.status_code == 200
+    assert response.headers['Access-Control-Allow-Origin'] == origin
+    assert response.headers['Access-Control-Allow-Credentials'] == 'true'
+
+
+def test_configured_origin_replaces_default(slack_app, sse_port, monkeypatch):
+    monkeypatch.setattr(slack_app, 'APP_ORIGINS', ['https://slack-monitor.example.com'])
+
+    assert get_events(sse_port, 'https://slack-monitor.example.com').status_code == 200
+    assert get_events(sse_port, f"http://127.0.0.1:{slack_app.APP_PORT}").status_code == 403
+
+
+def test_request_without_origin_is_served(sse_port):
+    response = get_events(sse_port)
+
+    assert response.status_code == 200
+    assert 'Access-Control-Allow-Origin' not in response.headers
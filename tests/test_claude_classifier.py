@@ -0,0 +1,100 @@
+"""Claude 우선순위 분류 서비스 (stub 클라이언트로 배치, 캐시, deadline, 예산 확인)"""
+
+import json
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from conftest import wait_until
+
+
+class StubClaudeClient:
+    """messages.create 호출을 기록하고, 프롬프트의 메시지마다 같은 우선순위로 응답 (delay만큼 지연)"""
+
+    def __init__(self, priority='high', delay=0.0):
+        self.priority = priority
+        self.delay = delay
+        self.calls = []  # [messages.create kwargs]
+        self.messages = SimpleNamespace(create=self.create)
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        time.sleep(self.delay)
+        prompt = kwargs['messages'][0]['content']
+        ids = [int(index) for index in re.findall(r'^(\d+)\. 메시지:', prompt, re.MULTILINE)]
+        items = [{'id': index, 'priority': self.priority, 'reason': f'stub {index}'} for index in ids]
+        return SimpleNamespace(content=[SimpleNamespace(text=json.dumps(items))],
+                               usage=SimpleNamespace(input_tokens=10, output_tokens=5))
+
+
+def make_classifier(app, client, **options):
+    options.setdefault('deadline', 2.0)
+    options.setdefault('batch_window', 0.01)
+    return app.ClaudeClassifier(client=client, **options)
+
+
+def test_concurrent_texts_share_one_request(slack_app):
+    client = StubClaudeClient()
+    classifier = make_classifier(slack_app, client, batch_window=0.2)
+    texts = ['서버 응답이 느려요', '배포 승인 부탁드립니다', '점심 메뉴 공유합니다']
+    results = {}
+
+    def classify(text):
+        results[text] = classifier.classify(text)
+
+    threads = [threading.Thread(target=classify, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(client.calls) == 1
+    prompt = client.calls[0]['messages'][0]['content']
+    assert all(json.dumps(text, ensure_ascii=False) in prompt for text in texts)
+    assert all(result[0] == 'high' for result in results.values())
+
+
+def test_normalized_text_hits_cache(slack_app):
+    client = StubClaudeClient(priority='critical')
+    classifier = make_classifier(slack_app, client)
+
+    first = classifier.classify('Production  DOWN\n 확인 부탁')
+    second = classifier.classify('production down 확인 부탁')
+
+    assert first[0] == 'critical'
+    assert second == first
+    assert len(client.calls) == 1
+
+
+def test_deadline_returns_none_and_late_result_fills_cache(slack_app):
+    client = StubClaudeClient(delay=0.5)
+    classifier = make_classifier(slack_app, client, deadline=0.1)
+    text = '결제 페이지에서 오류가 계속 발생합니다'
+
+    assert classifier.classify(text) == (None, 'Claude 응답 시간 초과')
+
+    # 늦게 도착한 응답도 캐시에 저장되어 다음 호출은 API 없이 응답
+    assert wait_until(lambda: classifier.cache_key(text) in classifier._cache)
+    assert classifier.classify(text)[0] == 'high'
+    assert len(client.calls) == 1
+
+
+def test_deadline_falls_back_to_keyword_result(slack_app, monkeypatch):
+    classifier = make_classifier(slack_app, StubClaudeClient(priority='critical', delay=0.5), deadline=0.1)
+    monkeypatch.setattr(slack_app, 'CLAUDE_ENABLED', True)
+    monkeypatch.setattr(slack_app, 'claude_classifier', classifier)
+    text = '다음 주 회의 일정 관련해서 메모 남겨둡니다'
+    keyword_result = slack_app.classify_message_by_keywords(text)
+
+    assert keyword_result[0] == 'normal'
+    assert slack_app.classify_message_priority(text) == keyword_result
+
+
+def test_budget_exhaustion_skips_api(slack_app):
+    client = StubClaudeClient()
+    classifier = make_classifier(slack_app, client, calls_per_minute=1)
+
+    assert classifier.classify('첫 번째 메시지입니다')[0] == 'high'
+    assert classifier.classify('두 번째 메시지입니다') == (None, 'Claude 호출 예산 초과')
+    assert len(client.calls) == 1
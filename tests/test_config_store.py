@@ -0,0 +1,31 @@
+"""여러 워커가 같은 설정 파일을 쓸 때의 ConfigStore 동작"""
+
+import pytest
+
+
+@pytest.mark.parametrize('shared', [True, False], ids=['shared', 'memory'])
+def test_other_worker_save_is_visible(slack_app, monkeypatch, shared):
+    monkeypatch.setattr(slack_app.state_backend, 'shared', shared)
+    bot_id = f'UCONFIG{shared}'
+    worker_a = slack_app.ConfigStore()
+    worker_b = slack_app.ConfigStore()
+    changes = []
+    worker_a.subscribe(lambda bot, name, value: changes.append((name, value)), bot_id=bot_id)
+
+    assert worker_a.get(bot_id, 'watched_users') is None
+    assert worker_b.set(bot_id, 'watched_users', ['U1'])
+
+    if shared:
+        # 공유 백엔드에서는 다음 읽기에서 바로 반영
+        assert worker_a.get(bot_id, 'watched_users') == ['U1']
+    else:
+        # 워커 하나로 실행하는 기본 설정에서는 감시 스레드가 반영
+        assert worker_a.get(bot_id, 'watched_users') is None
+        worker_a.check_files()
+        assert worker_a.get(bot_id, 'watched_users') == ['U1']
+    assert changes == [('watched_users', ['U1'])]
+
+    # 같은 크기의 값으로 다시 저장해도 변경으로 감지
+    assert worker_b.set(bot_id, 'watched_users', ['U2'])
+    worker_a.check_files()
+    assert worker_a.get(bot_id, 'watched_users') == ['U2']
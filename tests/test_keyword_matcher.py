@@ -0,0 +1,23 @@
+"""봇별 키워드 매처 캐시와 키워드 변경의 경쟁"""
+
+
+def test_matcher_built_before_invalidation_is_not_cached(slack_app, monkeypatch):
+    bot_id = 'UKEYWORDRACE'
+    slack_app.save_user_priority_keywords(bot_id, {'critical': ['예전키워드'], 'high': [], 'normal': []})
+    slack_app.invalidate_keyword_matcher(bot_id)
+    load_keywords = slack_app.get_user_priority_keywords
+
+    def racing_load(bid):
+        # 키워드를 읽은 직후, 매처를 저장하기 전에 키워드가 바뀜
+        keywords = load_keywords(bid)
+        slack_app.save_user_priority_keywords(bid, {'critical': ['새키워드'], 'high': [], 'normal': []})
+        return keywords
+
+    monkeypatch.setattr(slack_app, 'get_user_priority_keywords', racing_load)
+    stale = slack_app.get_bot_keyword_matcher(bot_id)
+    assert [match[0] for match in stale.find_all('예전키워드 확인')] == ['예전키워드']
+    monkeypatch.undo()
+
+    matcher = slack_app.get_bot_keyword_matcher(bot_id)
+    assert [match[0] for match in matcher.find_all('새키워드 확인')] == ['새키워드']
+    assert matcher.find_all('예전키워드 확인') == []
@@ -0,0 +1,33 @@
+"""import만으로 사용자 데이터 파일을 만들지 않는지 확인"""
+
+import os
+import subprocess
+import sys
+
+from conftest import REPO_DIR
+
+
+def import_app_in(workdir, code='import app'):
+    env = {key: value for key, value in os.environ.items()
+           if key not in ('METADATA_CACHE_PATH', 'MESSAGE_ARCHIVE_PATH')}
+    env['PYTHONPATH'] = REPO_DIR
+    subprocess.run([sys.executable, '-c', code], cwd=workdir, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=60)
+
+
+def test_import_creates_no_user_data(tmp_path):
+    import_app_in(tmp_path)
+
+    assert not (tmp_path / 'user_data').exists()
+
+
+def test_metadata_store_opens_on_first_use(tmp_path):
+    import_app_in(tmp_path, 'import app; app.SlackNotifier("xoxb-test"); app.get_metadata_store().flush()')
+
+    assert (tmp_path / 'user_data' / 'metadata_cache.sqlite3').exists()
+
+
+def test_message_archive_opens_on_first_use(tmp_path):
+    import_app_in(tmp_path, 'import app; app.SlackNotifier("xoxb-test").archive_scanned_messages("C1", "0", [], 0)')
+
+    assert (tmp_path / 'user_data' / 'message_archive.sqlite3').exists()
@@ -0,0 +1,34 @@
+"""/metrics 접근 제어"""
+
+import pytest
+
+
+@pytest.fixture
+def client(slack_app):
+    return slack_app.app.test_client()
+
+
+def test_metrics_disabled_by_default(slack_app, client):
+    assert not slack_app.METRICS_ENABLED
+    assert client.get('/metrics').status_code == 404
+
+
+def test_metrics_local_only_without_token(slack_app, client, monkeypatch):
+    monkeypatch.setattr(slack_app, 'METRICS_ENABLED', True)
+    monkeypatch.setattr(slack_app, 'METRICS_TOKEN', None)
+
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '10.0.0.5'}).status_code == 403
+    response = client.get('/metrics', environ_base={'REMOTE_ADDR': '127.0.0.1'})
+    assert response.status_code == 200
+    assert b'slack_api_requests_total' in response.data
+
+
+def test_metrics_token_required_when_configured(slack_app, client, monkeypatch):
+    monkeypatch.setattr(slack_app, 'METRICS_ENABLED', True)
+    monkeypatch.setattr(slack_app, 'METRICS_TOKEN', 'scrape-secret')
+
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'},
+                          environ_base={'REMOTE_ADDR': '10.0.0.5'})
+    assert response.status_code == 200
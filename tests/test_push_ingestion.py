@@ -0,0 +1,128 @@
+"""푸시 수신 경로 (Events API 서명 검증, Socket Mode, 폴링 감속 조건)"""
+
+import threading
+import time
+
+import pytest
+from conftest import wait_until
+from mock_slack import FakeSocketModeConnection, event_callback, message_event, sign_event_request
+
+SECRET = 'test-signing-secret'
+
+
+class RecordingPoller:
+    """dispatch_slack_event가 전달한 이벤트를 기록하는 폴러 대역"""
+
+    def __init__(self, bot_id):
+        self.bot_id = bot_id
+        self.events = []
+
+    def ingest_event(self, event):
+        self.events.append(event)
+
+
+@pytest.fixture
+def events_mode(slack_app, monkeypatch):
+    monkeypatch.setattr(slack_app, 'SLACK_INGESTION_MODE', 'events')
+    monkeypatch.setattr(slack_app, 'SLACK_SIGNING_SECRET', SECRET)
+    monkeypatch.setattr(slack_app, '_last_push_event_at', 0.0)
+    return slack_app
+
+
+@pytest.fixture
+def recording_poller(slack_app, monkeypatch):
+    poller = RecordingPoller('UTESTBOT')
+    monkeypatch.setitem(slack_app._workspace_pollers, poller.bot_id, poller)
+    return poller
+
+
+def post_event(client, payload, secret=SECRET, timestamp=None):
+    body, headers = sign_event_request(payload, secret, timestamp)
+    return client.post('/api/slack/events', data=body, headers=headers)
+
+
+def test_events_endpoint_disabled_without_signing_secret(events_mode, monkeypatch):
+    monkeypatch.setattr(events_mode, 'SLACK_SIGNING_SECRET', None)
+    client = events_mode.app.test_client()
+
+    response = client.post('/api/slack/events', json=event_callback(message_event('C1', 'hi')))
+
+    assert response.status_code == 503
+    assert not events_mode.verify_slack_signature({}, b'{}')
+    assert not events_mode.push_ingestion_enabled()
+
+
+def test_events_endpoint_rejects_forged_and_stale_requests(events_mode, recording_poller):
+    client = events_mode.app.test_client()
+    payload = event_callback(message_event('C1', 'forged'), recording_poller.bot_id)
+
+    assert post_event(client, payload, secret='wrong-secret').status_code == 401
+    assert post_event(client, payload, timestamp=time.time() - 600).status_code == 401
+    time.sleep(0.1)
+    assert recording_poller.events == []
+    assert not events_mode.push_ingestion_active()
+
+
+def test_url_verification_returns_challenge(events_mode):
+    client = events_mode.app.test_client()
+
+    response = post_event(client, {"type": "url_verification", "challenge": "abc123"})
+
+    assert response.status_code == 200
+    assert response.get_json() == {"challenge": "abc123"}
+    # URL 검증만으로는 푸시가 동작 중인 것으로 보지 않음
+    assert not events_mode.push_ingestion_active()
+
+
+def test_signed_event_is_dispatched_and_enables_push(events_mode, recording_poller):
+    client = events_mode.app.test_client()
+    assert not events_mode.push_ingestion_active()
+
+    event = message_event('C1', '<@UTESTBOT> 확인 부탁드립니다')
+    response = post_event(client, event_callback(event, recording_poller.bot_id))
+
+    assert response.status_code == 200
+    assert wait_until(lambda: recording_poller.events == [event])
+    assert events_mode.push_ingestion_active()
+
+
+def test_push_goes_inactive_when_events_stop(events_mode, monkeypatch):
+    monkeypatch.setattr(events_mode, '_last_push_event_at', time.time() - events_mode.PUSH_EVENT_LIVENESS - 1)
+
+    assert events_mode.push_ingestion_enabled()
+    assert not events_mode.push_ingestion_active()
+
+
+def test_socket_mode_acks_and_dispatches(slack_app, monkeypatch):
+    connection = FakeSocketModeConnection()
+    received = []
+    got_payload = threading.Event()
+
+    def on_payload(payload):
+        received.append(payload)
+        got_payload.set()
+
+    client = slack_app.SocketModeClient('xapp-test', on_payload,
+                                        ws_factory=lambda url: connection, open_url=lambda: 'wss://fake')
+    monkeypatch.setattr(slack_app, 'SLACK_INGESTION_MODE', 'socket')
+    monkeypatch.setattr(slack_app, 'socket_mode_client', client)
+    monkeypatch.setattr(slack_app, '_last_push_event_at', 0.0)
+    client.start()
+    try:
+        assert wait_until(lambda: client.connected)
+        # 연결만 되어 있고 이벤트가 없으면 폴링을 줄이지 않음
+        assert not slack_app.push_ingestion_active()
+
+        payload = event_callback(message_event('D1', '안녕하세요', channel_type='im'))
+        envelope_id = connection.push(payload)
+
+        assert got_payload.wait(5)
+        assert received == [payload]
+        assert connection.acks == [envelope_id]
+
+        slack_app.dispatch_slack_event(payload)
+        assert slack_app.push_ingestion_active()
+    finally:
+        client.stop()
+    assert wait_until(lambda: not client.connected)
+    assert not slack_app.push_ingestion_active()
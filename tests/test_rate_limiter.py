@@ -0,0 +1,84 @@
+"""Slack API rate limit 스케줄러 (실제 tier 한도에서 우선순위별 토큰 분배)"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+WORKSPACE = 'test-workspace'
+METHOD = 'conversations.history'  # Tier 3: 분당 50회
+
+
+@pytest.fixture
+def limiter(slack_app, monkeypatch):
+    monkeypatch.setattr(slack_app, 'SLACK_RATE_LIMIT_MULTIPLIER', 1.0)
+    return slack_app.SlackRateLimiter()
+
+
+@pytest.fixture
+def saturated(slack_app, limiter):
+    """알림 스캔 대기자 10명이 버킷을 계속 채우고 있는 상태"""
+    stop = threading.Event()
+    granted = []
+
+    def scan_worker():
+        while not stop.is_set():
+            if limiter.acquire(WORKSPACE, METHOD, slack_app.SLACK_PRIORITY_SCAN, timeout=1):
+                granted.append(time.monotonic())
+
+    threads = [threading.Thread(target=scan_worker, daemon=True) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    # 버스트 토큰을 모두 소진할 때까지 대기
+    deadline = time.monotonic() + 5
+    while limiter._bucket(WORKSPACE, METHOD).tokens >= 1 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    yield granted
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+
+def test_ui_is_not_starved_by_queued_scans(slack_app, limiter, saturated):
+    started = time.monotonic()
+
+    acquired = limiter.acquire(WORKSPACE, METHOD, slack_app.SLACK_PRIORITY_UI, timeout=10)
+
+    # 충전 속도 0.83개/초, 스캔 3 : 화면 1 비율이면 토큰 몇 개 안에 차례가 옴
+    assert acquired
+    assert time.monotonic() - started < 6
+    # 화면 조회가 기다리는 동안에도 스캔은 계속 진행
+    assert saturated
+
+
+def test_async_ui_is_not_starved_by_queued_scans(slack_app, limiter, saturated):
+    started = time.monotonic()
+
+    acquired = asyncio.run(limiter.acquire_async(WORKSPACE, METHOD, slack_app.SLACK_PRIORITY_UI, timeout=10))
+
+    assert acquired
+    assert time.monotonic() - started < 6
+
+
+def test_scan_keeps_larger_share_under_contention(slack_app, limiter, saturated):
+    ui_granted = []
+    stop = threading.Event()
+
+    def ui_worker():
+        while not stop.is_set():
+            if limiter.acquire(WORKSPACE, METHOD, slack_app.SLACK_PRIORITY_UI, timeout=1):
+                ui_granted.append(time.monotonic())
+
+    ui_threads = [threading.Thread(target=ui_worker, daemon=True) for _ in range(3)]
+    window_started = time.monotonic()
+    for thread in ui_threads:
+        thread.start()
+    time.sleep(8)
+    stop.set()
+    for thread in ui_threads:
+        thread.join(timeout=5)
+
+    scans = len([t for t in saturated if t >= window_started])
+    assert ui_granted, "화면 조회가 토큰을 하나도 받지 못함"
+    assert scans > len(ui_granted)
@@ -0,0 +1,50 @@
+"""채널 스캔 스케줄러의 사이클 예산과 한도 부족 경고"""
+
+import time
+
+import pytest
+
+WORKSPACE = 'test-workspace'
+METHOD = 'conversations.history'  # Tier 3: 분당 50회
+CHANNELS = [f'C{i:04d}' for i in range(200)]
+
+
+@pytest.fixture
+def limiter(slack_app, monkeypatch):
+    monkeypatch.setattr(slack_app, 'SLACK_RATE_LIMIT_MULTIPLIER', 1.0)
+    return slack_app.SlackRateLimiter()
+
+
+def test_cycle_budget_follows_limiter_tokens(slack_app, limiter):
+    scheduler = slack_app.ChannelScanScheduler()
+
+    available, call_rate = limiter.capacity(WORKSPACE, METHOD)
+    assert 0 < available < slack_app.CHANNEL_SCAN_BUDGET
+    assert len(scheduler.select(CHANNELS, capacity=available, call_rate=call_rate)) == available
+
+    # 토큰을 모두 쓰면 한 사이클에 한 채널만 제출
+    for _ in range(available):
+        assert limiter.acquire(WORKSPACE, METHOD, priority=slack_app.SLACK_PRIORITY_SCAN)
+    available, call_rate = limiter.capacity(WORKSPACE, METHOD)
+    assert available == 0
+    assert len(scheduler.select(CHANNELS, capacity=available, call_rate=call_rate)) == 1
+
+
+def test_warns_when_staleness_target_cannot_be_met(slack_app, limiter, capsys):
+    _, call_rate = limiter.capacity(WORKSPACE, METHOD)
+
+    # 분당 50회로는 채널 200개를 30초 안에 돌 수 없음
+    scheduler = slack_app.ChannelScanScheduler()
+    scheduler.select(CHANNELS, call_rate=call_rate)
+    assert scheduler.stats()['over_capacity']
+    assert '스캔 한도 부족' in capsys.readouterr().out
+
+    # 같은 경고는 SCAN_CAPACITY_WARN_INTERVAL 동안 반복하지 않음
+    scheduler.select(CHANNELS, now=time.time() + 1, call_rate=call_rate)
+    assert '스캔 한도 부족' not in capsys.readouterr().out
+
+    # 채널이 적으면 경고하지 않음
+    small = slack_app.ChannelScanScheduler()
+    small.select(['C0001', 'C0002'], call_rate=call_rate)
+    assert not small.stats()['over_capacity']
+    assert '스캔 한도 부족' not in capsys.readouterr().out
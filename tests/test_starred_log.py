@@ -0,0 +1,80 @@
+"""별표 메시지 로그: 이전 형식 변환과 여러 프로세스의 동시 기록"""
+
+import json
+import os
+import subprocess
+import sys
+
+from conftest import REPO_DIR
+
+
+def message(message_id, starred_at=0):
+    return {'message_id': message_id, 'text': f'메시지 {message_id}', 'starred_at': starred_at}
+
+
+def all_ids(log):
+    messages, _ = log.page(limit=10000)
+    return {msg['message_id'] for msg in messages}
+
+
+def test_migration_keeps_json_until_log_is_written(slack_app, monkeypatch):
+    bot_id = 'USTARMIGRATE'
+    old_path = slack_app.get_user_file_path(bot_id, 'starred_messages.json')
+    with open(old_path, 'w', encoding='utf-8') as f:
+        json.dump([message('m1', 1), message('m2', 2)], f)
+
+    # 로그 기록(압축) 실패 → 원본을 남겨 둠
+    monkeypatch.setattr(slack_app.StarredLog, '_compact', lambda self: False)
+    log = slack_app.StarredLog(bot_id)
+    assert all_ids(log) == {'m1', 'm2'}
+    assert os.path.exists(old_path)
+    # 그 사이의 변경은 로그에 남음
+    log.remove('m1')
+    log.add(message('m3', 3))
+    monkeypatch.undo()
+
+    # 다음 실행 때 원본 + 로그로 다시 변환한 뒤에만 이름 변경
+    log = slack_app.StarredLog(bot_id)
+    assert all_ids(log) == {'m2', 'm3'}
+    assert not os.path.exists(old_path)
+    assert os.path.exists(old_path + '.migrated')
+    assert all_ids(slack_app.StarredLog(bot_id)) == {'m2', 'm3'}
+
+
+def test_compaction_keeps_other_instances_appends(slack_app):
+    bot_id = 'USTARSHARED'
+    worker_a = slack_app.StarredLog(bot_id)
+    worker_b = slack_app.StarredLog(bot_id)
+
+    worker_b.add(message('from-b'))
+    count = slack_app.STARRED_COMPACT_MIN + 10
+    for index in range(count):
+        worker_a.add(message(f'a{index}'))
+    for index in range(count):
+        worker_a.remove(f'a{index}')  # 압축 발생
+
+    assert all_ids(worker_a) == {'from-b'}
+    assert all_ids(worker_b) == {'from-b'}
+    assert all_ids(slack_app.StarredLog(bot_id)) == {'from-b'}
+
+
+def test_concurrent_processes_lose_no_records(slack_app, tmp_path, monkeypatch):
+    workers, per_worker, kept = 4, 150, 10
+    code = (
+        "import sys, app\n"
+        "worker = sys.argv[1]\n"
+        "log = app.StarredLog('USTARPROC')\n"
+        f"for i in range({per_worker}):\n"
+        "    log.add({'message_id': f'{worker}-{i}', 'text': ''})\n"
+        f"for i in range({kept}, {per_worker}):\n"
+        "    log.remove(f'{worker}-{i}')\n"
+    )
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    processes = [subprocess.Popen([sys.executable, '-c', code, f'w{index}'], cwd=tmp_path, env=env,
+                                  stdout=subprocess.DEVNULL)
+                 for index in range(workers)]
+    assert all(process.wait(timeout=120) == 0 for process in processes)
+
+    monkeypatch.chdir(tmp_path)
+    ids = all_ids(slack_app.StarredLog('USTARPROC'))
+    assert ids == {f'w{worker}-{i}' for worker in range(workers) for i in range(kept)}
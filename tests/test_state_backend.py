@@ -0,0 +1,66 @@
+"""공유 상태 백엔드 인터페이스 (추상 메서드와 이벤트 로그 tail)"""
+
+import pytest
+
+
+def test_incomplete_backend_fails_at_construction(slack_app):
+    class EventsOnlyBackend(slack_app.InProcessStateBackend):
+        shared = True
+
+    # 전체 구현을 상속한 백엔드는 생성 가능
+    EventsOnlyBackend()
+
+    class PartialBackend(slack_app.StateBackend):
+        """tail 메서드(latest_event_id/events_after/prune)가 빠진 shared 백엔드"""
+        shared = True
+
+        def init_session(self, session_id, since): pass
+        def start_session(self, session_id, since): pass
+        def stop_session(self, session_id): pass
+        def session(self, session_id): pass
+        def set_presence(self, stream, owner, session_ids, ttl): pass
+        def active_sessions(self, stream): pass
+        def acquire_lease(self, name, owner, ttl): pass
+        def release_lease(self, name, owner): pass
+        def append_events(self, stream, notifications, target=None): pass
+        def read_events(self, stream, after_id): pass
+
+    with pytest.raises(TypeError, match='events_after'):
+        PartialBackend()
+
+
+@pytest.mark.parametrize('backend_name', ['memory', 'sqlite'])
+def test_tail_methods_return_events_in_id_order(slack_app, tmp_path, backend_name):
+    if backend_name == 'memory':
+        backend = slack_app.InProcessStateBackend()
+    else:
+        backend = slack_app.SqliteStateBackend(str(tmp_path / 'shared_state.sqlite3'))
+    cursor = backend.latest_event_id()
+
+    backend.append_events('bot-a', [{'text': 'a1'}])
+    backend.append_events('bot-b', [{'text': 'b1'}])
+    backend.append_events('bot-a', [{'text': 'a2'}], target='S1')
+
+    events = backend.events_after(cursor)
+    assert [(stream, notification['text'], target) for _, stream, notification, target in events] == [
+        ('bot-a', 'a1', None), ('bot-b', 'b1', None), ('bot-a', 'a2', 'S1')]
+    assert backend.latest_event_id() == events[-1][0]
+    assert backend.events_after(events[-1][0]) == []
+
+    backend.set_presence('bot-a', 'owner', ['S1'], ttl=-1)
+    backend.acquire_lease('poller:bot-a', 'owner', ttl=-1)
+    backend.prune()
+    assert backend.active_sessions('bot-a') == {}
+    assert backend.acquire_lease('poller:bot-a', 'other', ttl=10)
+
+
+@pytest.mark.parametrize('secret_key', [None, 'shared-secret'], ids=['no-key', 'key'])
+def test_sqlite_backend_warns_without_shared_secret_key(slack_app, tmp_path, monkeypatch, capsys, secret_key):
+    monkeypatch.setattr(slack_app, 'STATE_BACKEND', 'sqlite')
+    monkeypatch.setattr(slack_app, 'STATE_DB_PATH', str(tmp_path / 'shared_state.sqlite3'))
+    monkeypatch.setattr(slack_app, 'FLASK_SECRET_KEY', secret_key)
+
+    backend = slack_app.create_state_backend()
+
+    assert isinstance(backend, slack_app.SqliteStateBackend)
+    assert ('FLASK_SECRET_KEY가 설정되지 않았습니다' in capsys.readouterr().out) == (secret_key is None)